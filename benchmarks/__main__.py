@@ -0,0 +1,272 @@
+"""Measure the performance of upadup on large, synthetic configs.
+
+Each phase is timed on its own:
+
+- `extract`: finding the `additional_dependencies` of every hook
+- `parse_specifier`: parsing every PyPI dependency
+- `run`: a full `UpadupUpdater.run()`, against a local stub server
+- `rewrite`: applying every update to the text of the config
+- `diff`: rendering the diff shown by `--check`
+
+Run from the root of the repo, e.g.
+
+    python -m benchmarks --repos 500 --latency 0.05 --output results.json
+
+and compare against an earlier result with `--baseline`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import typing as t
+
+from upadup import http, resolver, yaml
+from upadup.providers import pypi
+from upadup.providers.github import api as github_api
+from upadup.providers.github import cli as github_cli
+from upadup.updater import UpadupUpdater, _create_new_content
+
+from .configs import STYLES, ConfigShape, generate_config
+from .stub_server import StubServer
+
+# the format of the results file, which is checked when comparing results
+RESULTS_VERSION = 1
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--repos", type=int, default=100)
+    parser.add_argument("--hooks", type=int, default=2, help="hooks per repo")
+    parser.add_argument(
+        "--dependencies", type=int, default=5, help="dependencies per hook"
+    )
+    parser.add_argument("--style", choices=STYLES, default="block")
+    parser.add_argument(
+        "--github-every",
+        type=int,
+        default=10,
+        metavar="N",
+        help="make every Nth dependency a GitHub dependency (0 for none)",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="the latency of each response from the stub server",
+    )
+    parser.add_argument("--jobs", type=int, default=resolver.DEFAULT_JOBS)
+    parser.add_argument("--engine", choices=tuple(resolver.ENGINES), default="threads")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="the number of times to run each phase"
+    )
+    parser.add_argument(
+        "--output", type=pathlib.Path, metavar="FILE", help="write results as JSON"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=pathlib.Path,
+        metavar="FILE",
+        help="compare against results written by an earlier run",
+    )
+    args = parser.parse_args(argv)
+
+    shape = ConfigShape(
+        repos=args.repos,
+        hooks=args.hooks,
+        dependencies=args.dependencies,
+        style=args.style,
+        github_every=args.github_every,
+    )
+    results = run_benchmarks(
+        shape,
+        latency=args.latency,
+        jobs=args.jobs,
+        engine=args.engine,
+        repeat=args.repeat,
+    )
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("results_version") != RESULTS_VERSION:
+            sys.exit(f"{args.baseline} was written by an incompatible version")
+    print_summary(results, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"wrote results to {args.output}")
+
+
+def run_benchmarks(
+    shape: ConfigShape,
+    *,
+    latency: float = 0.0,
+    jobs: int = resolver.DEFAULT_JOBS,
+    engine: str = "threads",
+    repeat: int = 5,
+) -> dict[str, t.Any]:
+    text = generate_config(shape)
+    phases: dict[str, dict[str, t.Any]] = {}
+
+    records = [r for hook in yaml.extract_hook_dependencies(text) for r in hook]
+    phases["extract"] = _measure(
+        lambda: yaml.extract_hook_dependencies(text), repeat, items=len(records)
+    )
+
+    specifiers = [
+        r.dependency for r in records if not r.dependency.startswith("github.com/")
+    ]
+    phases["parse_specifier"] = _measure(
+        lambda: [pypi.parse_specifier(s) for s in specifiers],
+        repeat,
+        items=len(specifiers),
+    )
+
+    with (
+        tempfile.TemporaryDirectory() as tmp_dir,
+        StubServer(latency=latency) as server,
+        _use_stub_server(server),
+    ):
+        path = pathlib.Path(tmp_dir) / ".pre-commit-config.yaml"
+        path.write_text(text)
+        http.configure(pool_size=max(jobs, http.DEFAULT_POOL_SIZE))
+        indexes = [pypi.PackageIndex(server.pypi_url)]
+
+        updaters = []
+
+        def _run() -> None:
+            updater = UpadupUpdater(
+                path=path,
+                jobs=jobs,
+                engine=engine,
+                version_cache=None,
+                indexes=indexes,
+                config_dir=path.parent,
+            )
+            with contextlib.redirect_stdout(io.StringIO()):
+                updater.run()
+            updaters.append(updater)
+
+        phases["run"] = _measure(_run, repeat, items=len(records))
+        phases["run"]["requests_per_run"] = server.request_count / repeat
+
+    updater = updaters[-1]
+    updates = list(updater._updates)
+    phases["rewrite"] = _measure(
+        lambda: _create_new_content(updater._config_file.text, updates),
+        repeat,
+        items=len(updates),
+    )
+    phases["diff"] = _measure(updater.render_diff, repeat, items=len(updates))
+
+    return {
+        "results_version": RESULTS_VERSION,
+        "created_at": time.time(),
+        "upadup_version": _upadup_version(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "yaml_parser": "c" if yaml.CParser is not None else "pure",
+        "parameters": {
+            "repos": shape.repos,
+            "hooks": shape.hooks,
+            "dependencies": shape.dependencies,
+            "style": shape.style,
+            "github_every": shape.github_every,
+            "latency": latency,
+            "jobs": jobs,
+            "engine": engine,
+            "repeat": repeat,
+            "config_bytes": len(text.encode()),
+        },
+        "phases": phases,
+    }
+
+
+def print_summary(
+    results: dict[str, t.Any], baseline: dict[str, t.Any] | None = None
+) -> None:
+    header = f"{'phase':<16} {'median':>12} {'min':>12} {'items/s':>14}"
+    if baseline is not None:
+        header += f" {'vs baseline':>12}"
+    print(header)
+    for name, phase in results["phases"].items():
+        line = (
+            f"{name:<16} {_format_seconds(phase['median']):>12} "
+            f"{_format_seconds(phase['min']):>12} {phase['items_per_second']:>14,.0f}"
+        )
+        if baseline is not None and name in baseline["phases"]:
+            ratio = phase["median"] / baseline["phases"][name]["median"]
+            line += f" {ratio:>11.2f}x"
+        print(line)
+
+
+def _measure(
+    func: t.Callable[[], object], repeat: int, *, items: int
+) -> dict[str, t.Any]:
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    median = statistics.median(seconds)
+    return {
+        "seconds": seconds,
+        "min": min(seconds),
+        "median": median,
+        "items": items,
+        "items_per_second": items / median if median else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def _use_stub_server(server: StubServer) -> t.Iterator[None]:
+    # GitHub lookups go to the stub server through the REST API, rather than
+    # through gh or the GraphQL API, and nothing goes through a proxy
+    saved_env = {
+        name: os.environ.pop(name, None)
+        for name in ("GH_TOKEN", "GITHUB_TOKEN", "NO_PROXY", "no_proxy")
+    }
+    os.environ["NO_PROXY"] = os.environ["no_proxy"] = "127.0.0.1"
+    saved_api_url, saved_has_cli = github_api.API_URL, github_cli.HAS_CLI
+    github_api.API_URL, github_cli.HAS_CLI = server.github_url, False
+    try:
+        yield
+    finally:
+        github_api.API_URL, github_cli.HAS_CLI = saved_api_url, saved_has_cli
+        for name, value in saved_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.2f}ms"
+    return f"{seconds:.2f}s"
+
+
+def _upadup_version() -> str:
+    import importlib.metadata
+
+    try:
+        return importlib.metadata.version("upadup")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+if __name__ == "__main__":
+    main()
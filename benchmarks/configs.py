@@ -0,0 +1,72 @@
+"""Generate large, synthetic pre-commit configs."""
+
+from __future__ import annotations
+
+import dataclasses
+
+STYLES = ("block", "flow", "quoted")
+
+# the version every generated dependency is pinned to, which the stub server
+# always reports as outdated
+OLD_VERSION = "1.0.0"
+GITHUB_OWNER = "bench-owner"
+
+
+@dataclasses.dataclass(frozen=True)
+class ConfigShape:
+    """The size and style of a generated config.
+
+    Every `github_every`-th dependency is a GitHub dependency, and the rest are
+    PyPI packages. Every dependency has a distinct name, so each one needs a
+    lookup of its own.
+    """
+
+    repos: int = 100
+    hooks: int = 2
+    dependencies: int = 5
+    style: str = "block"
+    github_every: int = 10
+
+    def __post_init__(self) -> None:
+        if self.style not in STYLES:
+            raise ValueError(f"unknown config style: {self.style!r}")
+
+    @property
+    def total_dependencies(self) -> int:
+        return self.repos * self.hooks * self.dependencies
+
+
+def dependency_name(repo: int, hook: int, index: int, shape: ConfigShape) -> str:
+    number = (repo * shape.hooks + hook) * shape.dependencies + index
+    if shape.github_every and number % shape.github_every == shape.github_every - 1:
+        return f"github.com/{GITHUB_OWNER}/repo-{number}/cmd/tool@v{OLD_VERSION}"
+    return f"bench-package-{number}=={OLD_VERSION}"
+
+
+def generate_config(shape: ConfigShape) -> str:
+    lines = ["repos:"]
+    for repo in range(shape.repos):
+        lines.append(f"  - repo: https://github.com/{GITHUB_OWNER}/hooks-{repo}")
+        lines.append("    rev: v1.0.0")
+        lines.append("    hooks:")
+        for hook in range(shape.hooks):
+            lines.append(f"      - id: hook-{hook}")
+            dependencies = [
+                dependency_name(repo, hook, index, shape)
+                for index in range(shape.dependencies)
+            ]
+            lines.extend(_format_dependencies(dependencies, shape.style))
+    return "\n".join(lines) + "\n"
+
+
+def _format_dependencies(dependencies: list[str], style: str) -> list[str]:
+    if style == "flow":
+        return [f"        additional_dependencies: [{', '.join(dependencies)}]"]
+
+    lines = ["        additional_dependencies:"]
+    for index, dependency in enumerate(dependencies):
+        if style == "quoted":
+            quote = "'" if index % 2 else '"'
+            dependency = f"{quote}{dependency}{quote}"
+        lines.append(f"          - {dependency}")
+    return lines
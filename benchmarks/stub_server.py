@@ -0,0 +1,121 @@
+"""A local stand-in for the PyPI JSON API and the GitHub tags API."""
+
+from __future__ import annotations
+
+import http.server
+import json
+import multiprocessing
+import multiprocessing.connection
+import re
+import time
+import typing as t
+
+from .configs import OLD_VERSION
+
+# the version which the stub server reports for every package and repo
+NEW_VERSION = "2.0.0"
+
+_PYPI_PATH = re.compile(r"^/pypi/([^/]+)/json$")
+_TAGS_PATH = re.compile(r"^/repos/([^/]+)/([^/]+)/tags/?(?:\?.*)?$")
+
+
+class StubServer:
+    """Serve package versions and repo tags on localhost.
+
+    Each response is delayed by `latency` seconds, to stand in for the round
+    trip to a real server. Requests are handled concurrently, in a separate
+    process, so that the server does not compete with upadup for the GIL.
+
+    Use as a context manager:
+
+        with StubServer(latency=0.05) as server:
+            pypi_url = server.pypi_url
+            github_url = server.github_url
+    """
+
+    def __init__(self, *, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.url = ""
+        self._request_count = multiprocessing.Value("i", 0)
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve,
+            args=(latency, self._request_count, child_conn),
+            daemon=True,
+        )
+
+    @property
+    def pypi_url(self) -> str:
+        return f"{self.url}/pypi"
+
+    @property
+    def github_url(self) -> str:
+        return self.url
+
+    @property
+    def request_count(self) -> int:
+        return int(self._request_count.value)
+
+    def __enter__(self) -> StubServer:
+        self._process.start()
+        host, port = self._conn.recv()
+        self.url = f"http://{host}:{port}"
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self._process.terminate()
+        self._process.join()
+
+
+def _serve(
+    latency: float, request_count: t.Any, conn: multiprocessing.connection.Connection
+) -> None:
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), _make_handler(latency, request_count)
+    )
+    server.daemon_threads = True
+    conn.send(server.server_address[:2])
+    server.serve_forever()
+
+
+def _make_handler(
+    latency: float, request_count: t.Any
+) -> type[http.server.BaseHTTPRequestHandler]:
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately, which would otherwise be
+        # held back by Nagle's algorithm and add ~40ms to every response
+        disable_nagle_algorithm = True
+
+        def do_GET(self) -> None:
+            with request_count.get_lock():
+                request_count.value += 1
+            if latency:
+                time.sleep(latency)
+
+            body: t.Any
+            if match := _PYPI_PATH.match(self.path):
+                body = {
+                    "info": {"name": match.group(1), "version": NEW_VERSION},
+                    "releases": {OLD_VERSION: [], NEW_VERSION: []},
+                }
+            elif match := _TAGS_PATH.match(self.path):
+                body = [
+                    {"name": f"v{version}", "commit": {"sha": f"{index:040x}"}}
+                    for index, version in enumerate((NEW_VERSION, OLD_VERSION))
+                ]
+            else:
+                self.send_error(404)
+                return
+
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: t.Any) -> None:
+            pass
+
+    return Handler
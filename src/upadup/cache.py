@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import dataclasses
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+import typing as t
+
+# by default, a cached lookup is considered fresh for one hour
+DEFAULT_TTL = 3600.0
+
+_SCHEMA = """\
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+def default_cache_dir() -> pathlib.Path:
+    """Get the user cache dir for upadup, respecting `UPADUP_CACHE_DIR`."""
+    if os.environ.get("UPADUP_CACHE_DIR"):
+        return pathlib.Path(os.environ["UPADUP_CACHE_DIR"])
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or (
+            pathlib.Path.home() / "AppData" / "Local"
+        )
+        return pathlib.Path(base) / "upadup" / "Cache"
+    if sys.platform == "darwin":
+        return pathlib.Path.home() / "Library" / "Caches" / "upadup"
+    base = os.environ.get("XDG_CACHE_HOME") or (pathlib.Path.home() / ".cache")
+    return pathlib.Path(base) / "upadup"
+
+
+@dataclasses.dataclass(frozen=True)
+class CacheEntry:
+    value: str
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+
+class Store(t.Protocol):
+    """The interface of persistent lookup stores, used by the provider maps."""
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        """Get a stored entry, if there is one."""
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        """Store the result of a lookup."""
+
+    def touch(self, namespace: str, key: str, *, ttl: float | None = None) -> None:
+        """Mark an entry as fresh again, after it was revalidated."""
+
+
+class VersionCache:
+    """A persistent store of lookup results, shared between upadup processes.
+
+    Entries are grouped by namespace (e.g. `pypi`) and carry the validators
+    needed to revalidate them with a conditional request once they expire.
+
+    The store is an SQLite database in WAL mode, so that many processes may read
+    and write it at once.
+    """
+
+    def __init__(self, path: pathlib.Path, ttl: float = DEFAULT_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(path), timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(_SCHEMA)
+
+    @classmethod
+    def open_default(cls, ttl: float = DEFAULT_TTL) -> VersionCache | None:
+        """Open the cache in the user cache dir, or return None if unavailable."""
+        path = default_cache_dir() / "cache.sqlite3"
+        try:
+            return cls(path, ttl=ttl)
+        except (OSError, sqlite3.Error) as e:
+            print(
+                f"upadup cache is unavailable ({e}), continuing without it",
+                file=sys.stderr,
+            )
+            return None
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, etag, last_modified, fetched_at, expires_at "
+                "FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(*row)
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(namespace, key, value, etag, last_modified, fetched_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, value, etag, last_modified, now, expires_at),
+            )
+
+    def touch(self, namespace: str, key: str, *, ttl: float | None = None) -> None:
+        """Mark an entry as fresh again, after it was revalidated."""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET fetched_at = ?, expires_at = ? "
+                "WHERE namespace = ? AND key = ?",
+                (now, expires_at, namespace, key),
+            )
+
+    def info(self) -> dict[str, t.Any]:
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*), SUM(expires_at > ?) "
+                "FROM entries GROUP BY namespace ORDER BY namespace",
+                (now,),
+            ).fetchall()
+        return {
+            "path": str(self.path),
+            "namespaces": {
+                namespace: {"entries": count, "fresh": fresh or 0}
+                for namespace, count, fresh in rows
+            },
+        }
+
+    def clear(self) -> int:
+        """Remove all entries, returning the number removed."""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM entries")
+        return cursor.rowcount
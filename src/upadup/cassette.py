@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import base64
+import collections
+import hashlib
+import io
+import json
+import os
+import pathlib
+import threading
+import time
+import typing as t
+
+import requests
+import requests.adapters
+import requests.structures
+import requests.utils
+
+CASSETTE_FILENAME = "cassette.jsonl"
+
+# the format of cassette files, which is checked when replaying one
+FORMAT_VERSION = 1
+
+# these describe the body as it was sent, but bodies are stored decoded
+_DROPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding")
+
+_Key = tuple[str, str, t.Optional[str]]
+
+
+class CassetteError(ValueError):
+    """The cassette could not be read."""
+
+
+class CassetteMissError(requests.RequestException):
+    """A request was made which the cassette being replayed did not record.
+
+    It is not a connection error, so that it is never retried.
+    """
+
+
+class Cassette:
+    """Recorded responses, keyed by method, URL, and request body.
+
+    A cassette is mounted on the shared HTTP session with `http.use_cassette`,
+    so it sees every request made by the providers, to PyPI and to GitHub. In
+    record mode, every response is passed through and written to
+    `DIR/cassette.jsonl`, along with how long it took. In replay mode, recorded
+    responses are served instead, after the same delay, unless `latency=False`.
+
+    A request made several times is answered with its recorded responses in
+    order, and then with the last of them.
+    """
+
+    def __init__(
+        self, directory: pathlib.Path, *, mode: str, latency: bool = True
+    ) -> None:
+        if mode not in ("record", "replay"):
+            raise ValueError(f"unknown cassette mode: {mode!r}")
+        self.directory = directory
+        self.path = directory / CASSETTE_FILENAME
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._interactions: dict[_Key, collections.deque[dict[str, t.Any]]] = {}
+        self._file: t.TextIO | None = None
+
+        if mode == "record":
+            directory.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("w", encoding="utf-8")
+            self._write({"format_version": FORMAT_VERSION})
+        else:
+            self._load()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def has_requests_to(self, url_prefix: str) -> bool:
+        """Whether any recorded request was to a URL with this prefix."""
+        return any(url.startswith(url_prefix) for _, url, _ in self._interactions)
+
+    def adapter(self, inner: requests.adapters.BaseAdapter) -> CassetteAdapter:
+        """Wrap a transport adapter, which is used to send recorded requests."""
+        return CassetteAdapter(self, inner)
+
+    def record(
+        self,
+        request: requests.PreparedRequest,
+        response: requests.Response,
+        elapsed: float,
+    ) -> None:
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name.lower() not in _DROPPED_HEADERS
+        }
+        self._write(
+            {
+                "method": request.method,
+                "url": request.url,
+                "body_sha256": _body_digest(request),
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": headers,
+                "body": base64.b64encode(response.content).decode("ascii"),
+                "elapsed": elapsed,
+            }
+        )
+
+    def lookup(self, request: requests.PreparedRequest) -> dict[str, t.Any]:
+        key = (str(request.method), str(request.url), _body_digest(request))
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(
+                    f"no recorded response for {request.method} {request.url} "
+                    f"in {self.path}",
+                    request=request,
+                )
+            if len(recorded) > 1:
+                return recorded.popleft()
+            return recorded[0]
+
+    def _write(self, data: dict[str, t.Any]) -> None:
+        line = json.dumps(data) + "\n"
+        with self._lock:
+            assert self._file is not None
+            self._file.write(line)
+            # an interrupted run still leaves a usable cassette
+            self._file.flush()
+
+    def _load(self) -> None:
+        try:
+            with self.path.open(encoding="utf-8") as fp:
+                lines = [json.loads(line) for line in fp if line.strip()]
+        except OSError as e:
+            raise CassetteError(f"cannot read cassette {self.path}: {e}") from e
+        except ValueError as e:
+            raise CassetteError(f"cassette {self.path} is corrupt: {e}") from e
+
+        if not lines or lines[0].get("format_version") != FORMAT_VERSION:
+            raise CassetteError(
+                f"cassette {self.path} has an unsupported format, record it again"
+            )
+        for interaction in lines[1:]:
+            key = (
+                interaction["method"],
+                interaction["url"],
+                interaction["body_sha256"],
+            )
+            self._interactions.setdefault(key, collections.deque()).append(interaction)
+
+
+class CassetteAdapter(requests.adapters.BaseAdapter):
+    def __init__(
+        self, cassette: Cassette, inner: requests.adapters.BaseAdapter
+    ) -> None:
+        super().__init__()
+        self.cassette = cassette
+        self.inner = inner
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: t.Any = None,
+        verify: bool | str = True,
+        cert: t.Any = None,
+        proxies: t.Mapping[str, str] | None = None,
+    ) -> requests.Response:
+        if self.cassette.mode == "replay":
+            return self._replay(request)
+
+        start = time.perf_counter()
+        response = self.inner.send(
+            request,
+            stream=stream,
+            timeout=timeout,
+            verify=verify,
+            cert=cert,
+            proxies=proxies,
+        )
+        # the body is read in full, so that its time is included in the latency
+        response.content
+        self.cassette.record(request, response, time.perf_counter() - start)
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+
+    def _replay(self, request: requests.PreparedRequest) -> requests.Response:
+        interaction = self.cassette.lookup(request)
+        if self.cassette.latency:
+            time.sleep(interaction["elapsed"])
+
+        body = base64.b64decode(interaction["body"])
+        response = requests.Response()
+        response.status_code = interaction["status"]
+        response.reason = interaction["reason"]
+        response.headers = requests.structures.CaseInsensitiveDict(
+            interaction["headers"]
+        )
+        response.headers["Content-Length"] = str(len(body))
+        response.raw = io.BytesIO(body)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = str(request.url)
+        response.request = request
+        return response
+
+
+def pin_github_transport(cassette: Cassette) -> None:
+    """Make GitHub lookups use the transport which the cassette recorded.
+
+    Batched GraphQL queries are only used if the recording made them, with a
+    placeholder token, since credentials are never recorded.
+    """
+    from .providers.github import cli, graphql
+
+    for name in ("GH_TOKEN", "GITHUB_TOKEN"):
+        os.environ.pop(name, None)
+    if cassette.has_requests_to(graphql.GRAPHQL_URL):
+        cli.HAS_CLI, cli.TOKEN = True, "replayed-token"
+    else:
+        cli.HAS_CLI, cli.TOKEN = False, None
+
+
+def _body_digest(request: requests.PreparedRequest) -> str | None:
+    body = request.body
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode()
+    if not isinstance(body, bytes):
+        return None
+    return hashlib.sha256(body).hexdigest()
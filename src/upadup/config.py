@@ -14,6 +14,11 @@ if sys.version_info >= (3, 11):
 else:
     import tomli as tomllib
 
+from . import timing
+
+if t.TYPE_CHECKING:
+    from .providers.pypi.indexes import PackageIndex
+
 
 class BadConfigError(ValueError):
     def __init__(self, message: str) -> None:
@@ -21,18 +26,27 @@ class BadConfigError(ValueError):
 
 
 class Config:
-    def __init__(self, skip_repos: t.Iterable[str]) -> None:
+    def __init__(
+        self,
+        skip_repos: t.Iterable[str],
+        indexes: t.Iterable[PackageIndex] = (),
+    ) -> None:
         self._skip_repos = tuple(skip_repos)
+        self._indexes = tuple(indexes)
 
     @property
     def skip_repos(self) -> tuple[str, ...]:
         return self._skip_repos
 
+    @property
+    def indexes(self) -> tuple[PackageIndex, ...]:
+        return self._indexes
+
     @classmethod
     def _load_dict(cls, data: dict[str, t.Any]) -> Self:
         skip_repos: list[str] = []
 
-        unexpected_keys = list(set(data.keys()) - {"skip_repos"})
+        unexpected_keys = list(set(data.keys()) - {"skip_repos", "index_urls"})
 
         if unexpected_keys:
             raise BadConfigError(
@@ -49,34 +63,73 @@ class Config:
                         f"'tool.upadup.skip_repos[{i}]' was not a string"
                     )
 
-        return cls(skip_repos=skip_repos)
-
-    @classmethod
-    def load(cls) -> Self:
-        raw_config = _read_raw_config()
-        return cls._load_dict(raw_config)
+        indexes: list[PackageIndex] = []
+        if "index_urls" in data:
+            index_urls = data["index_urls"]
+            if not isinstance(index_urls, list):
+                raise BadConfigError("'tool.upadup.index_urls' should be a list")
+            for i, index_url in enumerate(index_urls):
+                indexes.append(_load_index(f"tool.upadup.index_urls[{i}]", index_url))
 
+        return cls(skip_repos=skip_repos, indexes=indexes)
 
-def _read_local_toml_file() -> dict[str, t.Any] | None:
-    path = pathlib.Path.cwd() / ".upadup.toml"
+    @classmethod
+    def load(cls, directory: pathlib.Path | None = None) -> Self:
+        """Load config from a directory, defaulting to the current directory."""
+        directory = directory or pathlib.Path.cwd()
+        with timing.span("load", "config", directory=str(directory)):
+            raw_config = _read_raw_config(directory)
+            return cls._load_dict(raw_config)
+
+
+def _load_index(name: str, data: t.Any) -> PackageIndex:
+    from .providers.pypi.indexes import PackageIndex
+
+    if isinstance(data, str):
+        return PackageIndex.from_url(data)
+    if not isinstance(data, dict):
+        raise BadConfigError(f"'{name}' was not a string or a table")
+
+    unexpected_keys = list(set(data.keys()) - {"url", "api", "timeout"})
+    if unexpected_keys:
+        raise BadConfigError(f"'{name}' contained unexpected keys: {unexpected_keys!r}")
+    if not isinstance(data.get("url"), str):
+        raise BadConfigError(f"'{name}.url' should be a string")
+    timeout = data.get("timeout")
+    if timeout is not None and (
+        isinstance(timeout, bool) or not isinstance(timeout, (int, float))
+    ):
+        raise BadConfigError(f"'{name}.timeout' should be a number")
+
+    try:
+        index = PackageIndex.from_url(data["url"], timeout=timeout)
+        if "api" in data:
+            index = PackageIndex(index.url, api=data["api"], timeout=timeout)
+    except ValueError as e:
+        raise BadConfigError(f"'{name}': {e}") from None
+    return index
+
+
+def _read_local_toml_file(directory: pathlib.Path) -> dict[str, t.Any] | None:
+    path = directory / ".upadup.toml"
     if not path.is_file():
         return None
     with path.open("rb") as fp:
         return tomllib.load(fp)
 
 
-def _read_pyproject_toml_file() -> dict[str, t.Any] | None:
-    path = pathlib.Path.cwd() / "pyproject.toml"
+def _read_pyproject_toml_file(directory: pathlib.Path) -> dict[str, t.Any] | None:
+    path = directory / "pyproject.toml"
     if not path.is_file():
         return None
     with path.open("rb") as fp:
         return tomllib.load(fp)
 
 
-def _read_raw_config() -> dict[str, t.Any]:
-    data = _read_local_toml_file()
+def _read_raw_config(directory: pathlib.Path) -> dict[str, t.Any]:
+    data = _read_local_toml_file(directory)
     if data is None:
-        data = _read_pyproject_toml_file()
+        data = _read_pyproject_toml_file(directory)
     if data is None:
         return {}
 
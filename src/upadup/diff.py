@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import itertools
+import re
+import typing as t
+
+if t.TYPE_CHECKING:
+    from . import yaml
+
+# the number of unchanged lines shown around each change, as in `diff -u`
+DEFAULT_CONTEXT = 3
+
+# the newlines on which `open(..., newline="")` splits lines
+_LINE_BREAK_PATTERN = re.compile(r"\r\n|\r|\n")
+
+
+def unified_diff(
+    text: str,
+    updates: t.Iterable[tuple[yaml.DependencyRecord, str]],
+    fromfile: str,
+    tofile: str,
+    *,
+    context: int = DEFAULT_CONTEXT,
+) -> str:
+    """Render the diff of updates to a config, in the format of `difflib`.
+
+    Hunks are built directly from the locations of the updates, so only the
+    changed lines and their context are visited, and the rest of the text is
+    never split into lines. Updates must not overlap, and each one replaces a
+    dependency which lies on a single line.
+
+    The output is the same as `difflib.unified_diff` over the lines of the old
+    and new text, with no dates, and with `"\\n"` after the header lines.
+    """
+    changed_lines = _group_by_line(text, updates)
+    if not changed_lines:
+        return ""
+
+    out = [f"--- {fromfile}\n", f"+++ {tofile}\n"]
+    for hunk in _group_hunks(changed_lines, context):
+        out.extend(_render_hunk(text, hunk, context))
+    return "".join(out)
+
+
+class _ChangedLine(t.NamedTuple):
+    lineno: int
+    start: int
+    end: int
+    new: str
+
+
+def _group_by_line(
+    text: str, updates: t.Iterable[tuple[yaml.DependencyRecord, str]]
+) -> list[_ChangedLine]:
+    changed = []
+    for lineno, group in itertools.groupby(
+        sorted(updates, key=lambda update: update[0].offset),
+        key=lambda update: update[0].line,
+    ):
+        line_updates = list(group)
+        first = line_updates[0][0]
+        start = first.offset - first.col
+        end = _next_line_start(text, first.offset)
+
+        parts = []
+        position = start
+        for record, new_dependency in line_updates:
+            offset = record.offset
+            parts.append(text[position:offset])
+            parts.append(new_dependency)
+            position = offset + len(record.dependency)
+        parts.append(text[position:end])
+        changed.append(_ChangedLine(lineno, start, end, "".join(parts)))
+    return changed
+
+
+def _group_hunks(
+    changed_lines: list[_ChangedLine], context: int
+) -> list[list[_ChangedLine]]:
+    # changes separated by no more than twice the context share a hunk
+    hunks = [[changed_lines[0]]]
+    for changed in changed_lines[1:]:
+        if changed.lineno - hunks[-1][-1].lineno - 1 > 2 * context:
+            hunks.append([changed])
+        else:
+            hunks[-1].append(changed)
+    return hunks
+
+
+def _render_hunk(text: str, hunk: list[_ChangedLine], context: int) -> t.Iterator[str]:
+    first, last = hunk[0], hunk[-1]
+
+    leading: list[str] = []
+    start = first.start
+    while start > 0 and len(leading) < min(context, first.lineno):
+        end, start = start, _previous_line_start(text, start)
+        leading.append(text[start:end])
+    leading.reverse()
+
+    trailing: list[str] = []
+    position = last.end
+    while position < len(text) and len(trailing) < context:
+        end = _next_line_start(text, position)
+        trailing.append(text[position:end])
+        position = end
+
+    first_lineno = first.lineno - len(leading)
+    length = last.lineno - first_lineno + 1 + len(trailing)
+    line_range = _format_range(first_lineno, length)
+    yield f"@@ -{line_range} +{line_range} @@\n"
+
+    for line in leading:
+        yield f" {line}"
+    # a run of consecutive changed lines shows every removal, then every addition
+    run: list[_ChangedLine] = []
+    for changed in hunk:
+        if run and changed.lineno != run[-1].lineno + 1:
+            yield from _render_run(text, run)
+            # the lines between two changes in a hunk are all shown as context
+            position = run[-1].end
+            while position < changed.start:
+                end = _next_line_start(text, position)
+                yield f" {text[position:end]}"
+                position = end
+            run = []
+        run.append(changed)
+    yield from _render_run(text, run)
+    for line in trailing:
+        yield f" {line}"
+
+
+def _render_run(text: str, run: list[_ChangedLine]) -> t.Iterator[str]:
+    for changed in run:
+        yield f"-{text[changed.start:changed.end]}"
+    for changed in run:
+        yield f"+{changed.new}"
+
+
+def _format_range(first_lineno: int, length: int) -> str:
+    # line numbers are one-based, and a single line is shown without a length
+    if length == 1:
+        return str(first_lineno + 1)
+    return f"{first_lineno + 1},{length}"
+
+
+def _next_line_start(text: str, position: int) -> int:
+    match = _LINE_BREAK_PATTERN.search(text, position)
+    if match is None:
+        return len(text)
+    return match.end()
+
+
+def _previous_line_start(text: str, line_start: int) -> int:
+    # step back over the newline which ends the previous line, then to its start
+    index = line_start - 1
+    if text[index] == "\n" and index > 0 and text[index - 1] == "\r":
+        index -= 1
+    while index > 0 and text[index - 1] not in "\r\n":
+        index -= 1
+    return index
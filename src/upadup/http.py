@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import threading
+import time
+import typing as t
+
+from . import timing
+
+# requests is imported only once a session is needed, so that runs which make no
+# lookups do not pay for importing it
+if t.TYPE_CHECKING:
+    import requests
+
+    from .cassette import Cassette
+    from .scheduler import Scheduler
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT: tuple[float, float] = (5.0, 30.0)
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+# the shortest timeout given to a request, which near the deadline would
+# otherwise be zero or less
+_MIN_TIMEOUT = 0.01
+
+
+class _Settings:
+    def __init__(self) -> None:
+        self.timeout = DEFAULT_TIMEOUT
+        self.pool_size = DEFAULT_POOL_SIZE
+        self.retries = DEFAULT_RETRIES
+        self.backoff_factor = DEFAULT_BACKOFF_FACTOR
+        self.cassette: Cassette | None = None
+        # a `time.monotonic()` value, after which no more requests are made
+        self.deadline: float | None = None
+
+
+_settings = _Settings()
+# every provider request goes through one shared session, so that connections
+# (and their TLS handshakes) are reused between lookups
+_session: requests.Session | None = None
+# and through one scheduler, which paces and retries the requests to each host
+_scheduler: Scheduler | None = None
+_session_lock = threading.Lock()
+
+
+def configure(
+    *,
+    timeout: tuple[float, float] | None = None,
+    pool_size: int | None = None,
+    retries: int | None = None,
+    backoff_factor: float | None = None,
+) -> None:
+    """Change the settings of the shared session and scheduler.
+
+    Any existing session is closed, and a new session and scheduler are created
+    on next use.
+    """
+    with _session_lock:
+        if timeout is not None:
+            _settings.timeout = timeout
+        if pool_size is not None:
+            _settings.pool_size = pool_size
+        if retries is not None:
+            _settings.retries = retries
+        if backoff_factor is not None:
+            _settings.backoff_factor = backoff_factor
+
+        _reset()
+
+
+def use_cassette(cassette: Cassette | None) -> None:
+    """Record the traffic of the shared session to a cassette, or replay it.
+
+    Any existing session is closed, and a new one is created on next use.
+    """
+    with _session_lock:
+        _settings.cassette = cassette
+        _reset()
+
+
+def set_deadline(deadline: float | None) -> None:
+    """Set a `time.monotonic()` value after which no more requests are made.
+
+    The timeouts of each request are cut short to end by the deadline, and
+    requests after it raise `scheduler.DeadlineExceededError`.
+    """
+    _settings.deadline = deadline
+
+
+def get_deadline() -> float | None:
+    """Get the `time.monotonic()` value set with `set_deadline`, if any."""
+    return _settings.deadline
+
+
+def time_remaining() -> float | None:
+    """Get the number of seconds until the deadline, if one is set."""
+    if _settings.deadline is None:
+        return None
+    return _settings.deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """Raise `scheduler.DeadlineExceededError` if the deadline has passed."""
+    remaining = time_remaining()
+    if remaining is not None and remaining <= 0:
+        from .scheduler import DeadlineExceededError
+
+        raise DeadlineExceededError("ran out of time")
+
+
+def get_session() -> requests.Session:
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def get_scheduler() -> Scheduler:
+    global _scheduler
+
+    with _session_lock:
+        if _scheduler is None:
+            from .scheduler import Scheduler
+
+            _scheduler = Scheduler(
+                max_concurrency=_settings.pool_size,
+                retries=_settings.retries,
+                backoff_factor=_settings.backoff_factor,
+            )
+        return _scheduler
+
+
+def get(url: str, **kwargs: t.Any) -> requests.Response:
+    """Send a GET request on the shared session, with the default timeouts."""
+    return _request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: t.Any) -> requests.Response:
+    """Send a POST request on the shared session, with the default timeouts."""
+    return _request("POST", url, **kwargs)
+
+
+def _request(method: str, url: str, **kwargs: t.Any) -> requests.Response:
+    timeout = kwargs.pop("timeout", _settings.timeout)
+    session = get_session()
+
+    def _send() -> requests.Response:
+        return session.request(method, url, timeout=_within_deadline(timeout), **kwargs)
+
+    with timing.span(method, "http", url=url) as info:
+        response = get_scheduler().request(
+            method, url, _send, deadline=_settings.deadline
+        )
+        info["status"] = response.status_code
+        # a streamed body has not been read yet, and is measured by the caller
+        if not kwargs.get("stream"):
+            info["bytes"] = len(response.content)
+    return response
+
+
+def _within_deadline(timeout: t.Any) -> t.Any:
+    # each attempt of a request is cut short to end by the deadline
+    remaining = time_remaining()
+    if remaining is None:
+        return timeout
+    remaining = max(remaining, _MIN_TIMEOUT)
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def _reset() -> None:
+    global _session, _scheduler
+
+    if _session is not None:
+        _session.close()
+        _session = None
+    _scheduler = None
+
+
+def _build_session() -> requests.Session:
+    import requests
+    import requests.adapters
+
+    # requests are retried by the scheduler, rather than by the adapter
+    adapter: requests.adapters.BaseAdapter = requests.adapters.HTTPAdapter(
+        pool_connections=_settings.pool_size,
+        pool_maxsize=_settings.pool_size,
+    )
+    if _settings.cassette is not None:
+        adapter = _settings.cassette.adapter(adapter)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
@@ -1,12 +1,110 @@
 from __future__ import annotations
 
 import argparse
+import json
+import pathlib
 import sys
+import time
+import typing as t
 
-from .updater import UpadupUpdater
+from . import http, timing
+from .cache import Store, VersionCache
+from .config import Config
+from .resolver import DEFAULT_JOBS, ENGINES
+from .snapshot import IndexSnapshot, SnapshotError, SnapshotLookupError
+
+# the updater and the providers are imported only once arguments are parsed, so
+# that `--help` and argument errors are fast
+if t.TYPE_CHECKING:
+    from .cassette import Cassette
+    from .providers import pypi
+    from .updater import UncheckedDependency
+    from .workspace import Workspace
+
+# the exit status when some lookups were given up on, because of `--timeout`
+EXIT_TIMED_OUT = 3
+
+
+def _positive_int(value: str) -> int:
+    try:
+        ret = int(value)
+    except ValueError:
+        ret = 0
+    if ret < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return ret
+
+
+def _existing_path(value: str) -> pathlib.Path:
+    path = pathlib.Path(value)
+    if not path.exists():
+        raise argparse.ArgumentTypeError(f"no such file or directory: {value!r}")
+    return path
+
+
+def _existing_file(value: str) -> pathlib.Path:
+    path = _existing_path(value)
+    if not path.is_file():
+        raise argparse.ArgumentTypeError(f"not a file: {value!r}")
+    return path
+
+
+def _positive_float(value: str) -> float:
+    try:
+        ret = float(value)
+    except ValueError:
+        ret = 0
+    if not ret > 0:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value!r}")
+    return ret
+
+
+def _add_index_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--index-url",
+        help=(
+            "a package index to look up versions in, tried in the order given "
+            "(may be repeated, default: https://pypi.org/pypi)"
+        ),
+        action="append",
+        metavar="URL",
+    )
+    parser.add_argument(
+        "--index-timeout",
+        help="the latency budget for a lookup on each package index, in seconds",
+        type=_positive_float,
+        metavar="SECONDS",
+    )
+
+
+def _select_indexes(
+    parser: argparse.ArgumentParser, args: argparse.Namespace
+) -> tuple[pypi.PackageIndex, ...] | None:
+    # without index options, the updater chooses indexes once it needs them
+    if args.index_url is None and args.index_timeout is None:
+        return None
+
+    from .providers import pypi
+
+    try:
+        return pypi.select_indexes(
+            urls=args.index_url,
+            timeout=args.index_timeout,
+            configured=Config.load().indexes,
+        )
+    except ValueError as e:
+        parser.error(str(e))
 
 
 def main(argv: list[str] | None = None) -> None:
+    argv = argv or sys.argv[1:]
+    if argv[:1] == ["cache"]:
+        _cache_main(argv[1:])
+        return
+    if argv[:1] == ["index"]:
+        _index_main(argv[1:])
+        return
+
     parser = argparse.ArgumentParser(
         description="upadup -- the pre-commit additional_dependencies updater"
     )
@@ -16,24 +114,359 @@ def main(argv: list[str] | None = None) -> None:
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--exit-first",
+        help=(
+            "with --check, stop as soon as one update is found, without showing a "
+            "diff"
+        ),
+        action="store_true",
+        default=False,
+    )
     parser.add_argument(
         "--freeze",
         help="freeze to commit SHAs, where applicable",
         action="store_true",
         default=False,
     )
-    args = parser.parse_args(argv or sys.argv[1:])
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        help=f"the number of lookups to run concurrently (default: {DEFAULT_JOBS})",
+        type=_positive_int,
+        default=DEFAULT_JOBS,
+    )
+    parser.add_argument(
+        "--engine",
+        help=(
+            "the engine used to schedule concurrent lookups, which run on a "
+            "thread pool with either engine (default: threads)"
+        ),
+        choices=tuple(ENGINES),
+        default="threads",
+    )
+    parser.add_argument(
+        "--no-cache",
+        help="do not read or write the persistent version cache",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--refresh",
+        help="revalidate all cached versions, even if they are still fresh",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--index-snapshot",
+        help="answer all lookups from an index snapshot, without network access",
+        type=pathlib.Path,
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--timings",
+        help="show how long each kind of work took, once done",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "--trace",
+        help="write a trace of the run to FILE, in the Chrome trace event format",
+        type=pathlib.Path,
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--timeout",
+        help=(
+            "give up on lookups which are not done after SECONDS, apply or show "
+            f"the updates found so far, and exit with status {EXIT_TIMED_OUT}"
+        ),
+        type=_positive_float,
+        metavar="SECONDS",
+    )
+    cassettes = parser.add_mutually_exclusive_group()
+    cassettes.add_argument(
+        "--record",
+        help="record every PyPI and GitHub response to a cassette in DIR",
+        type=pathlib.Path,
+        metavar="DIR",
+    )
+    cassettes.add_argument(
+        "--replay",
+        help="answer every PyPI and GitHub request from the cassette in DIR",
+        type=pathlib.Path,
+        metavar="DIR",
+    )
+    parser.add_argument(
+        "--replay-latency",
+        help=(
+            "with --replay, delay each response as long as it originally took, or "
+            "not at all (default: original)"
+        ),
+        choices=("original", "zero"),
+    )
+    _add_index_arguments(parser)
+    targets = parser.add_mutually_exclusive_group()
+    targets.add_argument(
+        "--recursive",
+        "-r",
+        help="update every .pre-commit-config.yaml found under these paths",
+        nargs="+",
+        type=_existing_path,
+        metavar="PATH",
+    )
+    targets.add_argument(
+        "--files",
+        help="update these pre-commit config files",
+        nargs="+",
+        type=_existing_file,
+        metavar="FILE",
+    )
+    args = parser.parse_args(argv)
+    if args.index_snapshot and args.refresh:
+        parser.error("--refresh cannot be used with --index-snapshot")
+    if args.exit_first and not args.check:
+        parser.error("--exit-first can only be used with --check")
+    if args.index_snapshot and (args.record or args.replay):
+        parser.error("--record and --replay cannot be used with --index-snapshot")
+    if args.replay_latency and not args.replay:
+        parser.error("--replay-latency can only be used with --replay")
+    indexes = _select_indexes(parser, args)
+
+    if args.timeout:
+        http.set_deadline(time.monotonic() + args.timeout)
+    cassette = _open_cassette(args)
+    recorder = timing.SpanRecorder() if args.timings or args.trace else None
+    try:
+        with timing.collect(recorder):
+            _update_main(args, indexes)
+    finally:
+        http.set_deadline(None)
+        if cassette is not None:
+            cassette.close()
+        if recorder is not None:
+            _report_spans(recorder, args)
+
 
-    updater = UpadupUpdater(freeze=args.freeze)
-    updater.run()
+def _open_cassette(args: argparse.Namespace) -> Cassette | None:
+    if not (args.record or args.replay):
+        return None
+
+    from .cassette import Cassette, CassetteError, pin_github_transport
+
+    try:
+        if args.record:
+            cassette = Cassette(args.record, mode="record")
+        else:
+            cassette = Cassette(
+                args.replay, mode="replay", latency=args.replay_latency != "zero"
+            )
+    except (OSError, CassetteError) as e:
+        sys.exit(f"upadup: {e}")
+    if cassette.mode == "replay":
+        pin_github_transport(cassette)
+    http.use_cassette(cassette)
+    return cassette
 
+
+def _update_main(
+    args: argparse.Namespace, indexes: tuple[pypi.PackageIndex, ...] | None
+) -> None:
+    # size the connection pool so that every concurrent lookup can keep a
+    # connection alive
+    http.configure(pool_size=max(args.jobs, http.DEFAULT_POOL_SIZE))
+
+    version_cache: Store | None
+    if args.index_snapshot:
+        try:
+            version_cache = IndexSnapshot(args.index_snapshot)
+        except SnapshotError as e:
+            sys.exit(f"upadup: {e}")
+    elif args.no_cache or args.record or args.replay:
+        # every lookup goes to the cassette, and replayed results are not cached
+        version_cache = None
+    else:
+        version_cache = VersionCache.open_default()
+
+    from .updater import ConfigChangedError, UpadupUpdater
+
+    updater: UpadupUpdater | Workspace
+    if args.recursive or args.files:
+        from . import workspace
+
+        paths = args.files or workspace.find_config_files(args.recursive)
+        if not paths:
+            print("no pre-commit configs found")
+            return
+        updater = workspace.Workspace(
+            paths,
+            freeze=args.freeze,
+            jobs=args.jobs,
+            engine=args.engine,
+            version_cache=version_cache,
+            refresh=args.refresh,
+            indexes=indexes,
+        )
+    else:
+        updater = UpadupUpdater(
+            freeze=args.freeze,
+            jobs=args.jobs,
+            engine=args.engine,
+            version_cache=version_cache,
+            refresh=args.refresh,
+            indexes=indexes,
+        )
+    if args.exit_first:
+        try:
+            found = updater.find_first_update()
+        except SnapshotLookupError as e:
+            sys.exit(f"upadup: {e}")
+        if found is None:
+            unchecked = updater.unchecked_dependencies()
+            if unchecked:
+                _exit_unchecked(unchecked)
+            print("no updates needed in any hook configs")
+            return
+        print(
+            f"{found.updater.display_name}: update found, "
+            f"{found.record.dependency} => {found.new_dependency}"
+        )
+        sys.exit(1)
+
+    try:
+        updater.run()
+    except SnapshotLookupError as e:
+        sys.exit(f"upadup: {e}")
+
+    unchecked = updater.unchecked_dependencies()
     if updater.has_updates():
         if args.check:
             print(updater.render_diff())
+            if unchecked:
+                _exit_unchecked(unchecked)
             sys.exit(1)
         else:
             print("apply updates...", end="")
-            updater.apply_updates()
+            try:
+                updater.apply_updates()
+            except ConfigChangedError as e:
+                print()
+                sys.exit(f"upadup: {e}")
             print("done")
-    else:
+    elif not unchecked:
         print("no updates needed in any hook configs")
+    if unchecked:
+        _exit_unchecked(unchecked)
+
+
+def _exit_unchecked(unchecked: list[UncheckedDependency]) -> t.NoReturn:
+    from .scheduler import DeadlineExceededError
+
+    print(f"upadup: {len(unchecked)} dependencies were not checked", file=sys.stderr)
+    for item in unchecked:
+        print(
+            f"  {item.updater.display_name}: {item.record.dependency} "
+            f"({item.error})",
+            file=sys.stderr,
+        )
+    if any(isinstance(item.error, DeadlineExceededError) for item in unchecked):
+        sys.exit(EXIT_TIMED_OUT)
+    sys.exit(1)
+
+
+def _report_spans(recorder: timing.SpanRecorder, args: argparse.Namespace) -> None:
+    # the summary goes to stderr, so that it is not mixed into a diff
+    if args.timings:
+        print(recorder.format_summary(), file=sys.stderr)
+    if args.trace:
+        recorder.write_chrome_trace(args.trace)
+        print(
+            f"wrote a trace of {len(recorder.spans)} spans to {args.trace}",
+            file=sys.stderr,
+        )
+
+
+def _cache_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="upadup cache", description="inspect or clear the upadup version cache"
+    )
+    parser.add_argument("action", choices=("info", "clear"))
+    args = parser.parse_args(argv)
+
+    version_cache = VersionCache.open_default()
+    if version_cache is None:
+        sys.exit(1)
+
+    if args.action == "info":
+        print(json.dumps(version_cache.info(), indent=2))
+    else:
+        removed = version_cache.clear()
+        print(f"removed {removed} entries from {version_cache.path}")
+
+
+def _index_main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="upadup index",
+        description="build an index snapshot, for use with --index-snapshot",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    build_parser = subparsers.add_parser(
+        "build", help="look up packages and GitHub repos, and write a snapshot"
+    )
+    build_parser.add_argument("output", help="the snapshot file", type=pathlib.Path)
+    build_parser.add_argument(
+        "--package",
+        help="a package to include (may be repeated)",
+        action="append",
+        default=[],
+        metavar="NAME",
+    )
+    build_parser.add_argument(
+        "--repo",
+        help="a GitHub repo to include (may be repeated)",
+        action="append",
+        default=[],
+        metavar="OWNER/REPO",
+    )
+    _add_index_arguments(build_parser)
+    build_parser.add_argument(
+        "--recursive",
+        "-r",
+        help="include the dependencies of every pre-commit config under these paths",
+        nargs="+",
+        default=[],
+        type=_existing_path,
+        metavar="PATH",
+    )
+    build_parser.add_argument(
+        "--jobs",
+        "-j",
+        help=f"the number of lookups to run concurrently (default: {DEFAULT_JOBS})",
+        type=_positive_int,
+        default=DEFAULT_JOBS,
+    )
+    args = parser.parse_args(argv)
+    indexes = _select_indexes(build_parser, args)
+
+    from .snapshot import build_snapshot
+    from .updater import UpadupUpdater
+    from .workspace import find_config_files
+
+    package_names = set(args.package)
+    repo_names = set(args.repo)
+    for path in find_config_files(args.recursive):
+        updater = UpadupUpdater(path, config_dir=path.parent)
+        updater_package_names, updater_repo_names = updater.collect_lookups()
+        package_names |= updater_package_names
+        repo_names |= updater_repo_names
+    if not package_names and not repo_names:
+        parser.error("nothing to include, use --package, --repo, or --recursive")
+
+    http.configure(pool_size=max(args.jobs, http.DEFAULT_POOL_SIZE))
+    try:
+        count = build_snapshot(
+            args.output, package_names, repo_names, jobs=args.jobs, indexes=indexes
+        )
+    except SnapshotError as e:
+        sys.exit(f"upadup: {e}")
+    print(f"wrote {count} entries to {args.output}")
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+# a lookup which failed in a way that is not expected to change soon, such as
+# of a package which does not exist, is remembered for this many seconds, so
+# that repeated runs do not keep looking it up
+NEGATIVE_TTL = 600.0
+
+# statuses which mean that a package or repo does not exist, or is private
+_MISSING_STATUSES = frozenset({404, 410})
+
+
+class LookupFailedError(Exception):
+    """A package or repo has no version to update to, or is remembered from an
+    earlier run as having none."""
+
+    # whether the lookup would fail again if it were retried soon
+    lasting = True
+
+
+class TransientLookupError(LookupFailedError):
+    """A lookup failed in a way which may not happen again, such as a query
+    which GitHub could not answer this time."""
+
+    lasting = False
+
+
+def is_lookup_failure(error: BaseException) -> bool:
+    """Whether an error from a lookup is a failure of that one lookup, which is
+    recorded and reported, rather than a reason to stop the run."""
+    import requests
+
+    return isinstance(error, (requests.RequestException, LookupFailedError))
+
+
+def is_lasting_failure(error: BaseException) -> bool:
+    """Whether a failed lookup would fail again if it were retried soon.
+
+    These are missing packages and repos, and responses without any usable
+    version. Timeouts, connection errors, and server errors are not.
+    """
+    import requests
+
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        return response is not None and response.status_code in _MISSING_STATUSES
+    return isinstance(error, LookupFailedError) and error.lasting
@@ -1,19 +1,153 @@
+from __future__ import annotations
+
 import typing as t
 
-import requests
+from ... import http
+from ..failures import TransientLookupError
+from .rate_limit import RateLimit, RateLimitExceededError, is_rate_limited
+from .tags import DEFAULT_MAX_PAGES, DEFAULT_PAGE_SIZE, scan_tag_pages
+
+if t.TYPE_CHECKING:
+    import requests
+
+API_URL = "https://api.github.com"
+
+# the quota of the REST API is shared by every lookup in the process
+RATE_LIMIT = RateLimit()
+# a request refused by a rate limit is sent again at most this many times, once
+# the limit allows it
+_RATE_LIMITED_RETRIES = 2
+
+
+class TagsResponse(t.NamedTuple):
+    tags: list[dict[str, t.Any]]
+    # the ETag of the first page, if no other page was needed
+    etag: str | None
+
+
+def fetch_tags(
+    owner: str,
+    repo: str,
+    *,
+    etag: str | None = None,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    token: str | None = None,
+) -> TagsResponse | None:
+    """Get recent tags for a repo, along with the ETag of the tags.
+
+    If an ETag is given, the first page is requested conditionally, and if
+    GitHub reports that it has not changed, return None. An ETag is only
+    returned when the tags were found from the first page alone, so that an
+    unchanged first page always means unchanged tags.
+
+    :raises RateLimitExceededError: if the rate limit was used up, and would not
+        reset soon
+    """
+    pages = _iter_tag_responses(
+        owner, repo, etag=etag, per_page=per_page, max_pages=max_pages, token=token
+    )
+    first = next(pages)
+    if first.status_code == 304:
+        return None
+
+    read = 1
+
+    def _read_pages() -> t.Iterator[list[dict[str, t.Any]]]:
+        nonlocal read
+        yield _read_page(first)
+        for response in pages:
+            read += 1
+            yield _read_page(response)
+
+    tags = scan_tag_pages(_read_pages())
+    return TagsResponse(tags, first.headers.get("ETag") if read == 1 else None)
 
 
 def get_tags_json(
     owner: str,
     repo: str,
+    *,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    token: str | None = None,
 ) -> list[dict[str, t.Any]]:
-    """Get recent tags for a repo."""
+    """Get recent tags for a repo, reading only as many pages as needed."""
 
-    endpoint = f"https://api.github.com/repos/{owner}/{repo}/tags/"
+    response = fetch_tags(
+        owner, repo, per_page=per_page, max_pages=max_pages, token=token
+    )
+    assert response is not None  # no ETag was sent
+    return response.tags
+
+
+def iter_tag_pages(
+    owner: str,
+    repo: str,
+    *,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    token: str | None = None,
+) -> t.Iterator[list[dict[str, t.Any]]]:
+    """Get pages of tags for a repo, following the `Link` header between pages.
+
+    Each page is only requested once the previous one has been consumed.
+    """
+
+    for response in _iter_tag_responses(
+        owner, repo, per_page=per_page, max_pages=max_pages, token=token
+    ):
+        yield _read_page(response)
+
+
+def _iter_tag_responses(
+    owner: str,
+    repo: str,
+    *,
+    etag: str | None = None,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
+    token: str | None = None,
+) -> t.Iterator[requests.Response]:
+    url: str | None = f"{API_URL}/repos/{owner}/{repo}/tags/"
+    params: dict[str, t.Any] | None = {"per_page": per_page}
     headers = {
         "Accept": "application/vnd.github.v3+json",
         "X-GitHub-Api-Version": "2022-11-28",
     }
-    response = requests.get(url=endpoint, headers=headers)
+    if token is not None:
+        headers["Authorization"] = f"Bearer {token}"
+    if etag is not None:
+        # GitHub does not count 304 responses against the rate limit
+        headers["If-None-Match"] = etag
+    for _ in range(max_pages):
+        if url is None:
+            return
+        response = _get(url, headers=headers, params=params)
+        yield response
+
+        # the next URL includes all query params
+        url = response.links.get("next", {}).get("url")
+        params = None
+        headers.pop("If-None-Match", None)
+
+
+def _get(
+    url: str, *, headers: dict[str, str], params: dict[str, t.Any] | None
+) -> requests.Response:
+    for _ in range(_RATE_LIMITED_RETRIES + 1):
+        RATE_LIMIT.acquire(deadline=http.get_deadline())
+        response = http.get(url, headers=headers, params=params)
+        RATE_LIMIT.update(response)
+        if not is_rate_limited(response):
+            return response
+    raise RateLimitExceededError(RATE_LIMIT.reset_at)
+
 
-    return response.json()
+def _read_page(response: requests.Response) -> list[dict[str, t.Any]]:
+    # errors have a JSON object as their body, with a message
+    response.raise_for_status()
+    page = response.json()
+    if not isinstance(page, list):
+        raise TransientLookupError(f"expected a list of tags from {response.url}")
+    return page
@@ -1,13 +1,25 @@
-import json
+from __future__ import annotations
+
 import shutil
 import subprocess
 import typing as t
 
-HAS_CLI = None
+from ... import http
+from . import api
+from .tags import DEFAULT_MAX_PAGES, DEFAULT_PAGE_SIZE
+
+HAS_CLI: bool | None = None
+TOKEN: str | None = None
+
+# the longest wait for `gh auth token`, in seconds
+GH_TIMEOUT = 10.0
 
 
 def has_cli() -> bool:
-    """Determine if the gh executable is available, and has a valid session active."""
+    """Determine if the gh executable is available, and has a valid session active.
+
+    This is the case if gh gives a token, which is then reused by `get_token`.
+    """
 
     global HAS_CLI
     if HAS_CLI is not None:
@@ -15,24 +27,73 @@ def has_cli() -> bool:
 
     if shutil.which("gh") is None:
         HAS_CLI = False
-    else:
-        cmd = "gh auth status".split()
-        completed_process = subprocess.run(cmd, capture_output=True)
-        HAS_CLI = completed_process.returncode == 0
+        return HAS_CLI
+
+    try:
+        HAS_CLI = get_token() is not None
+    except subprocess.TimeoutExpired:
+        HAS_CLI = False
 
     return HAS_CLI
 
 
+def get_token() -> str | None:
+    """Get the token of the active gh session, running gh at most once."""
+
+    global TOKEN
+    if TOKEN is None:
+        TOKEN = _load_token()
+    return TOKEN
+
+
+def fetch_tags(
+    owner: str,
+    repo: str,
+    *,
+    etag: str | None = None,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
+) -> api.TagsResponse | None:
+    """Get recent tags for a repo and their ETag, authenticated as the gh user."""
+
+    return api.fetch_tags(
+        owner,
+        repo,
+        etag=etag,
+        per_page=per_page,
+        max_pages=max_pages,
+        token=get_token(),
+    )
+
+
 def get_tags_json(
     owner: str,
     repo: str,
+    *,
+    per_page: int = DEFAULT_PAGE_SIZE,
+    max_pages: int = DEFAULT_MAX_PAGES,
 ) -> list[dict[str, t.Any]]:
-    """Get recent tags for a repo."""
+    """Get recent tags for a repo, authenticated as the gh user."""
+
+    return api.get_tags_json(
+        owner, repo, per_page=per_page, max_pages=max_pages, token=get_token()
+    )
 
-    command = ["gh", "api"]
-    command.extend(["-H", "Accept: application/vnd.github+json"])
-    command.extend(["-H", "X-GitHub-Api-Version: 2022-11-28"])
-    command.append(f"/repos/{owner}/{repo}/tags")
-    stdout = subprocess.check_output(command, encoding="utf-8")
 
-    return json.loads(stdout)
+def _load_token() -> str | None:
+    timeout = GH_TIMEOUT
+    remaining = http.time_remaining()
+    if remaining is not None:
+        timeout = max(0.0, min(timeout, remaining))
+    try:
+        completed_process = subprocess.run(
+            ["gh", "auth", "token"],
+            capture_output=True,
+            encoding="utf-8",
+            timeout=timeout,
+        )
+    except OSError:
+        return None
+    if completed_process.returncode != 0:
+        return None
+    return completed_process.stdout.strip() or None
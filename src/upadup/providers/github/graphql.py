@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import os
+import typing as t
+
+from ... import http
+from ..failures import TransientLookupError
+from . import cli
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+# the number of repos looked up in a single query
+# this keeps each query far below GitHub's limits on the number of nodes
+BATCH_SIZE = 100
+# the number of tags fetched for each repo
+TAGS_PER_REPO = 100
+
+_REPO_FRAGMENT = """\
+  r{index}: repository(owner: $owner{index}, name: $name{index}) {{
+    refs(
+      refPrefix: "refs/tags/"
+      first: {tags_per_repo}
+      orderBy: {{field: TAG_COMMIT_DATE, direction: DESC}}
+    ) {{
+      nodes {{
+        name
+        target {{
+          oid
+          ... on Tag {{ target {{ oid }} }}
+        }}
+      }}
+    }}
+  }}
+"""
+
+
+def get_token() -> str | None:
+    """Get a GitHub token from the environment or from gh, if one is available.
+
+    The GraphQL API cannot be used without authentication.
+    """
+    token = os.environ.get("GH_TOKEN") or os.environ.get("GITHUB_TOKEN")
+    if token:
+        return token
+    if cli.has_cli():
+        return cli.get_token()
+    return None
+
+
+def build_query(count: int) -> str:
+    """Build a query which looks up the tags of `count` repos at once."""
+    params = ", ".join(
+        f"$owner{index}: String!, $name{index}: String!" for index in range(count)
+    )
+    fragments = "".join(
+        _REPO_FRAGMENT.format(index=index, tags_per_repo=TAGS_PER_REPO)
+        for index in range(count)
+    )
+    return f"query({params}) {{\n{fragments}}}\n"
+
+
+def get_tags_json_batch(
+    repos: t.Iterable[tuple[str, str]], *, token: str
+) -> dict[tuple[str, str], list[dict[str, t.Any]] | None]:
+    """Get recent tags for many repos, with one request per batch of repos.
+
+    Tags are returned in the same shape as the REST API tags list, so that
+    the same version selection applies to both. Repos which do not exist map to
+    None.
+
+    :raises TransientLookupError: if GitHub reported any other error, such as a
+        rate limit
+    """
+    repos = list(dict.fromkeys(repos))
+    result: dict[tuple[str, str], list[dict[str, t.Any]] | None] = {}
+    for start in range(0, len(repos), BATCH_SIZE):
+        end = start + BATCH_SIZE
+        result.update(_query_batch(repos[start:end], token=token))
+    return result
+
+
+def _query_batch(
+    repos: list[tuple[str, str]], *, token: str
+) -> dict[tuple[str, str], list[dict[str, t.Any]] | None]:
+    variables: dict[str, str] = {}
+    for index, (owner, repo) in enumerate(repos):
+        variables[f"owner{index}"] = owner
+        variables[f"name{index}"] = repo
+
+    response = http.post(
+        GRAPHQL_URL,
+        json={"query": build_query(len(repos)), "variables": variables},
+        headers={"Authorization": f"bearer {token}"},
+    )
+    response.raise_for_status()
+    body = response.json()
+    data = body.get("data")
+    errors = body.get("errors") or []
+
+    # repos which do not exist have a null repository, and a NOT_FOUND error
+    # any other error, such as RATE_LIMITED, fails the whole batch
+    not_found = set()
+    for error in errors:
+        if error.get("type") != "NOT_FOUND" or not error.get("path"):
+            message = error.get("message") or error.get("type")
+            raise TransientLookupError(f"GitHub GraphQL query failed: {message}")
+        not_found.add(error["path"][0])
+    if data is None:
+        raise TransientLookupError("GitHub GraphQL query returned no data")
+
+    result: dict[tuple[str, str], list[dict[str, t.Any]] | None] = {}
+    for index, (owner, repo) in enumerate(repos):
+        repository = data.get(f"r{index}")
+        if repository is not None:
+            result[(owner, repo)] = _convert_refs(repository)
+        elif f"r{index}" in not_found:
+            result[(owner, repo)] = None
+        else:
+            raise TransientLookupError(
+                f"GitHub GraphQL query returned no data for {owner}/{repo}"
+            )
+    return result
+
+
+def _convert_refs(repository: dict[str, t.Any]) -> list[dict[str, t.Any]]:
+    tags = []
+    for node in repository["refs"]["nodes"]:
+        target = node["target"]
+        # annotated tags point at a tag object, which in turn points at a commit
+        sha = target["target"]["oid"] if "target" in target else target["oid"]
+        tags.append({"name": node["name"], "commit": {"sha": sha}})
+    return tags
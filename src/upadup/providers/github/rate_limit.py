@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+import time
+import typing as t
+
+if t.TYPE_CHECKING:
+    import requests
+
+# a lookup waits for the rate limit to reset, or for a `Retry-After` delay, for
+# at most this many seconds; lookups which would wait longer are deferred
+DEFAULT_MAX_WAIT = 10.0
+
+
+class RateLimitExceededError(Exception):
+    """A GitHub lookup was deferred, since the API rate limit was used up."""
+
+    def __init__(self, resume_at: float | None) -> None:
+        self.resume_at = resume_at
+        message = "GitHub API rate limit exceeded"
+        if resume_at is not None:
+            clock = time.strftime("%H:%M:%S", time.localtime(resume_at))
+            message += f", until {clock}"
+        super().__init__(message)
+
+
+class RateLimit:
+    """The remaining quota of the GitHub REST API, as reported by its responses.
+
+    Each request takes one unit of the quota before it is sent, so that
+    concurrent lookups do not overrun it. Once the quota is used up, or GitHub
+    has asked for requests to stop with `Retry-After`, requests wait until they
+    may resume, if that is within `max_wait` seconds. Otherwise, they raise
+    `RateLimitExceededError`. They never wait past the deadline of the run.
+    """
+
+    def __init__(self, *, max_wait: float = DEFAULT_MAX_WAIT) -> None:
+        self.max_wait = max_wait
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self, *, deadline: float | None = None) -> None:
+        """Take one request from the quota, waiting or raising if none is left.
+
+        `deadline` is a `time.monotonic()` value, as used by the scheduler.
+
+        :raises RateLimitExceededError: if the wait would exceed `max_wait`
+        :raises DeadlineExceededError: if the wait would pass the deadline
+        """
+        while True:
+            with self._lock:
+                now = time.time()
+                resume_at = self._resume_at(now)
+                if resume_at is None:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    return
+            wait = resume_at - now
+            if wait > self.max_wait:
+                raise RateLimitExceededError(resume_at)
+            if deadline is not None and time.monotonic() + wait >= deadline:
+                from ...scheduler import DeadlineExceededError
+
+                raise DeadlineExceededError(
+                    "ran out of time waiting for the GitHub API rate limit"
+                )
+            time.sleep(wait)
+
+    def update(self, response: requests.Response) -> None:
+        """Record the quota reported by a response."""
+        headers = response.headers
+        limit = _int_header(headers, "X-RateLimit-Limit")
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset_at = _int_header(headers, "X-RateLimit-Reset")
+        retry_after = _int_header(headers, "Retry-After")
+
+        with self._lock:
+            if limit is not None:
+                self.limit = limit
+            if remaining is not None:
+                if self.remaining is None or reset_at != self.reset_at:
+                    self.remaining = remaining
+                else:
+                    # responses to concurrent requests arrive in any order, and
+                    # the quota within one window only goes down
+                    self.remaining = min(self.remaining, remaining)
+                self.reset_at = reset_at
+            if retry_after is not None:
+                self._blocked_until = max(
+                    self._blocked_until, time.time() + retry_after
+                )
+
+    def _resume_at(self, now: float) -> float | None:
+        if now < self._blocked_until:
+            return self._blocked_until
+        if self.remaining is None or self.remaining > 0:
+            return None
+        if self.reset_at is None or self.reset_at <= now:
+            # the quota has been reset, and is unknown until the next response
+            self.remaining = None
+            return None
+        return self.reset_at
+
+
+def is_rate_limited(response: requests.Response) -> bool:
+    """Whether a response refused a request because of a rate limit.
+
+    GitHub uses 403 and 429 responses, along with either an exhausted quota or
+    a `Retry-After` delay.
+    """
+    if response.status_code not in (403, 429):
+        return False
+    return (
+        response.headers.get("X-RateLimit-Remaining") == "0"
+        or "Retry-After" in response.headers
+    )
+
+
+def _int_header(headers: t.Mapping[str, str], name: str) -> int | None:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
@@ -0,0 +1,314 @@
+from __future__ import annotations
+
+import json
+import typing as t
+from collections.abc import Mapping
+
+import packaging.version
+
+from ... import timing
+from ..failures import (
+    NEGATIVE_TTL,
+    LookupFailedError,
+    is_lasting_failure,
+    is_lookup_failure,
+)
+from . import api, cli, graphql
+from .rate_limit import RateLimitExceededError
+from .tags import is_stable, parse_tag_version
+
+if t.TYPE_CHECKING:
+    from ...cache import CacheEntry, Store
+
+_CACHE_NAMESPACE = "github"
+# repos which could not be looked up, kept for `NEGATIVE_TTL`
+_MISSING_NAMESPACE = "github-missing"
+
+
+def parse_dependency(string: str) -> tuple[str, str]:
+    """Get the owner and repo of a GitHub-based dependency."""
+    # Known formats:
+    #
+    #   github.com/{owner}/{repo}/{sub_path}@{tag}
+    #
+    uri, _, _ = string.partition("@")
+    host, owner, repo, *_ = uri.split("/")
+    if host != "github.com":
+        raise ValueError("Not a GitHub-based dependency")
+    return owner, repo
+
+
+def _normalize_repo_name(name: str) -> str:
+    # GitHub owner and repo names are case-insensitive
+    return name.lower()
+
+
+def _split_repo_name(name: str) -> tuple[str, str]:
+    owner, _, repo = name.partition("/")
+    return owner, repo
+
+
+def fetch_tags(
+    owner: str, repo: str, *, etag: str | None = None
+) -> api.TagsResponse | None:
+    if cli.has_cli():
+        return cli.fetch_tags(owner, repo, etag=etag)
+    return api.fetch_tags(owner, repo, etag=etag)
+
+
+def get_tags_json(owner: str, repo: str) -> list[dict[str, t.Any]]:
+    if cli.has_cli():
+        return cli.get_tags_json(owner, repo)
+    return api.get_tags_json(owner, repo)
+
+
+class TagInfo(t.NamedTuple):
+    name: str
+    sha: str
+
+
+class TagIndex:
+    """The stable, version-like tags of one repo."""
+
+    def __init__(self, tags: Mapping[packaging.version.Version, TagInfo]) -> None:
+        self._tags = dict(tags)
+
+    @classmethod
+    def from_tags_json(cls, response: t.Iterable[dict[str, t.Any]]) -> TagIndex:
+        tags = {}
+        for tag_info in response:
+            version = parse_tag_version(tag_info["name"])
+            if version is None or not is_stable(version):
+                continue
+            tags[version] = TagInfo(tag_info["name"], tag_info["commit"]["sha"])
+        return cls(tags)
+
+    def to_json(self) -> str:
+        return json.dumps([list(tag) for tag in self._tags.values()])
+
+    @classmethod
+    def from_json(cls, data: str) -> TagIndex:
+        return cls.from_tags_json(
+            {"name": name, "commit": {"sha": sha}} for name, sha in json.loads(data)
+        )
+
+    @property
+    def latest(self) -> TagInfo | None:
+        if not self._tags:
+            return None
+        return self._tags[max(self._tags)]
+
+    def update_dependency(self, string: str, *, freeze: bool = False) -> str:
+        """Update a GitHub-based dependency to the latest tag, or its commit SHA."""
+        latest = self.latest
+        if latest is None:
+            return string
+
+        uri, _, _ = string.partition("@")
+        if freeze:
+            return f"{uri}@{latest.sha}"
+        return f"{uri}@{latest.name}"
+
+
+class TagMap(Mapping[str, TagIndex]):
+    """A lazily populated mapping from `owner/repo` names to their tag indexes.
+
+    As with `VersionMap`, a persistent store may be given, in which case
+    fresh entries from it are used without any network access, and stale
+    entries are revalidated with a conditional request.
+
+    Lookups which fail, such as of repos which do not exist, or which cannot be
+    made within the GitHub API rate limit or before the
+    deadline set with `http.set_deadline`, are recorded in `failures`. As with
+    `VersionMap`, those which would fail again if retried soon are also kept in
+    the store for `NEGATIVE_TTL`.
+    """
+
+    def __init__(self, *, store: Store | None = None, refresh: bool = False) -> None:
+        self._cache: dict[str, TagIndex] = {}
+        self._store = store
+        self._refresh = refresh
+        self.failures: dict[str, Exception] = {}
+
+    def __getitem__(self, key: str) -> TagIndex:
+        normed = _normalize_repo_name(key)
+        self._populate(normed)
+        return self._cache[normed]
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return _normalize_repo_name(key) in self._cache
+
+    def __iter__(self) -> t.Iterator[str]:
+        yield from self._cache
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def update_dependency(self, string: str, *, freeze: bool = False) -> str:
+        owner, repo = parse_dependency(string)
+        return self[f"{owner}/{repo}"].update_dependency(string, freeze=freeze)
+
+    def missing(self, repo_names: t.Iterable[str]) -> set[str]:
+        """Return the normalized names which are not yet in the map.
+
+        As with `VersionMap.missing`, names whose lookup already failed are left
+        out.
+        """
+        return {
+            normed
+            for normed in map(_normalize_repo_name, repo_names)
+            if normed not in self._cache and normed not in self.failures
+        }
+
+    def prefill(self, indexes: Mapping[str, TagIndex]) -> None:
+        """Load many already-resolved tag indexes into the map at once."""
+        for name, index in indexes.items():
+            self._cache[_normalize_repo_name(name)] = index
+
+    def peek(self, repo_name: str) -> TagIndex | None:
+        """Get the tags of a repo, only if no request is needed.
+
+        The in-memory map and fresh entries in the persistent store are used.
+        """
+        normed = _normalize_repo_name(repo_name)
+        if normed in self._cache:
+            return self._cache[normed]
+        entry = self._get_fresh_entry(normed)
+        if entry is None:
+            return None
+        return TagIndex.from_json(entry.value)
+
+    def fetch(self, repo_name: str) -> TagIndex:
+        """Look up the tags of a repo, bypassing the in-memory map.
+
+        The persistent store, if any, is consulted and updated.
+        """
+        normed = _normalize_repo_name(repo_name)
+        with timing.span("lookup", "github", repo=normed) as info:
+            entry = self._get_stored_entry(normed)
+            if entry is not None and entry.is_fresh and not self._refresh:
+                info["cache"] = "hit"
+                return TagIndex.from_json(entry.value)
+            missing = self._get_missing_entry(normed)
+            if missing is not None:
+                info["cache"] = "negative"
+                error = LookupFailedError(missing.value)
+                self.failures[normed] = error
+                raise error
+
+            try:
+                response = fetch_tags(
+                    *_split_repo_name(normed),
+                    etag=entry.etag if entry is not None else None,
+                )
+            except Exception as e:
+                if not (isinstance(e, RateLimitExceededError) or is_lookup_failure(e)):
+                    raise
+                info["cache"] = "failed"
+                self._record_failure(normed, e)
+                raise
+
+            if response is None:
+                # GitHub confirmed that the stored tags are still current
+                assert entry is not None and self._store is not None
+                info["cache"] = "revalidated"
+                self._store.touch(_CACHE_NAMESPACE, normed)
+                return TagIndex.from_json(entry.value)
+
+            info["cache"] = "miss" if entry is None else "stale"
+            return self._store_index(
+                normed, TagIndex.from_tags_json(response.tags), etag=response.etag
+            )
+
+    def failure(self, repo_name: str) -> Exception | None:
+        """Get the error which a lookup of a repo failed with, if it did."""
+        return self.failures.get(_normalize_repo_name(repo_name))
+
+    def fetch_batch(self, repo_names: t.Iterable[str]) -> dict[str, TagIndex] | None:
+        """Look up the tags of many repos, with a single batched query.
+
+        This requires a token for the GraphQL API. If none is available and any
+        repo is missing from the persistent store, return None, and callers
+        should fall back to looking up each repo. Repos which could not be
+        looked up are left out, and recorded in `failures`.
+        """
+        result: dict[str, TagIndex] = {}
+        remaining = []
+        for normed in sorted(set(map(_normalize_repo_name, repo_names))):
+            entry = self._get_fresh_entry(normed)
+            if entry is not None:
+                result[normed] = TagIndex.from_json(entry.value)
+                continue
+            missing = self._get_missing_entry(normed)
+            if missing is not None:
+                self.failures[normed] = LookupFailedError(missing.value)
+            else:
+                remaining.append(normed)
+        if not remaining:
+            return result
+
+        token = graphql.get_token()
+        if token is None:
+            return None
+
+        repos = [_split_repo_name(normed) for normed in remaining]
+        try:
+            with timing.span("batch", "github", repos=len(repos), hits=len(result)):
+                responses = graphql.get_tags_json_batch(repos, token=token)
+        except Exception as e:
+            if not is_lookup_failure(e):
+                raise
+            # the repos which were found in the store are still returned, and
+            # the others are not remembered as missing, since the whole batch
+            # failed
+            for normed in remaining:
+                self.failures[normed] = e
+            return result
+        for normed, repo in zip(remaining, repos):
+            tags = responses[repo]
+            if tags is None:
+                self._record_failure(
+                    normed, LookupFailedError(f"{normed} was not found on GitHub")
+                )
+                continue
+            result[normed] = self._store_index(normed, TagIndex.from_tags_json(tags))
+        return result
+
+    def _get_stored_entry(self, repo_name: str) -> CacheEntry | None:
+        if self._store is None:
+            return None
+        return self._store.get(_CACHE_NAMESPACE, repo_name)
+
+    def _get_missing_entry(self, repo_name: str) -> CacheEntry | None:
+        if self._store is None or self._refresh:
+            return None
+        entry = self._store.get(_MISSING_NAMESPACE, repo_name)
+        if entry is None or not entry.is_fresh:
+            return None
+        return entry
+
+    def _record_failure(self, repo_name: str, error: Exception) -> None:
+        self.failures[repo_name] = error
+        if self._store is not None and is_lasting_failure(error):
+            self._store.set(_MISSING_NAMESPACE, repo_name, str(error), ttl=NEGATIVE_TTL)
+
+    def _get_fresh_entry(self, repo_name: str) -> CacheEntry | None:
+        if self._refresh:
+            return None
+        entry = self._get_stored_entry(repo_name)
+        if entry is None or not entry.is_fresh:
+            return None
+        return entry
+
+    def _store_index(
+        self, repo_name: str, index: TagIndex, *, etag: str | None = None
+    ) -> TagIndex:
+        if self._store is not None:
+            self._store.set(_CACHE_NAMESPACE, repo_name, index.to_json(), etag=etag)
+        return index
+
+    def _populate(self, repo_name: str) -> None:
+        if repo_name not in self._cache:
+            self._cache[repo_name] = self.fetch(repo_name)
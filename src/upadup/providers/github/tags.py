@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import typing as t
+
+import packaging.version
+
+# the number of tags requested per page, which GitHub caps at 100
+DEFAULT_PAGE_SIZE = 100
+# the most pages of tags which will be read for any one repo
+DEFAULT_MAX_PAGES = 10
+
+
+def parse_tag_version(name: str) -> packaging.version.Version | None:
+    try:
+        return packaging.version.Version(name)
+    except packaging.version.InvalidVersion:
+        return None
+
+
+def is_stable(version: packaging.version.Version) -> bool:
+    return not (version.is_prerelease or version.is_devrelease)
+
+
+def scan_tag_pages(
+    pages: t.Iterable[list[dict[str, t.Any]]],
+) -> list[dict[str, t.Any]]:
+    """Collect tags from pages of tag data, stopping as early as possible.
+
+    GitHub lists the tags of most repos in descending version order. Once a
+    stable version has been found, and every version seen so far has been in
+    descending order, no more pages are read. This is a heuristic: GitHub does
+    not promise this order, so a newer version on a later page can be missed.
+
+    Repos which do not order their tags this way are read in full, up to the
+    page limit of the page iterator.
+    """
+    collected: list[dict[str, t.Any]] = []
+    found_stable = False
+    descending = True
+    previous: packaging.version.Version | None = None
+
+    for page in pages:
+        for tag_info in page:
+            collected.append(tag_info)
+            version = parse_tag_version(tag_info["name"])
+            if version is None:
+                continue
+            if previous is not None and version > previous:
+                descending = False
+            previous = version
+            found_stable = found_stable or is_stable(version)
+
+        if found_stable and descending:
+            break
+
+    return collected
@@ -1,9 +1,19 @@
-from .dep_parser import SpecifierParseError, UnsupportedSpecifierError, parse_specifier
-from .package_utils import VersionMap
+from .dep_parser import (
+    SpecifierParseError,
+    UnsupportedSpecifierError,
+    parse_specifier,
+    parse_specifiers,
+)
+from .indexes import PackageIndex, select_indexes
+from .package_utils import VersionMap, get_pkg_latest
 
 __all__ = (
+    "PackageIndex",
     "SpecifierParseError",
     "UnsupportedSpecifierError",
     "VersionMap",
+    "get_pkg_latest",
     "parse_specifier",
+    "parse_specifiers",
+    "select_indexes",
 )
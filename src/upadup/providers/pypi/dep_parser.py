@@ -1,22 +1,50 @@
 from __future__ import annotations
 
 import dataclasses
+import functools
 import re
+import typing as t
 
-# Note: order matters because we will check for these in order
-# therefore, `===` should come before `==`
+import packaging.specifiers
+import packaging.version
+
+# comparators which pin a single version, which can be updated
+# a specifier is only supported if exactly one of its clauses uses one of these
 SUPPORTED_VERSION_COMPARATORS: tuple[str, ...] = (
     "===",
     "==",
     "~=",
 )
-# valid `version` strings under the grammar defined in this spec:
+# comparators which may appear in the other clauses of a specifier, and which are
+# kept as they are
+CONSTRAINT_COMPARATORS: tuple[str, ...] = ("!=", "<=", ">=", "<", ">")
+# memoized results of `parse_specifiers`, enough for very large workspaces
+SPECIFIER_CACHE_SIZE = 65536
+
+# the subset of the grammar in this spec which upadup understands:
 #   https://packaging.python.org/en/latest/specifications/dependency-specifiers/#grammar
-VALID_VERSION_PATTERN = re.compile(r"^[a-zA-Z0-9\-_\.\*\+!]+$")
-# valid `identifier` strings under that same grammar
-VALID_PACKAGE_NAME_PATTERN = re.compile(r"^[a-zA-Z0-9][a-zA-Z0-9_\.\-]*[a-zA-Z0-9]$")
-# leading and trailing whitespace on a string which contains no inner whitespace
-WHITESPACE_PATTERN = re.compile(r"^(\s*)(\S*)(\s*)$")
+# markers are kept as they are, without being parsed
+_IDENTIFIER = r"[a-zA-Z0-9](?:[a-zA-Z0-9_.\-]*[a-zA-Z0-9])?"
+_VERSION = r"[a-zA-Z0-9\-_.*+!]+"
+_PIN_COMPARATOR = "|".join(map(re.escape, SUPPORTED_VERSION_COMPARATORS))
+_CONSTRAINT_COMPARATOR = "|".join(map(re.escape, CONSTRAINT_COMPARATORS))
+_CONSTRAINT = rf"(?:{_CONSTRAINT_COMPARATOR})\s*{_VERSION}"
+SPECIFIER_PATTERN = re.compile(
+    rf"""
+    (?P<leading_whitespace>\s*)
+    (?P<package_name>{_IDENTIFIER})
+    (?P<extras>(?:\s*\[\s*(?:{_IDENTIFIER}(?:\s*,\s*{_IDENTIFIER})*)?\s*\])?)
+    (?P<leading_clauses>(?:\s*{_CONSTRAINT}\s*,)*)
+    (?P<before_comparator_whitespace>\s*)
+    (?P<comparator>{_PIN_COMPARATOR})
+    (?P<after_comparator_whitespace>\s*)
+    (?P<version>{_VERSION})
+    (?P<trailing_clauses>(?:\s*,\s*{_CONSTRAINT})*)
+    (?P<marker>(?:\s*;\s*\S.*?)?)
+    (?P<trailing_whitespace>\s*)
+    """,
+    re.VERBOSE,
+)
 
 
 class UnsupportedSpecifierError(ValueError):
@@ -43,8 +71,15 @@ class SpecifierParseError(ValueError):
         super().__init__(msg)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class ParsedSpecifier:
+    """A specifier with one pinned version, split into the parts which `format()`
+    joins back together, so that only the version changes on update.
+
+    Results of `parse_specifiers` are shared between callers, so they are
+    frozen; `update_version` returns a new specifier.
+    """
+
     leading_whitespace: str
     package_name: str
     before_comparator_whitespace: str
@@ -52,15 +87,26 @@ class ParsedSpecifier:
     after_comparator_whitespace: str
     version: str
     trailing_whitespace: str
+    # `[extra, ...]`, along with any whitespace before it
+    extras: str = ""
+    # the clauses before and after the pinned one, with the commas between them
+    leading_clauses: str = ""
+    trailing_clauses: str = ""
+    # `; marker`, along with any whitespace before it
+    marker: str = ""
 
     def format(self) -> str:
         parts = (
             self.leading_whitespace,
             self.package_name,
+            self.extras,
+            self.leading_clauses,
             self.before_comparator_whitespace,
             self.comparator,
             self.after_comparator_whitespace,
             self.version,
+            self.trailing_clauses,
+            self.marker,
             self.trailing_whitespace,
         )
         return "".join(parts)
@@ -68,60 +114,65 @@ class ParsedSpecifier:
     def update_version(self, new_version: str) -> ParsedSpecifier:
         return dataclasses.replace(self, version=new_version)
 
+    def allows(self, version: str) -> bool:
+        """Whether the other clauses of the specifier allow a version.
+
+        Clauses or versions which cannot be checked do not allow it.
+        """
+        if not self.leading_clauses and not self.trailing_clauses:
+            return True
+        try:
+            constraints = packaging.specifiers.SpecifierSet(
+                f"{self.leading_clauses},{self.trailing_clauses}"
+            )
+            return constraints.contains(version, prereleases=True)
+        except (
+            packaging.specifiers.InvalidSpecifier,
+            packaging.version.InvalidVersion,
+        ):
+            return False
+
+
+# the groups of `SPECIFIER_PATTERN`, in the order of the fields they fill
+_FIELDS = tuple(field.name for field in dataclasses.fields(ParsedSpecifier))
+
 
 def parse_specifier(specifier: str) -> ParsedSpecifier:
-    for comparator in SUPPORTED_VERSION_COMPARATORS:
-        if comparator in specifier:
-            break
-    else:
+    """Parse a specifier which pins one version, such as `foo[bar]==1.0`.
+
+    Extras, other clauses (e.g. `==1.0,!=1.0.1`), and an environment marker are
+    allowed, and are kept as they are.
+
+    :raises UnsupportedSpecifierError: if the specifier does not pin a version
+    :raises SpecifierParseError: if the specifier pins a version, but is invalid
+    """
+    match = SPECIFIER_PATTERN.fullmatch(specifier)
+    if match is not None:
+        return ParsedSpecifier(*match.group(*_FIELDS))
+
+    requirement, _, _ = specifier.partition(";")
+    if not any(c in requirement for c in SUPPORTED_VERSION_COMPARATORS):
         raise UnsupportedSpecifierError(specifier)
+    raise SpecifierParseError(specifier=specifier)
 
-    package_name, _, version = specifier.partition(comparator)
-    try:
-        leading_whitespace, package_name, before_comparator_whitespace = (
-            _split_off_leading_and_trailing_whitespace(package_name)
-        )
-    except ValueError as e:
-        raise SpecifierParseError(
-            specifier=specifier, message="Invalid whitespace in package name."
-        ) from e
 
-    try:
-        after_comparator_whitespace, version, trailing_whitespace = (
-            _split_off_leading_and_trailing_whitespace(version)
-        )
-    except ValueError as e:
-        raise SpecifierParseError(
-            specifier=specifier, message="Invalid whitespace in version."
-        ) from e
-
-    # validate the resulting content and raise a parse error if invalid
-    _validate_parsed_data(specifier, package_name, version)
-
-    return ParsedSpecifier(
-        leading_whitespace=leading_whitespace,
-        package_name=package_name,
-        before_comparator_whitespace=before_comparator_whitespace,
-        comparator=comparator,
-        after_comparator_whitespace=after_comparator_whitespace,
-        version=version,
-        trailing_whitespace=trailing_whitespace,
-    )
-
-
-def _split_off_leading_and_trailing_whitespace(original: str) -> tuple[str, str, str]:
-    match = WHITESPACE_PATTERN.match(original)
-    if match is None:
-        raise ValueError(
-            f"whitespace matching on '{original}' failed on unexpected spaces"
-        )
-    return match.group(1, 2, 3)  # type: ignore[return-value]
+def parse_specifiers(specifiers: t.Iterable[str]) -> dict[str, ParsedSpecifier]:
+    """Parse many specifiers, parsing each distinct one only once.
 
+    Results are remembered between calls. Specifiers which are unsupported or
+    invalid are left out.
+    """
+    parsed = {}
+    for specifier in dict.fromkeys(specifiers):
+        result = _parse_cached(specifier)
+        if result is not None:
+            parsed[specifier] = result
+    return parsed
 
-def _validate_parsed_data(specifier: str, package_name: str, version: str) -> None:
-    if not VALID_PACKAGE_NAME_PATTERN.match(package_name):
-        raise SpecifierParseError(specifier=specifier, message="Invalid package name.")
-    if not VALID_VERSION_PATTERN.match(version):
-        raise SpecifierParseError(
-            specifier=specifier, message="Invalid version string."
-        )
+
+@functools.lru_cache(maxsize=SPECIFIER_CACHE_SIZE)
+def _parse_cached(specifier: str) -> ParsedSpecifier | None:
+    try:
+        return parse_specifier(specifier)
+    except (UnsupportedSpecifierError, SpecifierParseError):
+        return None
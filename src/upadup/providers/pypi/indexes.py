@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import dataclasses
+import html
+import json
+import os
+import re
+import typing as t
+
+import packaging.utils
+import packaging.version
+
+DEFAULT_INDEX_URL = "https://pypi.org/pypi"
+
+INDEX_URL_ENV_VAR = "UPADUP_INDEX_URL"
+INDEX_TIMEOUT_ENV_VAR = "UPADUP_INDEX_TIMEOUT"
+
+API_FORMATS = ("json", "simple")
+
+# PEP 691 JSON is preferred, but HTML is accepted from older Simple API servers
+SIMPLE_ACCEPT_HEADER = (
+    "application/vnd.pypi.simple.v1+json, "
+    "application/vnd.pypi.simple.v1+html;q=0.2, "
+    "text/html;q=0.01"
+)
+_SIMPLE_JSON_CONTENT_TYPES = ("application/vnd.pypi.simple.v1+json", "application/json")
+
+_ANCHOR_PATTERN = re.compile(r"<a\s([^>]*)>([^<]*)</a>", re.IGNORECASE)
+
+
+@dataclasses.dataclass(frozen=True)
+class PackageIndex:
+    """A package index, and the API used to look up versions in it.
+
+    `url` is the base URL of either the JSON API (`https://pypi.org/pypi`) or the
+    Simple API (`https://pypi.org/simple`). `timeout` is the latency budget for a
+    single lookup, in seconds, after which the next index is tried.
+    """
+
+    url: str
+    api: str = "json"
+    timeout: float | None = None
+
+    def __post_init__(self) -> None:
+        if self.api not in API_FORMATS:
+            raise ValueError(f"unknown package index API: {self.api!r}")
+        if self.timeout is not None and self.timeout <= 0:
+            raise ValueError("package index timeouts must be positive")
+
+    @classmethod
+    def from_url(cls, url: str, *, timeout: float | None = None) -> PackageIndex:
+        """Build an index from a URL, using the Simple API for `.../simple` URLs."""
+        url = url.rstrip("/")
+        last_segment = url.rpartition("/")[2]
+        api = "simple" if last_segment in ("simple", "+simple") else "json"
+        return cls(url, api=api, timeout=timeout)
+
+    def project_url(self, name: str) -> str:
+        if self.api == "simple":
+            return f"{self.url}/{name}/"
+        return f"{self.url}/{name}/json"
+
+
+DEFAULT_INDEXES: tuple[PackageIndex, ...] = (PackageIndex(DEFAULT_INDEX_URL),)
+
+
+def select_indexes(
+    *,
+    urls: t.Sequence[str] | None = None,
+    timeout: float | None = None,
+    configured: t.Sequence[PackageIndex] = (),
+) -> tuple[PackageIndex, ...]:
+    """Choose the package indexes to use, in priority order.
+
+    URLs given directly (e.g. on the command line) are used first, then those in
+    `UPADUP_INDEX_URL` (separated by whitespace), then configured indexes, and
+    finally PyPI. Likewise, a timeout given directly takes precedence over
+    `UPADUP_INDEX_TIMEOUT`. Either applies to indexes without a timeout of
+    their own.
+
+    :raises ValueError: if the environment contains an invalid timeout
+    """
+    if timeout is None and os.environ.get(INDEX_TIMEOUT_ENV_VAR):
+        try:
+            timeout = float(os.environ[INDEX_TIMEOUT_ENV_VAR])
+        except ValueError:
+            raise ValueError(
+                f"{INDEX_TIMEOUT_ENV_VAR} should be a number of seconds"
+            ) from None
+
+    if not urls:
+        urls = os.environ.get(INDEX_URL_ENV_VAR, "").split()
+    if urls:
+        indexes: t.Sequence[PackageIndex] = [PackageIndex.from_url(url) for url in urls]
+    elif configured:
+        indexes = configured
+    else:
+        indexes = DEFAULT_INDEXES
+
+    if timeout is None:
+        return tuple(indexes)
+    return tuple(
+        dataclasses.replace(index, timeout=timeout) if index.timeout is None else index
+        for index in indexes
+    )
+
+
+def read_simple_version(content_type: str, content: bytes) -> str:
+    """Get the latest version of a project from a Simple API project page.
+
+    Both the JSON (PEP 691) and HTML (PEP 503) forms are supported. Yanked files
+    are ignored, and the latest stable version is preferred over pre-releases.
+
+    :raises ValueError: if no version can be found
+    """
+    if content_type.split(";")[0].strip() in _SIMPLE_JSON_CONTENT_TYPES:
+        data = json.loads(content)
+        filenames = [
+            file["filename"] for file in data.get("files", ()) if not file.get("yanked")
+        ]
+        versions = _parse_filename_versions(filenames)
+        # the PEP 700 list of versions covers projects whose files are unlisted
+        if not versions:
+            versions = _parse_versions(data.get("versions", ()))
+    else:
+        filenames = [
+            html.unescape(text).strip()
+            for attrs, text in _ANCHOR_PATTERN.findall(content.decode())
+            if "data-yanked" not in attrs
+        ]
+        versions = _parse_filename_versions(filenames)
+
+    if not versions:
+        raise ValueError("no versions found on Simple API project page")
+    stable = [version for version in versions if not version.is_prerelease]
+    return str(max(stable or versions))
+
+
+def _parse_filename_versions(
+    filenames: t.Iterable[str],
+) -> list[packaging.version.Version]:
+    versions = []
+    for filename in filenames:
+        try:
+            if filename.endswith(".whl"):
+                _, version, _, _ = packaging.utils.parse_wheel_filename(filename)
+            elif filename.endswith((".tar.gz", ".zip")):
+                _, version = packaging.utils.parse_sdist_filename(filename)
+            else:
+                continue
+        except (
+            packaging.utils.InvalidWheelFilename,
+            packaging.utils.InvalidSdistFilename,
+            packaging.version.InvalidVersion,
+        ):
+            continue
+        versions.append(version)
+    return versions
+
+
+def _parse_versions(strings: t.Iterable[str]) -> list[packaging.version.Version]:
+    versions = []
+    for string in strings:
+        try:
+            versions.append(packaging.version.Version(string))
+        except packaging.version.InvalidVersion:
+            continue
+    return versions
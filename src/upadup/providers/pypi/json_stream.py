@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import codecs
+import json
+import re
+import typing as t
+
+# the characters which matter when skipping over a JSON object or array
+# inside of a string, only quotes and escapes matter
+_STRUCTURAL_PATTERN = re.compile(r'[\[\]{}"\\]')
+_WHITESPACE_PATTERN = re.compile(r"[ \t\n\r]*")
+
+_decoder = json.JSONDecoder()
+
+
+class _NeedMoreData(Exception):
+    pass
+
+
+def find_top_level_key(chunks: t.Iterable[bytes], key: str) -> t.Any:
+    """Get the value of one key of a JSON object, streamed as byte chunks.
+
+    Reading stops as soon as the value has been decoded. The values of other
+    keys are decoded only if they are scalars; objects and arrays are skipped
+    without being held in memory.
+
+    :raises KeyError: if the key is not present
+    :raises ValueError: if the document is not a JSON object
+    """
+    scanner = _ObjectScanner(key)
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in chunks:
+        found, value = scanner.feed(text_decoder.decode(chunk))
+        if found:
+            return value
+    found, value = scanner.feed(text_decoder.decode(b"", final=True), final=True)
+    if found:
+        return value
+    raise KeyError(key)
+
+
+class _ObjectScanner:
+    def __init__(self, key: str) -> None:
+        self._key = key
+        self._buffer = ""
+        # the scanner moves through these states for each member of the object
+        #   start -> key -> colon -> value -> comma -> key -> ... -> end
+        self._state = "start"
+        self._current_key: str | None = None
+        self._skipper: _ContainerSkipper | None = None
+
+    def feed(self, text: str, final: bool = False) -> tuple[bool, t.Any]:
+        if self._state == "end":
+            return (False, None)
+        self._buffer += text
+        pos = 0
+        try:
+            while True:
+                if self._skipper is not None:
+                    end = self._skipper.feed(self._buffer, pos)
+                    if end is None:
+                        # everything buffered belongs to the skipped value
+                        pos = len(self._buffer)
+                        raise _NeedMoreData
+                    self._skipper = None
+                    pos = end
+                    self._state = "comma"
+
+                pos = _skip_whitespace(self._buffer, pos)
+                if pos >= len(self._buffer):
+                    raise _NeedMoreData
+                char = self._buffer[pos]
+
+                if self._state == "start":
+                    if char != "{":
+                        raise ValueError("expected a JSON object")
+                    pos += 1
+                    self._state = "key"
+                elif self._state == "key":
+                    if char == "}":
+                        self._state = "end"
+                        return (False, None)
+                    self._current_key, pos = self._decode_value(pos, final)
+                    self._state = "colon"
+                elif self._state == "colon":
+                    if char != ":":
+                        raise ValueError("expected ':' in JSON object")
+                    pos += 1
+                    self._state = "value"
+                elif self._state == "value":
+                    if self._current_key == self._key:
+                        value, pos = self._decode_value(pos, final)
+                        self._state = "end"
+                        return (True, value)
+                    if char in "{[":
+                        self._skipper = _ContainerSkipper()
+                        continue
+                    _, pos = self._decode_value(pos, final)
+                    self._state = "comma"
+                elif self._state == "comma":
+                    if char == "}":
+                        self._state = "end"
+                        return (False, None)
+                    if char != ",":
+                        raise ValueError("expected ',' in JSON object")
+                    pos += 1
+                    self._state = "key"
+        except _NeedMoreData:
+            if final:
+                raise ValueError("JSON document ended unexpectedly") from None
+            # drop everything which has been consumed
+            self._buffer = self._buffer[pos:]
+            return (False, None)
+
+    def _decode_value(self, pos: int, final: bool) -> tuple[t.Any, int]:
+        try:
+            value, end = _decoder.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            raise _NeedMoreData from None
+        # a number at the end of the buffer may continue in the next chunk
+        if not final and end >= len(self._buffer) and self._buffer[pos] not in '{["':
+            raise _NeedMoreData
+        return value, end
+
+
+class _ContainerSkipper:
+    """Find the end of a JSON object or array, across many chunks."""
+
+    def __init__(self) -> None:
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, buffer: str, pos: int) -> int | None:
+        """Return the position after the end of the container, if it was found."""
+        if self._escaped and pos < len(buffer):
+            # the previous chunk ended in a backslash
+            pos += 1
+            self._escaped = False
+
+        while True:
+            match = _STRUCTURAL_PATTERN.search(buffer, pos)
+            if match is None:
+                return None
+            char, pos = match.group(), match.end()
+
+            if char == "\\":
+                # skip the escaped character, which may be in the next chunk
+                if pos >= len(buffer):
+                    self._escaped = True
+                    return None
+                pos += 1
+            elif char == '"':
+                self._in_string = not self._in_string
+            elif self._in_string:
+                continue
+            elif char in "{[":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    match = _WHITESPACE_PATTERN.match(buffer, pos)
+    return pos if match is None else match.end()
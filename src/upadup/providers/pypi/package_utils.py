@@ -1,8 +1,42 @@
+from __future__ import annotations
+
 import re
+import time
 import typing as t
 from collections.abc import Mapping
 
-import requests
+from ... import http, timing
+from ..failures import (
+    NEGATIVE_TTL,
+    LookupFailedError,
+    is_lasting_failure,
+    is_lookup_failure,
+)
+from .indexes import (
+    DEFAULT_INDEXES,
+    SIMPLE_ACCEPT_HEADER,
+    PackageIndex,
+    read_simple_version,
+)
+from .json_stream import find_top_level_key
+
+if t.TYPE_CHECKING:
+    import requests
+
+    from ...cache import CacheEntry, Store
+
+# entries in both namespaces are keyed by the URLs of the indexes which were
+# used and the package name, see `_store_key`
+_CACHE_NAMESPACE = "pypi"
+# packages which could not be looked up, kept for `NEGATIVE_TTL`
+_MISSING_NAMESPACE = "pypi-missing"
+
+# responses are read in chunks of this size, until `info.version` is found
+_CHUNK_SIZE = 16 * 1024
+# after the version is found, responses with at most this much remaining data
+# are read to the end, so that the connection can be reused
+# larger responses are closed instead
+_DRAIN_LIMIT = 256 * 1024
 
 # this normalization pattern follows the rules declared for package normalization
 # on pypi itself
@@ -15,14 +49,175 @@ def _normalize_package_name(name: str) -> str:
     return _NORMALIZATION_PATTERN.sub("-", name).lower()
 
 
+def _store_key(indexes: t.Sequence[PackageIndex], package_name: str) -> str:
+    # other indexes may have other versions of a package, or none at all, and
+    # their validators mean nothing to each other
+    return " ".join([*(index.url for index in indexes), package_name])
+
+
+class PackageVersionResponse(t.NamedTuple):
+    version: str
+    etag: str | None
+    last_modified: str | None
+
+
+def fetch_pkg_latest(
+    name: str,
+    *,
+    etag: str | None = None,
+    last_modified: str | None = None,
+    indexes: t.Sequence[PackageIndex] = DEFAULT_INDEXES,
+) -> PackageVersionResponse | None:
+    """Get the latest version of a package, along with its cache validators.
+
+    Indexes are tried in order, moving on to the next one if a lookup fails or
+    exceeds the index's latency budget. The error from the last index is raised.
+
+    Validators are only sent to, and only returned from, the first index. If
+    validators are given and it reports that nothing has changed, return None.
+    """
+    headers = {}
+    if etag is not None:
+        headers["If-None-Match"] = etag
+    if last_modified is not None:
+        headers["If-Modified-Since"] = last_modified
+
+    import requests
+
+    for position, index in enumerate(indexes):
+        try:
+            response = _fetch_from_index(index, name, headers if position == 0 else {})
+        except (requests.RequestException, LookupFailedError):
+            if position == len(indexes) - 1:
+                raise
+            continue
+        if position > 0:
+            assert response is not None  # no validators were sent
+            response = response._replace(etag=None, last_modified=None)
+        return response
+    raise ValueError("no package indexes were given")
+
+
+def _fetch_from_index(
+    index: PackageIndex, name: str, headers: dict[str, str]
+) -> PackageVersionResponse | None:
+    kwargs: dict[str, t.Any] = {}
+    deadline = None
+    if index.timeout is not None:
+        kwargs["timeout"] = index.timeout
+        deadline = time.monotonic() + index.timeout
+    if index.api == "simple":
+        headers = {**headers, "Accept": SIMPLE_ACCEPT_HEADER}
+
+    url = index.project_url(name)
+    with timing.span("request", "pypi", url=url, bytes=0) as info:
+        # credentials for the index are read from netrc by the session
+        version_data = http.get(url, headers=headers, stream=True, **kwargs)
+        with version_data:
+            info["status"] = version_data.status_code
+            if version_data.status_code == 304:
+                return None
+            version_data.raise_for_status()
+
+            chunks = _within_budget(
+                version_data.iter_content(chunk_size=_CHUNK_SIZE),
+                deadline,
+                index,
+                info,
+            )
+            try:
+                if index.api == "simple":
+                    version = read_simple_version(
+                        version_data.headers.get("Content-Type", ""), b"".join(chunks)
+                    )
+                else:
+                    version = _read_info_version(version_data, chunks)
+            except ValueError as e:
+                # a response which is not JSON, or has no versions
+                raise LookupFailedError(f"cannot read {url}: {e}") from e
+            return PackageVersionResponse(
+                version=version,
+                etag=version_data.headers.get("ETag"),
+                last_modified=version_data.headers.get("Last-Modified"),
+            )
+
+
+def _within_budget(
+    chunks: t.Iterator[bytes],
+    deadline: float | None,
+    index: PackageIndex,
+    info: dict[str, t.Any],
+) -> t.Iterator[bytes]:
+    import requests
+
+    # socket timeouts apply to each read, so a slow response is also stopped
+    # once the whole lookup has taken too long, or the run is out of time
+    for chunk in chunks:
+        if deadline is not None and time.monotonic() > deadline:
+            raise requests.Timeout(
+                f"lookup on {index.url} exceeded its budget of {index.timeout}s"
+            )
+        http.check_deadline()
+        info["bytes"] += len(chunk)
+        yield chunk
+
+
+def _read_info_version(
+    version_data: requests.Response, chunks: t.Iterator[bytes]
+) -> str:
+    """Read `info.version` from a streamed JSON API response.
+
+    The JSON API puts `info` before the (potentially very large) list of
+    releases, so only the start of the document is usually read.
+    """
+    try:
+        version = find_top_level_key(chunks, "info")["version"]
+    except (KeyError, TypeError):
+        raise LookupFailedError(f"no 'info.version' in {version_data.url}") from None
+
+    content_length = version_data.headers.get("Content-Length")
+    if content_length is not None and int(content_length) <= _DRAIN_LIMIT:
+        for _ in chunks:
+            pass
+    return str(version)
+
+
 def get_pkg_latest(name: str) -> str:
-    version_data = requests.get(f"https://pypi.python.org/pypi/{name}/json", timeout=30)
-    return str(version_data.json()["info"]["version"])
+    response = fetch_pkg_latest(name)
+    assert response is not None  # no validators were sent
+    return response.version
 
 
 class VersionMap(Mapping[str, str]):
-    def __init__(self) -> None:
+    """A lazily populated mapping from package names to their latest versions.
+
+    If a persistent store is given, such as a `VersionCache`, fresh entries from
+    it are used without any network access, and stale entries are revalidated
+    with a conditional request. `refresh=True` treats all persistent entries as
+    stale.
+
+    Versions are looked up in the given package indexes, in priority order.
+    Stored entries are kept apart for each list of indexes, so changing them
+    does not reuse versions or failures from other indexes.
+
+    Lookups which fail, such as of packages which do not exist, or once the
+    deadline set with `http.set_deadline` passes, are recorded in `failures`.
+    Those which would fail again if retried soon are also kept in the store for
+    `NEGATIVE_TTL`, and are not looked up again until then.
+    """
+
+    def __init__(
+        self,
+        *,
+        store: Store | None = None,
+        refresh: bool = False,
+        indexes: t.Sequence[PackageIndex] = DEFAULT_INDEXES,
+    ) -> None:
         self._cache: dict[str, str] = {}
+        self._store = store
+        self._refresh = refresh
+        self._indexes = tuple(indexes)
+        self.failures: dict[str, Exception] = {}
 
     def __getitem__(self, key: str) -> str:
         normed = _normalize_package_name(key)
@@ -41,6 +236,127 @@ class VersionMap(Mapping[str, str]):
     def __len__(self) -> int:
         return len(self._cache)
 
+    def missing(self, package_names: t.Iterable[str]) -> set[str]:
+        """Return the normalized names which are not yet in the map.
+
+        Names whose lookup already failed are left out, so that they are only
+        looked up once.
+        """
+        return {
+            normed
+            for normed in map(_normalize_package_name, package_names)
+            if normed not in self._cache and normed not in self.failures
+        }
+
+    def prefill(self, versions: Mapping[str, str]) -> None:
+        """Load many already-resolved versions into the map at once."""
+        for name, version in versions.items():
+            self._cache[_normalize_package_name(name)] = version
+
+    def peek(self, package_name: str) -> str | None:
+        """Get the latest version of a package, only if no request is needed.
+
+        The in-memory map and fresh entries in the persistent store are used.
+        """
+        normed = _normalize_package_name(package_name)
+        if normed in self._cache:
+            return self._cache[normed]
+        entry = self._get_stored_entry(normed)
+        if entry is None or not entry.is_fresh or self._refresh:
+            return None
+        return entry.value
+
+    def fetch(self, package_name: str) -> str:
+        """Look up the latest version of a package, bypassing the in-memory map.
+
+        The persistent store, if any, is consulted and updated.
+        """
+        normed = _normalize_package_name(package_name)
+        with timing.span("lookup", "pypi", package=normed) as info:
+            entry = self._get_stored_entry(normed)
+            if entry is not None and entry.is_fresh and not self._refresh:
+                info["cache"] = "hit"
+                return entry.value
+            missing = self._get_missing_entry(normed)
+            if missing is not None:
+                info["cache"] = "negative"
+                error = LookupFailedError(missing.value)
+                self.failures[normed] = error
+                raise error
+
+            try:
+                if entry is None:
+                    info["cache"] = "miss"
+                    response = fetch_pkg_latest(normed, indexes=self._indexes)
+                else:
+                    response = fetch_pkg_latest(
+                        normed,
+                        etag=entry.etag,
+                        last_modified=entry.last_modified,
+                        indexes=self._indexes,
+                    )
+                    info["cache"] = "revalidated" if response is None else "stale"
+            except Exception as e:
+                if not is_lookup_failure(e):
+                    raise
+                info["cache"] = "failed"
+                self._record_failure(normed, e)
+                raise
+            return self._store_response(normed, entry, response)
+
+    def failure(self, package_name: str) -> Exception | None:
+        """Get the error which a lookup of a package failed with, if it did."""
+        return self.failures.get(_normalize_package_name(package_name))
+
+    def _get_stored_entry(self, package_name: str) -> CacheEntry | None:
+        if self._store is None:
+            return None
+        return self._store.get(
+            _CACHE_NAMESPACE, _store_key(self._indexes, package_name)
+        )
+
+    def _get_missing_entry(self, package_name: str) -> CacheEntry | None:
+        if self._store is None or self._refresh:
+            return None
+        entry = self._store.get(
+            _MISSING_NAMESPACE, _store_key(self._indexes, package_name)
+        )
+        if entry is None or not entry.is_fresh:
+            return None
+        return entry
+
+    def _record_failure(self, package_name: str, error: Exception) -> None:
+        self.failures[package_name] = error
+        if self._store is not None and is_lasting_failure(error):
+            self._store.set(
+                _MISSING_NAMESPACE,
+                _store_key(self._indexes, package_name),
+                str(error),
+                ttl=NEGATIVE_TTL,
+            )
+
+    def _store_response(
+        self,
+        package_name: str,
+        entry: CacheEntry | None,
+        response: PackageVersionResponse | None,
+    ) -> str:
+        if response is None:
+            # the index confirmed that the stored entry is still current
+            assert entry is not None and self._store is not None
+            self._store.touch(_CACHE_NAMESPACE, _store_key(self._indexes, package_name))
+            return entry.value
+
+        if self._store is not None:
+            self._store.set(
+                _CACHE_NAMESPACE,
+                _store_key(self._indexes, package_name),
+                response.version,
+                etag=response.etag,
+                last_modified=response.last_modified,
+            )
+        return response.version
+
     def _populate(self, package_name: str) -> None:
         if package_name not in self._cache:
-            self._cache[package_name] = get_pkg_latest(package_name)
+            self._cache[package_name] = self.fetch(package_name)
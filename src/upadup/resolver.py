@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import typing as t
+
+from . import timing
+
+# asyncio and concurrent.futures are slow to import, and are imported only when
+# there is something to resolve
+if t.TYPE_CHECKING:
+    import asyncio
+    import concurrent.futures
+
+    from .providers import github, pypi
+
+DEFAULT_JOBS = 8
+
+T = t.TypeVar("T")
+
+
+class ThreadedResolver:
+    """Resolve many lookups at once on a bounded thread pool.
+
+    Results are written into the given `VersionMap` and `TagMap`, so that later
+    lookups are cache hits.
+    """
+
+    def __init__(self, jobs: int = DEFAULT_JOBS) -> None:
+        if jobs < 1:
+            raise ValueError("jobs must be a positive integer")
+        self.jobs = jobs
+
+    def resolve(
+        self,
+        version_map: pypi.VersionMap,
+        tag_map: github.TagMap,
+        package_names: t.Iterable[str],
+        repo_names: t.Iterable[str],
+    ) -> None:
+        missing_packages = sorted(version_map.missing(package_names))
+        missing_repos = sorted(tag_map.missing(repo_names))
+        if not missing_packages and not missing_repos:
+            return
+
+        import concurrent.futures
+
+        # lookups on the pool are timed in the context of the caller
+        fetch_package = timing.in_current_context(version_map.fetch)
+        fetch_repo = timing.in_current_context(tag_map.fetch)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            package_futures = {
+                name: executor.submit(fetch_package, name) for name in missing_packages
+            }
+
+            tag_indexes = tag_map.fetch_batch(missing_repos)
+            if tag_indexes is None:
+                repo_futures = {
+                    name: executor.submit(fetch_repo, name) for name in missing_repos
+                }
+                repo_outcomes = _outcomes(repo_futures)
+                tag_indexes = _successful(tag_map, repo_outcomes)
+            tag_map.prefill(tag_indexes)
+
+            package_outcomes = _outcomes(package_futures)
+            version_map.prefill(_successful(version_map, package_outcomes))
+
+
+class AsyncResolver:
+    """Resolve many lookups at once, scheduled from a single event loop.
+
+    At most `jobs` fetches are in flight at any time, and concurrent requests for
+    the same package or the same GitHub repo share a single fetch. This holds
+    across concurrent calls to `resolve_async` on the same loop, so one resolver
+    can be shared by many updaters.
+
+    No I/O is done on the loop. The fetches make blocking requests, and run on a
+    thread pool of `jobs` threads, rather than on the loop's default executor,
+    whose size does not depend on `jobs`.
+    """
+
+    def __init__(self, jobs: int = DEFAULT_JOBS) -> None:
+        if jobs < 1:
+            raise ValueError("jobs must be a positive integer")
+        self.jobs = jobs
+        self._flights: _SingleFlight | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def resolve(
+        self,
+        version_map: pypi.VersionMap,
+        tag_map: github.TagMap,
+        package_names: t.Iterable[str],
+        repo_names: t.Iterable[str],
+    ) -> None:
+        import asyncio
+
+        asyncio.run(self.resolve_async(version_map, tag_map, package_names, repo_names))
+
+    async def resolve_async(
+        self,
+        version_map: pypi.VersionMap,
+        tag_map: github.TagMap,
+        package_names: t.Iterable[str],
+        repo_names: t.Iterable[str],
+    ) -> None:
+        import asyncio
+        import concurrent.futures
+
+        missing_packages = sorted(version_map.missing(package_names))
+        missing_repos = sorted(tag_map.missing(repo_names))
+        if not missing_packages and not missing_repos:
+            return
+
+        loop = asyncio.get_running_loop()
+        flights = self._get_flights()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.jobs)
+
+        # lookups on the pool are timed in the context of the caller
+        fetch_package = timing.in_current_context(version_map.fetch)
+        fetch_repo = timing.in_current_context(tag_map.fetch)
+        fetch_batch = timing.in_current_context(tag_map.fetch_batch)
+
+        async def _resolve_package(name: str) -> str:
+            return await flights.run(
+                ("pypi", name),
+                lambda: loop.run_in_executor(executor, fetch_package, name),
+            )
+
+        async def _resolve_repo(name: str) -> github.TagIndex:
+            return await flights.run(
+                ("github", name),
+                lambda: loop.run_in_executor(executor, fetch_repo, name),
+            )
+
+        async def _resolve_all_repos() -> dict[str, github.TagIndex]:
+            if not missing_repos:
+                return {}
+            batched = await loop.run_in_executor(executor, fetch_batch, missing_repos)
+            if batched is not None:
+                return batched
+            indexes = await asyncio.gather(
+                *map(_resolve_repo, missing_repos), return_exceptions=True
+            )
+            return _successful(tag_map, dict(zip(missing_repos, indexes)))
+
+        try:
+            package_versions, tag_indexes = await asyncio.gather(
+                asyncio.gather(
+                    *map(_resolve_package, missing_packages), return_exceptions=True
+                ),
+                _resolve_all_repos(),
+            )
+        finally:
+            # every fetch has finished unless the run was cancelled, in which
+            # case the threads finish their current fetch in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        version_map.prefill(
+            _successful(version_map, dict(zip(missing_packages, package_versions)))
+        )
+        tag_map.prefill(tag_indexes)
+
+    def _get_flights(self) -> _SingleFlight:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        if self._flights is None or self._loop is not loop:
+            self._flights = _SingleFlight(asyncio.Semaphore(self.jobs))
+            self._loop = loop
+        return self._flights
+
+
+class _SingleFlight:
+    """Deduplicate concurrent awaits of the same key into one bounded task."""
+
+    def __init__(self, semaphore: asyncio.Semaphore) -> None:
+        self._semaphore = semaphore
+        self._tasks: dict[t.Hashable, asyncio.Task[t.Any]] = {}
+
+    def run(
+        self, key: t.Hashable, factory: t.Callable[[], t.Awaitable[T]]
+    ) -> asyncio.Future[T]:
+        import asyncio
+
+        if key not in self._tasks:
+            task = asyncio.ensure_future(self._bounded(factory))
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+            self._tasks[key] = task
+        return self._tasks[key]
+
+    async def _bounded(self, factory: t.Callable[[], t.Awaitable[T]]) -> T:
+        async with self._semaphore:
+            return await factory()
+
+
+def _outcomes(
+    futures: t.Mapping[str, concurrent.futures.Future[T]],
+) -> dict[str, T | BaseException]:
+    outcomes: dict[str, T | BaseException] = {}
+    for name, future in futures.items():
+        error = future.exception()
+        outcomes[name] = future.result() if error is None else error
+    return outcomes
+
+
+def _successful(
+    lookup_map: pypi.VersionMap | github.TagMap,
+    outcomes: t.Mapping[str, T | BaseException],
+) -> dict[str, T]:
+    """Get the results of lookups, leaving out those which the map recorded as
+    failed. Any other error is raised."""
+    results = {}
+    for name, outcome in outcomes.items():
+        if isinstance(outcome, BaseException):
+            if lookup_map.failure(name) is None:
+                raise outcome
+            continue
+        results[name] = outcome
+    return results
+
+
+def first_result(
+    checks: t.Sequence[t.Callable[[], T | None]], *, jobs: int = DEFAULT_JOBS
+) -> T | None:
+    """Run checks concurrently, and return the first result which is not None.
+
+    Checks are started in the order given, at most `jobs` at a time. Once a
+    result is found, checks which have not started are skipped, and those still
+    running are abandoned. They run on daemon threads, which are never waited
+    for, so the caller may exit without waiting on their requests.
+
+    If no check returns a result, and any check failed, the first error is
+    raised.
+    """
+    if jobs < 1:
+        raise ValueError("jobs must be a positive integer")
+    if not checks:
+        return None
+
+    import queue
+    import threading
+
+    pending: queue.SimpleQueue[t.Callable[[], T | None]] = queue.SimpleQueue()
+    for check in checks:
+        pending.put(check)
+    results: queue.SimpleQueue[tuple[T | None, Exception | None]] = queue.SimpleQueue()
+    stop = threading.Event()
+
+    def _worker() -> None:
+        while not stop.is_set():
+            try:
+                check = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = check()
+            except Exception as e:
+                results.put((None, e))
+                continue
+            if result is not None:
+                # no more checks are started once any result is found
+                stop.set()
+            results.put((result, None))
+
+    for index in range(min(jobs, len(checks))):
+        threading.Thread(
+            target=timing.in_current_context(_worker),
+            name=f"upadup-check-{index}",
+            daemon=True,
+        ).start()
+
+    error: Exception | None = None
+    try:
+        for _ in checks:
+            result, check_error = results.get()
+            if result is not None:
+                return result
+            if error is None:
+                error = check_error
+    finally:
+        stop.set()
+    if error is not None:
+        raise error
+    return None
+
+
+ENGINES: dict[str, type[ThreadedResolver] | type[AsyncResolver]] = {
+    "threads": ThreadedResolver,
+    "asyncio": AsyncResolver,
+}
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+import typing as t
+import urllib.parse
+
+import requests
+
+# statuses which mean that a host is overloaded or failing, and which are retried
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# only requests which are safe to send twice are retried
+_RETRY_METHODS = frozenset({"GET", "HEAD"})
+
+# the longest delay between two attempts of a request, in seconds
+# a longer `Retry-After` is not waited for, and the response is returned as is
+MAX_BACKOFF = 10.0
+# the number of consecutive failures which opens the circuit of a host
+DEFAULT_FAILURE_THRESHOLD = 5
+# the number of seconds for which an open circuit refuses requests, before one
+# request is let through to probe the host
+DEFAULT_COOLDOWN = 30.0
+# a response this many times slower than the fastest from its host is taken as
+# a sign that the host is congested
+SLOW_FACTOR = 5.0
+# but responses faster than this, in seconds, never are
+SLOW_FLOOR = 1.0
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """A request was refused, since too many requests to its host failed."""
+
+
+class DeadlineExceededError(requests.Timeout):
+    """A request was given up on, since the deadline of the run had passed."""
+
+
+class _Host:
+    def __init__(self, name: str, max_concurrency: int) -> None:
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.fastest: float | None = None
+        self.last_decrease = 0.0
+        self.condition = threading.Condition()
+
+
+class Scheduler:
+    """Send requests with a concurrency limit, retries, and a circuit breaker
+    for each host.
+
+    The concurrency limit of a host is adjusted with AIMD. It starts at
+    `max_concurrency`, and is halved when a request fails or is much slower
+    than the fastest seen from the host, at most once per round trip. Each
+    success grows it by `1 / limit`, so that it grows by about one for each
+    limit's worth of successes.
+
+    Connection errors, timeouts, and the statuses in `RETRY_STATUSES` are
+    failures, and GET and HEAD requests which fail are retried up to `retries`
+    times, after a delay chosen at random between zero and an exponential
+    backoff (or after `Retry-After`, if it is longer). Responses which report
+    that a rate limit quota is used up are not retried. Once `failure_threshold`
+    requests to a host fail in a row, its circuit opens, and requests to it
+    raise `CircuitOpenError` for `cooldown` seconds. Then one request is let
+    through, which closes the circuit if it succeeds.
+
+    A request may be given a deadline, a `time.monotonic()` value, after which
+    it is not sent, waited for, or retried.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int,
+        retries: int,
+        backoff_factor: float,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        cooldown: float = DEFAULT_COOLDOWN,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be a positive integer")
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._hosts: dict[str, _Host] = {}
+        self._lock = threading.Lock()
+
+    def host_limit(self, url: str) -> float:
+        """Get the current concurrency limit of the host of a URL."""
+        return self._get_host(url).limit
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        send: t.Callable[[], requests.Response],
+        *,
+        deadline: float | None = None,
+    ) -> requests.Response:
+        """Send a request by calling `send`, once it is allowed to go.
+
+        The last response is returned, even if it has a failing status. If the
+        last attempt raised an error, it is raised.
+
+        :raises CircuitOpenError: if the circuit of the host is open
+        :raises DeadlineExceededError: if the deadline passed before the request
+            could be sent
+        """
+        host = self._get_host(url)
+        retryable = method.upper() in _RETRY_METHODS
+        attempt = 0
+        while True:
+            probe = self._admit(host, url, deadline)
+            start = time.monotonic()
+            try:
+                response = send()
+            except (requests.ConnectionError, requests.Timeout):
+                self._release(host, probe, failed=True, latency=None)
+                delay = self._backoff(attempt)
+                if not self._may_retry(retryable, attempt, delay, deadline):
+                    raise
+            else:
+                failed = response.status_code in RETRY_STATUSES
+                self._release(host, probe, failed, time.monotonic() - start)
+                if not failed or _quota_exhausted(response):
+                    return response
+                delay = max(self._backoff(attempt), _retry_after(response))
+                if delay > MAX_BACKOFF or not self._may_retry(
+                    retryable, attempt, delay, deadline
+                ):
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            attempt += 1
+
+    def _may_retry(
+        self, retryable: bool, attempt: int, delay: float, deadline: float | None
+    ) -> bool:
+        if not retryable or attempt >= self.retries:
+            return False
+        return deadline is None or time.monotonic() + delay < deadline
+
+    def _get_host(self, url: str) -> _Host:
+        name = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            if name not in self._hosts:
+                self._hosts[name] = _Host(name, self.max_concurrency)
+            return self._hosts[name]
+
+    def _admit(self, host: _Host, url: str, deadline: float | None) -> bool:
+        """Wait for a request to the host to be allowed, and return whether it
+        is the probe of an open circuit."""
+        with host.condition:
+            while host.in_flight >= int(host.limit):
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                host.condition.wait(timeout)
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceededError(f"ran out of time before requesting {url}")
+
+            probe = False
+            if host.opened_at is not None:
+                if host.probing or time.monotonic() - host.opened_at < self.cooldown:
+                    raise CircuitOpenError(
+                        f"too many requests to {host.name} failed, "
+                        "and it is not being retried for now"
+                    )
+                host.probing = probe = True
+            host.in_flight += 1
+            return probe
+
+    def _release(
+        self, host: _Host, probe: bool, failed: bool, latency: float | None
+    ) -> None:
+        with host.condition:
+            host.in_flight -= 1
+            if probe:
+                host.probing = False
+            now = time.monotonic()
+
+            if failed:
+                host.failures += 1
+                if probe or host.failures >= self.failure_threshold:
+                    host.opened_at = now
+                self._decrease(host, now)
+            else:
+                host.failures = 0
+                host.opened_at = None
+                assert latency is not None
+                if host.fastest is None or latency < host.fastest:
+                    host.fastest = latency
+                if latency > max(SLOW_FACTOR * host.fastest, SLOW_FLOOR):
+                    self._decrease(host, now)
+                else:
+                    host.limit = min(host.max_concurrency, host.limit + 1 / host.limit)
+            host.condition.notify_all()
+
+    def _decrease(self, host: _Host, now: float) -> None:
+        # requests which were in flight together fail together, and are taken
+        # as one sign of congestion
+        if now - host.last_decrease < (host.fastest or 0.0):
+            return
+        host.limit = max(1.0, host.limit / 2)
+        host.last_decrease = now
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(MAX_BACKOFF, self.backoff_factor * 2**attempt)
+        return random.uniform(0, ceiling)
+
+
+def _quota_exhausted(response: requests.Response) -> bool:
+    # a used up quota, such as that of the GitHub API, only comes back once its
+    # window resets, which is usually minutes away; retrying sooner would only
+    # spend the retries, so waiting for the reset is left to the caller
+    return response.headers.get("X-RateLimit-Remaining") == "0"
+
+
+def _retry_after(response: requests.Response) -> float:
+    try:
+        return float(response.headers.get("Retry-After", 0))
+    except ValueError:
+        # an HTTP date, which GitHub and PyPI do not send
+        return 0.0
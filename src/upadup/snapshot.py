@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import math
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+import time
+import typing as t
+
+from . import resolver
+from .cache import CacheEntry
+
+if t.TYPE_CHECKING:
+    from .providers import pypi
+
+# the version of the snapshot file format, which is checked when opening one
+# 2: PyPI entries are keyed by the URLs of the indexes, as well as the package
+FORMAT_VERSION = 2
+
+_SCHEMA = """\
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+
+class SnapshotError(ValueError):
+    """The index snapshot could not be read."""
+
+
+class SnapshotLookupError(LookupError):
+    """A lookup was made which the index snapshot cannot answer."""
+
+    def __init__(self, namespace: str, key: str) -> None:
+        super().__init__(namespace, key)
+        self.namespace = namespace
+        self.key = key
+
+    def __str__(self) -> str:
+        return f"{self.namespace} lookup of '{self.key}' is not in the index snapshot"
+
+
+class IndexSnapshot:
+    """A read-only store of lookup results, for use without network access.
+
+    The snapshot can be given to a `VersionMap` or `TagMap` in place of a
+    `VersionCache`. Every entry is treated as fresh, and a lookup which is not in
+    the snapshot raises `SnapshotLookupError`, rather than going to the network.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+        if not path.is_file():
+            raise SnapshotError(f"index snapshot not found: {path}")
+        uri = f"{path.resolve().as_uri()}?mode=ro"
+        try:
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'format_version'"
+            ).fetchone()
+        except sqlite3.Error as e:
+            raise SnapshotError(f"cannot read index snapshot {path}: {e}") from e
+        if row is None or row[0] != str(FORMAT_VERSION):
+            self._conn.close()
+            raise SnapshotError(
+                f"index snapshot {path} has an unsupported format, rebuild it "
+                "with 'upadup index build'"
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM entries "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        if row is None:
+            raise SnapshotLookupError(namespace, key)
+        value, fetched_at = row
+        return CacheEntry(value, None, None, fetched_at, math.inf)
+
+    # the snapshot is never modified by lookups
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        pass
+
+    def touch(self, namespace: str, key: str, *, ttl: float | None = None) -> None:
+        pass
+
+
+class _RecordingStore:
+    """A store which is always empty, but records every result written to it."""
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple[str, str], tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> CacheEntry | None:
+        return None
+
+    def set(
+        self,
+        namespace: str,
+        key: str,
+        value: str,
+        *,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        ttl: float | None = None,
+    ) -> None:
+        with self._lock:
+            self.entries[(namespace, key)] = (value, time.time())
+
+    def touch(self, namespace: str, key: str, *, ttl: float | None = None) -> None:
+        pass
+
+
+def build_snapshot(
+    path: pathlib.Path,
+    package_names: t.Iterable[str],
+    repo_names: t.Iterable[str],
+    *,
+    jobs: int = resolver.DEFAULT_JOBS,
+    indexes: t.Sequence[pypi.PackageIndex] | None = None,
+) -> int:
+    """Look up packages and GitHub repos, and write the results to a snapshot.
+
+    The file is replaced atomically, so that readers never see a partial
+    snapshot. Returns the number of entries written.
+
+    :raises SnapshotError: if any lookup failed
+    """
+    from .providers import github, pypi
+
+    if indexes is None:
+        indexes = pypi.select_indexes()
+    recorder = _RecordingStore()
+    version_map = pypi.VersionMap(store=recorder, indexes=indexes)
+    tag_map = github.TagMap(store=recorder)
+    resolver.ThreadedResolver(jobs=jobs).resolve(
+        version_map, tag_map, package_names, repo_names
+    )
+    # a snapshot missing these lookups would fail every later lookup of them
+    for kind, failures in (
+        ("packages", version_map.failures),
+        ("GitHub repos", tag_map.failures),
+    ):
+        if failures:
+            name, error = min(failures.items())
+            raise SnapshotError(
+                f"{len(failures)} {kind} could not be looked up, "
+                f"including {name}: {error}"
+            )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_name)
+        try:
+            conn.executescript(_SCHEMA)
+            conn.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("format_version", str(FORMAT_VERSION)),
+                    ("created_at", str(time.time())),
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO entries (namespace, key, value, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (namespace, key, value, fetched_at)
+                    for (namespace, key), (value, fetched_at) in sorted(
+                        recorder.entries.items()
+                    )
+                ],
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return len(recorder.entries)
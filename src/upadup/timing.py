@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import json
+import os
+import pathlib
+import threading
+import time
+import typing as t
+
+
+class Span(t.NamedTuple):
+    """A timed piece of work.
+
+    `start` is a `time.perf_counter()` value, and `duration` is in seconds.
+    `args` holds details of the work, such as whether a lookup was a cache hit,
+    or how many bytes a request received.
+    """
+
+    name: str
+    category: str
+    start: float
+    duration: float
+    thread_id: int
+    args: dict[str, t.Any]
+
+
+SpanCallback = t.Callable[[Span], None]
+T = t.TypeVar("T")
+
+# the callbacks which receive spans in the current context
+# lookups run on other threads, and the resolvers carry the context over to them
+_callbacks: contextvars.ContextVar[tuple[SpanCallback, ...]] = contextvars.ContextVar(
+    "upadup_span_callbacks", default=()
+)
+
+
+@contextlib.contextmanager
+def collect(callback: SpanCallback | None) -> t.Iterator[None]:
+    """Send every span which ends in this context to `callback`.
+
+    The callback may be called from several threads at once. If it is None,
+    nothing changes.
+    """
+    if callback is None:
+        yield
+        return
+
+    token = _callbacks.set(_callbacks.get() + (callback,))
+    try:
+        yield
+    finally:
+        _callbacks.reset(token)
+
+
+@contextlib.contextmanager
+def span(name: str, category: str, **args: t.Any) -> t.Iterator[dict[str, t.Any]]:
+    """Time a piece of work, if anything is collecting spans.
+
+    The `args` dict is yielded, so that details found during the work can be
+    added to it.
+    """
+    callbacks = _callbacks.get()
+    if not callbacks:
+        yield args
+        return
+
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        finished = Span(
+            name,
+            category,
+            start,
+            time.perf_counter() - start,
+            threading.get_ident(),
+            args,
+        )
+        for callback in callbacks:
+            callback(finished)
+
+
+def in_current_context(func: t.Callable[..., T]) -> t.Callable[..., T]:
+    """Wrap a function to run in the current context, when called on any thread.
+
+    Threads do not inherit the context of the thread which started them, so
+    work which is handed to a thread pool is wrapped with this, for its spans
+    to be collected.
+    """
+    context = contextvars.copy_context()
+
+    def _run(*args: t.Any, **kwargs: t.Any) -> T:
+        # a context cannot be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+
+    return _run
+
+
+class SpanRecorder:
+    """Collect spans from any thread, for reporting once a run is done."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, finished: Span) -> None:
+        with self._lock:
+            self.spans.append(finished)
+
+    def write_chrome_trace(self, path: pathlib.Path) -> None:
+        """Write the spans in the Chrome trace event format.
+
+        The file can be opened in `chrome://tracing` or https://ui.perfetto.dev .
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": s.start * 1e6,
+                "dur": s.duration * 1e6,
+                "pid": pid,
+                "tid": s.thread_id,
+                "args": s.args,
+            }
+            for s in sorted(self.spans, key=lambda s: s.start)
+        ]
+        path.write_text(
+            json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, default=str)
+        )
+
+    def format_summary(self) -> str:
+        """Summarize the spans as a table, with one row for each kind of work."""
+        rows: dict[tuple[str, str], list[Span]] = collections.defaultdict(list)
+        for s in self.spans:
+            rows[(s.category, s.name)].append(s)
+
+        lines = [
+            f"{'category':<10} {'name':<16} {'count':>6} {'total':>10} "
+            f"{'max':>10}  details"
+        ]
+        for (category, name), spans in sorted(rows.items()):
+            durations = [s.duration for s in spans]
+            lines.append(
+                f"{category:<10} {name:<16} {len(spans):>6} "
+                f"{_format_seconds(sum(durations)):>10} "
+                f"{_format_seconds(max(durations)):>10}  {_summarize_args(spans)}"
+            )
+        return "\n".join(lines)
+
+
+def _summarize_args(spans: list[Span]) -> str:
+    details: list[str] = []
+    outcomes = collections.Counter(s.args["cache"] for s in spans if "cache" in s.args)
+    details.extend(f"{outcome}={count}" for outcome, count in sorted(outcomes.items()))
+    received = sum(s.args.get("bytes", 0) for s in spans)
+    if received:
+        details.append(f"bytes={received}")
+    return " ".join(details)
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.1f}ms"
+    return f"{seconds:.2f}s"
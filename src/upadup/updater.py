@@ -1,38 +1,75 @@
 from __future__ import annotations
 
-import collections
-import difflib
 import functools
+import os
 import pathlib
+import stat
 import sys
+import tempfile
 import typing as t
 
-from . import config, yaml
-from .providers import github, pypi
+from . import config, diff, resolver, timing, yaml
 
+# providers are imported only once a lookup is needed, so that configs with no
+# dependencies to update are checked without importing them
+if t.TYPE_CHECKING:
+    from . import cache
+    from .providers import github, pypi
 
-def _load_precommit_config(path: pathlib.Path) -> dict[str, t.Any]:
+
+class ConfigChangedError(RuntimeError):
+    """The config was modified by something else after upadup read it."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        super().__init__(
+            f"{path} was changed after it was read, refusing to overwrite it"
+        )
+        self.path = path
+
+
+class _ConfigFile(t.NamedTuple):
+    # the full text of the config, exactly as read
+    text: str
+    # the identity of the file which was read, to detect later modifications
+    signature: tuple[int, int, int, int]
+
+
+def _stat_signature(stat_result: os.stat_result) -> tuple[int, int, int, int]:
+    return (
+        stat_result.st_dev,
+        stat_result.st_ino,
+        stat_result.st_size,
+        stat_result.st_mtime_ns,
+    )
+
+
+def _read_config_file(path: pathlib.Path) -> _ConfigFile:
     if not path.is_file():
         raise ValueError("upadup cannot run without .pre-commit-config.yaml")
 
-    return yaml.load(path.read_bytes().decode())
+    with timing.span("read", "config", path=str(path)) as info, path.open("rb") as fp:
+        # stat before reading, so that a write during the read is also detected
+        signature = _stat_signature(os.fstat(fp.fileno()))
+        content = fp.read()
+        info["bytes"] = len(content)
+    return _ConfigFile(content.decode(), signature)
 
 
 class UpdateCollection:
     def __init__(self) -> None:
-        self._data: list[tuple[yaml.StrWithLoc, str]] = []
+        self._data: list[tuple[yaml.DependencyRecord, str]] = []
 
-    def add(self, original: yaml.StrWithLoc, new: str) -> None:
+    def add(self, original: yaml.DependencyRecord, new: str) -> None:
         self._data.append((original, new))
 
-    def extend(self, additions: t.Iterable[tuple[yaml.StrWithLoc, str]]) -> None:
+    def extend(self, additions: t.Iterable[tuple[yaml.DependencyRecord, str]]) -> None:
         self._data.extend(additions)
 
     def sort(self) -> None:
         """sort data in place"""
         self._data = sorted(self._data, key=_sort_updates_key)
 
-    def __iter__(self) -> t.Iterator[tuple[yaml.StrWithLoc, str]]:
+    def __iter__(self) -> t.Iterator[tuple[yaml.DependencyRecord, str]]:
         yield from self._data
 
     def __bool__(self) -> bool:
@@ -41,88 +78,220 @@ class UpdateCollection:
 
 def _sort_updates_key(update):
     current_dependency, new_dependency = update
-    return (current_dependency.lc.line, current_dependency.lc.col)
+    return current_dependency.offset
 
 
 class UpadupUpdater:
-    def __init__(self, path: pathlib.Path | None = None, freeze: bool = False) -> None:
+    def __init__(
+        self,
+        path: pathlib.Path | None = None,
+        freeze: bool = False,
+        jobs: int = resolver.DEFAULT_JOBS,
+        engine: str = "threads",
+        version_cache: cache.Store | None = None,
+        refresh: bool = False,
+        version_map: pypi.VersionMap | None = None,
+        tag_map: github.TagMap | None = None,
+        config_dir: pathlib.Path | None = None,
+        indexes: t.Sequence[pypi.PackageIndex] | None = None,
+        on_span: timing.SpanCallback | None = None,
+    ) -> None:
+        """
+        :param on_span: a callback which receives a `timing.Span` for each timed
+            piece of work done by the updater, such as reading the config or
+            looking up a package. It may be called from several threads at once.
+        """
         self.freeze = freeze
         self.path = path or (pathlib.Path.cwd() / ".pre-commit-config.yaml")
+        # the name of the file, as shown in diffs
+        self.display_name = self.path.name
+        self._config_dir = config_dir
         self._updates = UpdateCollection()
 
-        precommit_config = _load_precommit_config(self.path)
-        self._precommit_config = precommit_config
-
-        self._version_map = pypi.VersionMap()
+        self._on_span = on_span
+
+        # the file is read once, and the same text is parsed and rewritten
+        with timing.collect(self._on_span):
+            self._config_file = _read_config_file(self.path)
+            with timing.span("parse", "config") as info:
+                self._hooks = yaml.extract_hook_dependencies(self._config_file.text)
+                info["dependencies"] = sum(len(hook) for hook in self._hooks)
+
+        self._version_cache = version_cache
+        self._refresh = refresh
+        self._indexes = indexes
+        # maps may be shared between updaters, so that every lookup happens once
+        if version_map is not None:
+            self._version_map = version_map
+        if tag_map is not None:
+            self._tag_map = tag_map
+        if engine not in resolver.ENGINES:
+            raise ValueError(f"unknown resolution engine: {engine!r}")
+        self._resolver = resolver.ENGINES[engine](jobs=jobs)
 
     @functools.cached_property
     def _upadup_config(self) -> config.Config:
-        return config.Config.load()
+        return config.Config.load(self._config_dir)
+
+    @functools.cached_property
+    def _version_map(self) -> pypi.VersionMap:
+        from .providers import pypi
+
+        # unless indexes are given, they come from the environment and config
+        indexes = self._indexes
+        if indexes is None:
+            indexes = pypi.select_indexes(configured=self._upadup_config.indexes)
+        return pypi.VersionMap(
+            store=self._version_cache, refresh=self._refresh, indexes=indexes
+        )
+
+    @functools.cached_property
+    def _tag_map(self) -> github.TagMap:
+        from .providers import github
+
+        return github.TagMap(store=self._version_cache, refresh=self._refresh)
 
     def has_updates(self) -> bool:
         return bool(self._updates)
 
     def render_diff(self) -> str:
-        old_content, new_content = _create_new_content(self.path, self._updates)
-        return "".join(
-            difflib.unified_diff(
-                old_content,
-                new_content,
-                self.path.name,
-                self.path.name,
+        with timing.collect(self._on_span), timing.span("diff", "rewrite"):
+            return diff.unified_diff(
+                self._config_file.text,
+                self._updates,
+                self.display_name,
+                self.display_name,
             )
-        )
 
     def apply_updates(self) -> None:
-        _, new_content = _create_new_content(self.path, self._updates)
-
-        # write the data as UTF-8 bytes, to ensure that `\r\n` is not turned into
-        # `\r\r\n` on Windows, where `os.linesep` is `\r\n`
-        self.path.write_bytes("".join(new_content).encode())
+        """Write the updated config in place of the original.
+
+        :raises ConfigChangedError: if the config was modified since it was read
+        """
+        with timing.collect(self._on_span):
+            with timing.span("content", "rewrite"):
+                new_content = _create_new_content(self._config_file.text, self._updates)
+
+            # write the data as UTF-8 bytes, to ensure that `\r\n` is not turned
+            # into `\r\r\n` on Windows, where `os.linesep` is `\r\n`
+            data = new_content.encode()
+            with timing.span("write", "rewrite", bytes=len(data)):
+                _replace_file(self.path, data, self._config_file.signature)
+
+    def find_first_update(self) -> FoundUpdate | None:
+        """Find any one update to the config, with as few lookups as possible.
+
+        See `find_first_update`.
+        """
+        with timing.collect(self._on_span):
+            return find_first_update([self])
+
+    def collect_lookups(self) -> tuple[set[str], set[str]]:
+        """Get the distinct package names and GitHub repos which need lookups."""
+        with timing.collect(self._on_span):
+            return _collect_lookups(self._iter_hooks())
+
+    def unchecked_dependencies(self) -> list[UncheckedDependency]:
+        """Get the dependencies which could not be checked, and why.
+
+        Lookups are given up on once the GitHub API rate limit is used up, or
+        the deadline set with `http.set_deadline` passes, rather than failing
+        the run.
+        """
+        unchecked = []
+        for hook in self._iter_hooks():
+            for record in hook:
+                key = _lookup_key(record.dependency)
+                if key is None:
+                    continue
+                provider, name = key
+                error = self._lookup_map(provider).failure(name)
+                if error is not None:
+                    unchecked.append(UncheckedDependency(self, record, error))
+        return unchecked
 
     def run(self) -> UpdateCollection:
-        for precommit_repo_config in self._precommit_config["repos"]:
-            if precommit_repo_config["repo"] in self._upadup_config.skip_repos:
-                continue
+        with timing.collect(self._on_span):
+            hooks = list(self._iter_hooks())
 
-            for hook_config in precommit_repo_config["hooks"]:
-                if not hook_config.get("additional_dependencies"):
-                    continue
-                self._updates.extend(self._generate_hook_updates(hook_config))
+            # first, resolve every distinct lookup concurrently
+            # then, walk the hooks in file order, so that output is deterministic
+            self._prefetch(hooks)
+            for hook in hooks:
+                self._updates.extend(self._generate_hook_updates(hook))
 
         self._updates.sort()
         return self._updates
 
+    def _iter_hooks(self) -> t.Iterator[list[yaml.DependencyRecord]]:
+        # every hook has at least one dependency, and all of a hook's
+        # dependencies belong to the same repo
+        for hook in self._hooks:
+            if hook[0].repo in self._upadup_config.skip_repos:
+                continue
+            yield hook
+
+    def _prefetch(self, hooks: list[list[yaml.DependencyRecord]]) -> None:
+        if not hooks:
+            return
+        package_names, repo_names = _collect_lookups(hooks)
+        with timing.span(
+            "resolve", "lookup", packages=len(package_names), repos=len(repo_names)
+        ):
+            self._resolver.resolve(
+                self._version_map, self._tag_map, package_names, repo_names
+            )
+
     def _generate_hook_updates(
-        self, hook_config: dict[str, t.Any]
-    ) -> t.Iterator[tuple[yaml.StrWithLoc, str]]:
+        self, hook: list[yaml.DependencyRecord]
+    ) -> t.Iterator[tuple[yaml.DependencyRecord, str]]:
         print(
-            f"upadup is checking additional_dependencies of {hook_config['id']}...",
+            f"upadup is checking additional_dependencies of {hook[0].hook_id}...",
             end="",
         )
-        new_deps = self._build_updated_dependency_map(hook_config)
+        new_deps = self._build_updated_dependency_map(hook)
         if new_deps:
             print()
             for current_dependency, new_dependency in new_deps.items():
-                print(f"  {current_dependency} => {new_dependency}")
+                print(f"  {current_dependency.dependency} => {new_dependency}")
                 yield (current_dependency, new_dependency)
         else:
             print("no updates needed")
 
     def _build_updated_dependency_map(
-        self, hook_config: dict[str, t.Any]
-    ) -> dict[yaml.StrWithLoc, t.Any]:
+        self, hook: list[yaml.DependencyRecord]
+    ) -> dict[yaml.DependencyRecord, str]:
         new_deps = {}
-        for current in hook_config.get("additional_dependencies", ()):
-            new_dependency = self._update_dependency(current)
-            if new_dependency == current:
+        for current in hook:
+            new_dependency = self._update_dependency(current.dependency)
+            if new_dependency == current.dependency:
                 continue
             new_deps[current] = new_dependency
         return new_deps
 
+    def _lookup_map(self, provider: str) -> t.Any:
+        if provider == "github":
+            return self._tag_map
+        return self._version_map
+
     def _update_dependency(self, current_dependency: str) -> str:
+        from .providers import github, pypi
+
         if current_dependency.startswith("github.com/"):
-            return github.get_latest_tag(current_dependency, freeze=self.freeze)
+            owner, repo = github.parse_dependency(current_dependency)
+            if self._tag_map.failure(f"{owner}/{repo}") is not None:
+                return current_dependency
+            if self._tag_map[f"{owner}/{repo}"].latest is None:
+                # a warning only, since the repo's tags are not for us to fix
+                print(
+                    f"no version tags were found for {owner}/{repo}, "
+                    f"'{current_dependency}' is left as it is",
+                    file=sys.stderr,
+                )
+                return current_dependency
+            return self._tag_map.update_dependency(
+                current_dependency, freeze=self.freeze
+            )
         try:
             specifier = pypi.parse_specifier(current_dependency)
         except pypi.UnsupportedSpecifierError:
@@ -134,28 +303,171 @@ class UpadupUpdater:
             )
             return current_dependency
 
+        if self._version_map.failure(specifier.package_name) is not None:
+            return current_dependency
         new_version = self._version_map[specifier.package_name]
+        if new_version != specifier.version and not specifier.allows(new_version):
+            print(
+                f"'{current_dependency}' cannot be updated to {new_version}, "
+                "which its other clauses exclude, skipping",
+                file=sys.stderr,
+            )
+            return current_dependency
         return specifier.update_version(new_version).format()
 
 
+def _collect_lookups(
+    hooks: t.Iterable[list[yaml.DependencyRecord]],
+) -> tuple[set[str], set[str]]:
+    """Gather the distinct package names and GitHub repos of many hooks.
+
+    Dependencies which cannot be parsed are ignored here; they are reported when
+    the hook is checked.
+    """
+    from .providers import github, pypi
+
+    specifiers: list[str] = []
+    repo_names: set[str] = set()
+    for hook in hooks:
+        for record in hook:
+            if record.dependency.startswith("github.com/"):
+                owner, repo = github.parse_dependency(record.dependency)
+                repo_names.add(f"{owner}/{repo}")
+            else:
+                specifiers.append(record.dependency)
+    # workspaces repeat the same specifiers across many configs, and each
+    # distinct one is parsed once
+    package_names = {
+        specifier.package_name
+        for specifier in pypi.parse_specifiers(specifiers).values()
+    }
+    return package_names, repo_names
+
+
+def _lookup_key(dependency: str) -> tuple[str, str] | None:
+    """Get the provider and the name by which a dependency is looked up, if any."""
+    from .providers import github, pypi
+
+    if dependency.startswith("github.com/"):
+        owner, repo = github.parse_dependency(dependency)
+        return ("github", f"{owner}/{repo}")
+    try:
+        specifier = pypi.parse_specifier(dependency)
+    except (pypi.UnsupportedSpecifierError, pypi.SpecifierParseError):
+        return None
+    return ("pypi", specifier.package_name)
+
+
+class FoundUpdate(t.NamedTuple):
+    updater: UpadupUpdater
+    record: yaml.DependencyRecord
+    new_dependency: str
+
+
+class UncheckedDependency(t.NamedTuple):
+    updater: UpadupUpdater
+    record: yaml.DependencyRecord
+    error: Exception
+
+
+def find_first_update(updaters: t.Sequence[UpadupUpdater]) -> FoundUpdate | None:
+    """Find any one update to the given configs, with as few lookups as possible.
+
+    Dependencies are checked cheapest first: those which can be answered from
+    memory or the persistent store, then PyPI lookups, then GitHub lookups. The
+    lookups run concurrently, and as soon as one confirms an update, the rest
+    are abandoned. Each distinct lookup is made once, using the maps of the first
+    updater which needs it, so updaters should share their maps.
+
+    Returns None if every dependency is up to date.
+    """
+    by_key: dict[tuple[str, str], list[tuple[UpadupUpdater, yaml.DependencyRecord]]]
+    by_key = {}
+    for updater in updaters:
+        for hook in updater._iter_hooks():
+            for record in hook:
+                key = _lookup_key(record.dependency)
+                if key is not None:
+                    by_key.setdefault(key, []).append((updater, record))
+
+    def _check(key: tuple[str, str], value: t.Any) -> FoundUpdate | None:
+        provider, name = key
+        for updater, record in by_key[key]:
+            updater._lookup_map(provider).prefill({name: value})
+            new_dependency = updater._update_dependency(record.dependency)
+            if new_dependency != record.dependency:
+                return FoundUpdate(updater, record, new_dependency)
+        return None
+
+    def _fetch_and_check(key: tuple[str, str]) -> FoundUpdate | None:
+        provider, name = key
+        lookup_map = by_key[key][0][0]._lookup_map(provider)
+        try:
+            value = lookup_map.fetch(name)
+        except Exception:
+            # lookups which the map recorded as failed are reported as unchecked
+            if lookup_map.failure(name) is None:
+                raise
+            return None
+        return _check(key, value)
+
+    remaining = []
+    for key, needed_by in by_key.items():
+        value = needed_by[0][0]._lookup_map(key[0]).peek(key[1])
+        if value is None:
+            remaining.append(key)
+            continue
+        found = _check(key, value)
+        if found is not None:
+            return found
+
+    if not remaining:
+        return None
+    # PyPI lookups are generally faster than GitHub lookups, so start them first
+    remaining.sort(key=lambda key: key[0] == "github")
+    return resolver.first_result(
+        [functools.partial(_fetch_and_check, key) for key in remaining],
+        jobs=updaters[0]._resolver.jobs,
+    )
+
+
 def _create_new_content(
-    config_path: pathlib.Path, updates: UpdateCollection
-) -> tuple[list[str], list[str]]:
-    # preserve the original newlines, do not modify them
-    with config_path.open("r", newline="", encoding="utf-8") as fp:
-        old_content = fp.readlines()
-    new_content = old_content.copy()
-
-    # NB: int() == 0
-    line_offsets: dict[int, int] = collections.defaultdict(int)
-    for old_dep, new_dep in updates:
-        lineno, column = old_dep.lc.line, old_dep.lc.col
-
-        begin = column + line_offsets[lineno]
-        end = begin + len(old_dep)
-        line_offsets[lineno] += len(new_dep) - len(old_dep)
-
-        old_line = new_content[lineno]
-        new_content[lineno] = "".join((old_line[:begin], new_dep, old_line[end:]))
-
-    return old_content, new_content
+    text: str, updates: t.Iterable[tuple[yaml.DependencyRecord, str]]
+) -> str:
+    # each update is spliced in at the offset of the dependency it replaces, in a
+    # single pass over the text, and the pieces are joined into one new string
+    # all other text, including the original newlines, is kept as it was
+    parts = []
+    position = 0
+    for old_dep, new_dep in sorted(updates, key=_sort_updates_key):
+        start = old_dep.offset
+        parts.append(text[position:start])
+        parts.append(new_dep)
+        position = start + len(old_dep.dependency)
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def _replace_file(
+    path: pathlib.Path, content: bytes, signature: tuple[int, int, int, int]
+) -> None:
+    """Atomically replace the contents of a file, if it has not been modified.
+
+    The new contents are written to a temporary file alongside the original,
+    which is then moved over it, so that the file is never partially written.
+    A symlink is followed, and the file it points to is replaced.
+    """
+    path = pathlib.Path(os.path.realpath(path))
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(content)
+
+        current = os.stat(path)
+        os.chmod(tmp_name, stat.S_IMODE(current.st_mode))
+        if _stat_signature(current) != signature:
+            raise ConfigChangedError(path)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import concurrent.futures
+import os
+import pathlib
+import subprocess
+import typing as t
+
+from . import cache, config, resolver, timing
+from .providers import github, pypi
+from .updater import (
+    FoundUpdate,
+    UncheckedDependency,
+    UpadupUpdater,
+    find_first_update,
+)
+
+CONFIG_FILENAME = ".pre-commit-config.yaml"
+
+
+def find_config_files(paths: t.Iterable[pathlib.Path]) -> list[pathlib.Path]:
+    """Find every pre-commit config under the given paths.
+
+    Inside of git repos, files ignored by git are skipped. Elsewhere, hidden
+    directories are skipped.
+
+    :raises FileNotFoundError: if any of the paths does not exist
+    """
+    found: set[pathlib.Path] = set()
+    for path in paths:
+        if not path.exists():
+            raise FileNotFoundError(f"no such file or directory: {path}")
+        if path.is_file():
+            found.add(path)
+            continue
+        files: t.Iterable[pathlib.Path] | None = _git_ls_files(path)
+        if files is None:
+            files = _walk_files(path)
+        found.update(f for f in files if f.name == CONFIG_FILENAME)
+    return sorted(found)
+
+
+def _git_ls_files(directory: pathlib.Path) -> list[pathlib.Path] | None:
+    command = ["git", "-C", str(directory), "ls-files", "-z"]
+    command.extend(["--cached", "--others", "--exclude-standard"])
+    try:
+        completed_process = subprocess.run(command, capture_output=True)
+    except OSError:
+        return None
+    if completed_process.returncode != 0:
+        return None
+    return [
+        directory / os.fsdecode(name)
+        for name in completed_process.stdout.split(b"\0")
+        if name
+    ]
+
+
+def _walk_files(directory: pathlib.Path) -> t.Iterator[pathlib.Path]:
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            yield pathlib.Path(dirpath) / filename
+
+
+class Workspace:
+    """Update many pre-commit configs in one process.
+
+    The configs are parsed concurrently, and the union of their lookups is
+    resolved once, before each config is checked.
+    Each config uses the upadup config found beside it, except for package
+    indexes, which are shared. Unless indexes are given, they are chosen using
+    the upadup config in the current directory.
+    """
+
+    def __init__(
+        self,
+        paths: t.Iterable[pathlib.Path],
+        *,
+        freeze: bool = False,
+        jobs: int = resolver.DEFAULT_JOBS,
+        engine: str = "threads",
+        version_cache: cache.Store | None = None,
+        refresh: bool = False,
+        indexes: t.Sequence[pypi.PackageIndex] | None = None,
+        on_span: timing.SpanCallback | None = None,
+    ) -> None:
+        if engine not in resolver.ENGINES:
+            raise ValueError(f"unknown resolution engine: {engine!r}")
+        self._on_span = on_span
+        if indexes is None:
+            with timing.collect(on_span):
+                configured = config.Config.load().indexes
+            indexes = pypi.select_indexes(configured=configured)
+        self._resolver = resolver.ENGINES[engine](jobs=jobs)
+        self._version_map = pypi.VersionMap(
+            store=version_cache, refresh=refresh, indexes=indexes
+        )
+        self._tag_map = github.TagMap(store=version_cache, refresh=refresh)
+
+        def _load(path: pathlib.Path) -> UpadupUpdater:
+            updater = UpadupUpdater(
+                path,
+                freeze=freeze,
+                jobs=jobs,
+                engine=engine,
+                version_map=self._version_map,
+                tag_map=self._tag_map,
+                config_dir=path.parent,
+                on_span=on_span,
+            )
+            updater.display_name = str(path)
+            return updater
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            self.updaters = list(executor.map(timing.in_current_context(_load), paths))
+
+    def run(self) -> None:
+        package_names: set[str] = set()
+        repo_names: set[str] = set()
+        for updater in self.updaters:
+            updater_package_names, updater_repo_names = updater.collect_lookups()
+            package_names |= updater_package_names
+            repo_names |= updater_repo_names
+
+        with (
+            timing.collect(self._on_span),
+            timing.span(
+                "resolve", "lookup", packages=len(package_names), repos=len(repo_names)
+            ),
+        ):
+            self._resolver.resolve(
+                self._version_map, self._tag_map, package_names, repo_names
+            )
+
+        for updater in self.updaters:
+            print(f"upadup is checking {updater.display_name}")
+            updater.run()
+
+    def find_first_update(self) -> FoundUpdate | None:
+        """Find any one update to the configs, with as few lookups as possible."""
+        return find_first_update(self.updaters)
+
+    def unchecked_dependencies(self) -> list[UncheckedDependency]:
+        return [
+            unchecked
+            for updater in self.updaters
+            for unchecked in updater.unchecked_dependencies()
+        ]
+
+    def has_updates(self) -> bool:
+        return any(updater.has_updates() for updater in self.updaters)
+
+    def render_diff(self) -> str:
+        return "".join(
+            updater.render_diff() for updater in self.updaters if updater.has_updates()
+        )
+
+    def apply_updates(self) -> None:
+        for updater in self.updaters:
+            if updater.has_updates():
+                updater.apply_updates()
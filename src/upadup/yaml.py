@@ -1,85 +1,187 @@
+from __future__ import annotations
+
 import typing as t
 
 import ruamel.yaml
-
-# see: https://stackoverflow.com/a/45717104/2669818
-# construct specialzed string types which add an `lc` slot to
-# store the line and column numbers
-
-
-class _StrWithLoc(ruamel.yaml.scalarstring.ScalarString):
-    __slots__ = "lc"
-
-    style = ""
-
-    def __new__(cls, value):
-        return ruamel.yaml.scalarstring.ScalarString.__new__(cls, value)
-
-
-# define StrWithLoc as above at runtime, but specialize it for type checkers
-if t.TYPE_CHECKING:
-
-    class Loc(t.NamedTuple):
-        line: int
-        col: int
-
-    class StrWithLoc(str):
-        lc: Loc
-
-else:
-    StrWithLoc = _StrWithLoc
-
-
-class PreservedScalarStringWithLoc(ruamel.yaml.scalarstring.PreservedScalarString):
-    __slots__ = "lc"
-
-
-class DoubleQuotedScalarStringWithLoc(
-    ruamel.yaml.scalarstring.DoubleQuotedScalarString
-):
-    __slots__ = "lc"
-
-
-class SingleQuotedScalarStringWithLoc(
-    ruamel.yaml.scalarstring.SingleQuotedScalarString
-):
-    __slots__ = "lc"
-
-
-class ConstructorWithStrLocs(ruamel.yaml.constructor.RoundTripConstructor):
-    def construct_scalar(self, node):
-        if not isinstance(node, ruamel.yaml.nodes.ScalarNode):
-            raise ruamel.yaml.constructor.ConstructorError(
-                None,
-                None,
-                "expected a scalar node, but found %s" % node.id,
-                node.start_mark,
+import ruamel.yaml.events
+
+try:
+    from ruamel.yaml.cyaml import CParser
+except ImportError:  # the C extension is not installed
+    CParser = None
+
+
+class DependencyRecord(t.NamedTuple):
+    """One of the `additional_dependencies` of a hook, and where it was found.
+
+    `line` and `col` are zero-based, and point at the first character of the
+    dependency string, inside of any quotes. `offset` is the index of that same
+    character in the text of the config.
+    """
+
+    repo: str
+    hook_id: str
+    dependency: str
+    line: int
+    col: int
+    offset: int
+
+
+# the depths at which the interesting scalars are found, counting containers
+#   repos[i].repo
+_REPO_DEPTH = 3
+#   repos[i].hooks[j].id
+_HOOK_ID_DEPTH = 5
+#   repos[i].hooks[j].additional_dependencies[k]
+_DEPENDENCY_DEPTH = 6
+
+_NODE_EVENTS = (ruamel.yaml.events.ScalarEvent, ruamel.yaml.events.AliasEvent)
+_MAPPING_START = ruamel.yaml.events.MappingStartEvent
+
+
+class _Frame:
+    __slots__ = ("is_mapping", "is_key", "key", "awaiting_key")
+
+    def __init__(self, is_mapping: bool, is_key: bool = False) -> None:
+        self.is_mapping = is_mapping
+        # whether this container is itself the key of a mapping
+        self.is_key = is_key
+        # the key of the current child, or its index in a sequence
+        self.key: t.Any = None if is_mapping else -1
+        self.awaiting_key = is_mapping
+
+
+def extract_hook_dependencies(text: str) -> list[list[DependencyRecord]]:
+    """Find the `additional_dependencies` of every hook in a pre-commit config.
+
+    The config is read as a stream of parser events, using the C parser when it
+    is available, and no document is constructed. Only the first document is
+    read.
+
+    Returns one list of records for each hook with dependencies, in file order.
+    """
+    # the C parser does not count a byte order mark in its offsets, and the pure
+    # parser does, so it is removed before parsing and added back to the records
+    bom_length = len(text) - len(text.removeprefix("\ufeff"))
+    text = text[bom_length:]
+
+    repo_urls: dict[int, str] = {}
+    hook_ids: dict[tuple[int, int], str] = {}
+    dependencies: dict[tuple[int, int], list[tuple[str, int, int, int]]] = {}
+
+    stack: list[_Frame] = []
+    for event in _parse(text):
+        if isinstance(event, ruamel.yaml.events.DocumentEndEvent):
+            break
+        is_start = isinstance(event, ruamel.yaml.events.CollectionStartEvent)
+        is_end = isinstance(event, ruamel.yaml.events.CollectionEndEvent)
+        if not (is_start or is_end or isinstance(event, _NODE_EVENTS)):
+            continue
+
+        if is_end:
+            if not stack.pop().is_key:
+                _complete_node(stack)
+            continue
+
+        parent = stack[-1] if stack else None
+        if parent is not None:
+            if not parent.is_mapping:
+                parent.key += 1
+            elif parent.awaiting_key:
+                parent.awaiting_key = False
+                if isinstance(event, ruamel.yaml.events.ScalarEvent):
+                    parent.key = event.value
+                    continue
+                # only scalar keys are meaningful, complex keys are skipped over
+                parent.key = None
+                if is_start:
+                    stack.append(_Frame(isinstance(event, _MAPPING_START), True))
+                continue
+
+        if is_start:
+            stack.append(_Frame(isinstance(event, _MAPPING_START)))
+            continue
+
+        if isinstance(event, ruamel.yaml.events.ScalarEvent):
+            depth = len(stack)
+            if depth in (_REPO_DEPTH, _HOOK_ID_DEPTH, _DEPENDENCY_DEPTH):
+                _record_scalar(text, stack, event, repo_urls, hook_ids, dependencies)
+        _complete_node(stack)
+
+    return [
+        [
+            DependencyRecord(
+                repo_urls.get(repo_index, ""),
+                hook_ids.get((repo_index, hook_index), ""),
+                dependency,
+                line,
+                col + bom_length if line == 0 else col,
+                offset + bom_length,
             )
-
-        offset_col = 0
-        if node.style == "|" and isinstance(node.value, str):
-            ret_val = PreservedScalarStringWithLoc(node.value)
-        elif bool(self._preserve_quotes) and isinstance(node.value, str):
-            if node.style == "'":
-                ret_val = SingleQuotedScalarStringWithLoc(node.value)
-                offset_col = 1
-            elif node.style == '"':
-                ret_val = DoubleQuotedScalarStringWithLoc(node.value)
-                offset_col = 1
-            else:
-                ret_val = StrWithLoc(node.value)
-        else:
-            ret_val = StrWithLoc(node.value)
-        ret_val.lc = ruamel.yaml.comments.LineCol()
-        ret_val.lc.line = node.start_mark.line
-        ret_val.lc.col = node.start_mark.column + offset_col
-        return ret_val
-
-
-_yaml_impl = ruamel.yaml.YAML(typ="rt")
-_yaml_impl.preserve_quotes = True
-_yaml_impl.Constructor = ConstructorWithStrLocs
-
-
-def load(*args, **kwargs):
-    return _yaml_impl.load(*args, **kwargs)
+            for dependency, line, col, offset in hook_dependencies
+        ]
+        for (repo_index, hook_index), hook_dependencies in dependencies.items()
+    ]
+
+
+def _parse(text: str) -> t.Iterator[ruamel.yaml.events.Event]:
+    if CParser is None:
+        yield from ruamel.yaml.YAML(typ="safe", pure=True).parse(text)
+        return
+
+    parser = CParser(text)
+    try:
+        while parser.check_event():
+            yield parser.get_event()
+    finally:
+        parser.dispose()
+
+
+def _complete_node(stack: list[_Frame]) -> None:
+    # after a value in a mapping, the next node is a key
+    if stack and stack[-1].is_mapping:
+        stack[-1].awaiting_key = True
+
+
+def _record_scalar(
+    text: str,
+    stack: list[_Frame],
+    event: ruamel.yaml.events.ScalarEvent,
+    repo_urls: dict[int, str],
+    hook_ids: dict[tuple[int, int], str],
+    dependencies: dict[tuple[int, int], list[tuple[str, int, int, int]]],
+) -> None:
+    path = tuple(frame.key for frame in stack)
+    if path[0] != "repos" or not isinstance(path[1], int):
+        return
+
+    if len(path) == _REPO_DEPTH:
+        if path[2] == "repo":
+            repo_urls[path[1]] = event.value
+    elif path[2] != "hooks" or not isinstance(path[3], int):
+        return
+    elif len(path) == _HOOK_ID_DEPTH:
+        if path[4] == "id":
+            hook_ids[(path[1], path[3])] = event.value
+    elif path[4] == "additional_dependencies" and isinstance(path[5], int):
+        # the start of an anchored scalar is that of its anchor, so it cannot be
+        # rewritten in place
+        if event.anchor is not None:
+            return
+        # the location of a quoted string is that of its first character
+        mark = event.start_mark
+        quote_length = 1 if event.style in ("'", '"') else 0
+        # a string which is written differently than its value, with escapes or
+        # across several lines, cannot be rewritten in place either
+        start = mark.index + quote_length
+        end = start + len(event.value)
+        if text[start:end] != event.value:
+            return
+        dependencies.setdefault((path[1], path[3]), []).append(
+            (
+                event.value,
+                mark.line,
+                mark.column + quote_length,
+                mark.index + quote_length,
+            )
+        )
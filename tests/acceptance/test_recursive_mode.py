@@ -0,0 +1,75 @@
+import textwrap
+
+import pytest
+import responses
+
+from upadup.main import main
+
+CONFIG_TEMPLATE = """\
+repos:
+  - repo: https://github.com/PyCQA/flake8
+    rev: 7.1.1
+    hooks:
+      - id: flake8
+        additional_dependencies:
+          - 'flake8-bugbear=={version}'
+"""
+
+
+@pytest.fixture
+def two_projects(tmp_path):
+    paths = []
+    for name in ("alpha", "beta"):
+        path = tmp_path / name / ".pre-commit-config.yaml"
+        path.parent.mkdir()
+        path.write_text(textwrap.dedent(CONFIG_TEMPLATE.format(version="23.0.0")))
+        paths.append(path)
+    return paths
+
+
+def test_recursive_updates_every_config_with_one_lookup(
+    mock_package_latest_version, tmp_path, two_projects
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+
+    main(["--no-cache", "--recursive", str(tmp_path)])
+
+    expected = CONFIG_TEMPLATE.format(version="24.12.12")
+    for path in two_projects:
+        assert path.read_text() == expected
+    assert len(responses.calls) == 1
+
+
+def test_files_check_combines_diffs(capsys, mock_package_latest_version, two_projects):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--no-cache", "--check", "--files", *map(str, two_projects)])
+
+    assert excinfo.value.code == 1
+    out = capsys.readouterr().out
+    for path in two_projects:
+        assert f"--- {path}" in out
+    assert out.count("+          - 'flake8-bugbear==24.12.12'") == 2
+    # the files are unchanged in check mode
+    for path in two_projects:
+        assert "23.0.0" in path.read_text()
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    (
+        (["--files", "no-such-file.yaml"], "no such file or directory"),
+        (["--recursive", "no-such-dir"], "no such file or directory"),
+        (["--files", "."], "not a file"),
+        (["index", "build", "index.sqlite3", "--recursive", "no-such-dir"], "no such"),
+    ),
+)
+def test_missing_paths_are_usage_errors(capsys, tmp_path, monkeypatch, args, message):
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(args)
+
+    assert excinfo.value.code == 2
+    assert message in capsys.readouterr().err
@@ -1,6 +1,7 @@
 import textwrap
 
 import pytest
+import responses
 
 
 @pytest.mark.parametrize("quote_char", ("", '"', "'"))
@@ -204,3 +205,23 @@ def test_no_update_when_config_skips_repo(
     )
     # no change is observed
     assert fixed_text == textwrap.dedent(original_text)
+
+
+def test_shared_package_is_fetched_once_across_hooks(
+    update_from_text, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    fixed_text = update_from_text("""\
+        repos:
+          - repo: https://github.com/PyCQA/flake8
+            rev: 7.1.1
+            hooks:
+              - id: flake8
+                additional_dependencies:
+                  - "flake8-bugbear==23.0.0"
+              - id: flake8-again
+                additional_dependencies:
+                  - "flake8_bugbear==23.0.0"
+        """)
+    assert fixed_text.count("==24.12.12") == 2
+    assert len(responses.calls) == 1
@@ -3,6 +3,10 @@ import typing as t
 import pytest
 import responses
 
+import upadup.providers.github.api
+from upadup import http
+from upadup.providers.github.rate_limit import RateLimit
+
 
 @pytest.fixture(autouse=True)
 def mocked_responses():
@@ -14,11 +18,41 @@ def mocked_responses():
     responses.reset()
 
 
+@pytest.fixture(autouse=True)
+def isolated_cache_dir(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "upadup-cache"
+    monkeypatch.setenv("UPADUP_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def fresh_scheduler(monkeypatch):
+    # retries are not delayed, and no host state is carried between tests
+    monkeypatch.setattr("upadup.http._settings.backoff_factor", 0)
+    monkeypatch.setattr("upadup.http._settings.deadline", None)
+    http.configure()
+
+
+@pytest.fixture(autouse=True)
+def fresh_rate_limit(monkeypatch):
+    monkeypatch.setattr("upadup.providers.github.api.RATE_LIMIT", RateLimit())
+
+
+@pytest.fixture(autouse=True)
+def no_github_token(monkeypatch):
+    monkeypatch.delenv("GH_TOKEN", raising=False)
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    # never ask a local gh installation for its token
+    monkeypatch.setattr("upadup.providers.github.cli._load_token", lambda: None)
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", None)
+    monkeypatch.setattr("upadup.providers.github.cli.TOKEN", None)
+
+
 @pytest.fixture
 def mock_package_latest_version(mocked_responses):
     def func(pkg, version):
         responses.get(
-            f"https://pypi.python.org/pypi/{pkg}/json",
+            f"https://pypi.org/pypi/{pkg}/json",
             json={"info": {"version": version}},
         )
 
@@ -55,6 +89,11 @@ def mock_github_tags(
         nonlocal value
         value = tags
 
+    def fetch_tags(*_, **__):
+        return upadup.providers.github.api.TagsResponse(value, None)
+
+    monkeypatch.setattr("upadup.providers.github.api.fetch_tags", fetch_tags)
+    monkeypatch.setattr("upadup.providers.github.cli.fetch_tags", fetch_tags)
     monkeypatch.setattr("upadup.providers.github.api.get_tags_json", lambda *_: value)
     monkeypatch.setattr("upadup.providers.github.cli.get_tags_json", lambda *_: value)
     monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", True)
@@ -1,8 +1,149 @@
+import pickle
+import time
+
+import pytest
+import requests
 import responses
 
 import upadup.providers.github.api
+from upadup.providers.failures import TransientLookupError, is_lasting_failure
+from upadup.providers.github import RateLimitExceededError
+
+TAGS_URL = "https://api.github.com/repos/a/b/tags/"
+
+
+def _tag(name):
+    return {"name": name, "commit": {"sha": "0" * 40}}
+
+
+def _register_pages(pages):
+    for number, page in enumerate(pages, start=1):
+        headers = {}
+        if number < len(pages):
+            headers["Link"] = f'<{TAGS_URL}?per_page=2&page={number + 1}>; rel="next"'
+        match = [responses.matchers.query_param_matcher({"per_page": "2"})]
+        if number > 1:
+            match = [
+                responses.matchers.query_param_matcher(
+                    {"per_page": "2", "page": str(number)}
+                )
+            ]
+        responses.get(TAGS_URL, json=page, headers=headers, match=match)
 
 
 def test_gh_api_get_tags():
-    responses.get("https://api.github.com/repos/a/b/tags/", json=[])
+    responses.get(TAGS_URL, json=[])
     assert isinstance(upadup.providers.github.api.get_tags_json("a", "b"), list)
+
+
+def test_gh_api_follows_link_pagination():
+    _register_pages([[_tag("v0.1.0"), _tag("v0.3.0")], [_tag("v0.2.0")]])
+
+    tags = upadup.providers.github.api.get_tags_json("a", "b", per_page=2)
+    assert [tag["name"] for tag in tags] == ["v0.1.0", "v0.3.0", "v0.2.0"]
+    assert len(responses.calls) == 2
+
+
+def test_gh_api_stops_after_stable_version_in_descending_order():
+    _register_pages(
+        [
+            [_tag("v2.0.0rc1"), _tag("v1.1.0")],
+            [_tag("v1.0.0"), _tag("v0.9.0")],
+            [_tag("v0.8.0")],
+        ]
+    )
+
+    tags = upadup.providers.github.api.get_tags_json("a", "b", per_page=2)
+    assert [tag["name"] for tag in tags] == ["v2.0.0rc1", "v1.1.0"]
+    assert len(responses.calls) == 1
+
+
+def test_gh_api_reads_past_pages_with_only_prereleases():
+    _register_pages([[_tag("v2.0.0rc2"), _tag("v2.0.0rc1")], [_tag("v1.0.0")]])
+
+    tags = upadup.providers.github.api.get_tags_json("a", "b", per_page=2)
+    assert [tag["name"] for tag in tags] == ["v2.0.0rc2", "v2.0.0rc1", "v1.0.0"]
+    assert len(responses.calls) == 2
+
+
+@pytest.mark.parametrize("max_pages", (1, 2))
+def test_gh_api_page_limit(max_pages):
+    # no ordering can be trusted, so every page would be read
+    _register_pages([[_tag("v1.0.0"), _tag("v3.0.0")]] * 3)
+
+    tags = upadup.providers.github.api.get_tags_json(
+        "a", "b", per_page=2, max_pages=max_pages
+    )
+    assert len(tags) == 2 * max_pages
+    assert len(responses.calls) == max_pages
+
+
+def test_gh_api_conditional_request():
+    responses.get(TAGS_URL, json=[_tag("v1.0.0")], headers={"ETag": '"abc"'})
+    response = upadup.providers.github.api.fetch_tags("a", "b")
+    assert response.etag == '"abc"'
+
+    responses.replace(
+        responses.GET,
+        TAGS_URL,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+    )
+    assert upadup.providers.github.api.fetch_tags("a", "b", etag='"abc"') is None
+
+
+def test_gh_api_etag_only_when_first_page_suffices():
+    # the result depends on the second page, which the ETag does not cover
+    _register_pages([[_tag("v2.0.0rc2"), _tag("v2.0.0rc1")], [_tag("v1.0.0")]])
+    response = upadup.providers.github.api.fetch_tags("a", "b", per_page=2)
+    assert len(response.tags) == 3
+    assert response.etag is None
+
+
+@pytest.mark.parametrize(
+    "status, body, error",
+    (
+        (404, {"message": "Not Found"}, requests.HTTPError),
+        (200, {"message": "unexpected"}, TransientLookupError),
+    ),
+)
+def test_gh_api_rejects_error_bodies(status, body, error):
+    responses.get(TAGS_URL, json=body, status=status)
+    with pytest.raises(error):
+        upadup.providers.github.api.get_tags_json("a", "b")
+
+
+def test_gh_api_error_bodies_are_not_lasting_failures():
+    responses.get(TAGS_URL, json={"message": "unexpected"})
+    with pytest.raises(TransientLookupError) as excinfo:
+        upadup.providers.github.api.get_tags_json("a", "b")
+    # this holds for copies of the error too
+    assert not is_lasting_failure(pickle.loads(pickle.dumps(excinfo.value)))
+
+
+def test_gh_api_defers_when_rate_limited():
+    responses.get(
+        TAGS_URL,
+        json={"message": "API rate limit exceeded"},
+        status=403,
+        headers={
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": str(int(time.time()) + 3600),
+        },
+    )
+    with pytest.raises(RateLimitExceededError):
+        upadup.providers.github.api.get_tags_json("a", "b")
+    # and later lookups are deferred without a request
+    with pytest.raises(RateLimitExceededError):
+        upadup.providers.github.api.get_tags_json("a", "b")
+    assert len(responses.calls) == 1
+
+
+def test_gh_api_retries_after_a_short_retry_after():
+    # secondary rate limits are 403 responses, which are not retried by the session
+    responses.get(TAGS_URL, status=403, headers={"Retry-After": "0"})
+    responses.get(TAGS_URL, json=[_tag("v1.0.0")])
+
+    tags = upadup.providers.github.api.get_tags_json("a", "b")
+    assert [tag["name"] for tag in tags] == ["v1.0.0"]
+    assert len(responses.calls) == 2
@@ -1,15 +1,45 @@
+import json
 import subprocess
-import textwrap
 
 import pytest
+import responses
 
 import upadup.providers.github.cli
 
+_real_load_token = upadup.providers.github.cli._load_token
+
 
 @pytest.fixture(autouse=True)
-def reset_gh_cli_availability():
-    yield
-    upadup.providers.github.cli.HAS_CLI = None
+def use_real_token_loading(monkeypatch):
+    monkeypatch.setattr("upadup.providers.github.cli._load_token", _real_load_token)
+
+
+@pytest.fixture
+def gh_on_path(monkeypatch):
+    monkeypatch.setattr(
+        "upadup.providers.github.cli.shutil.which", lambda *_: "/usr/bin/gh"
+    )
+
+
+@pytest.fixture
+def gh_auth_token(monkeypatch):
+    """Mock `gh auth token`, returning a list of the commands which were run."""
+    commands = []
+
+    def setter(returncode, stdout="", stderr=""):
+        def subprocess_runner(*args, **kwargs):
+            run_args = kwargs.get("args", None) or args[0]
+            commands.append(run_args)
+            return subprocess.CompletedProcess(
+                run_args, returncode=returncode, stdout=stdout, stderr=stderr
+            )
+
+        monkeypatch.setattr(
+            "upadup.providers.github.cli.subprocess.run", subprocess_runner
+        )
+        return commands
+
+    return setter
 
 
 @pytest.mark.parametrize("available", (True, False))
@@ -34,53 +64,60 @@ def test_gh_cli_not_on_path(monkeypatch):
     assert upadup.providers.github.cli.HAS_CLI is False, "result not cached"
 
 
-def test_gh_cli_is_logged_in(monkeypatch):
+def test_gh_cli_is_logged_in(gh_on_path, gh_auth_token):
     """If the GitHub CLI is available and logged in, has_cli() should return True."""
 
-    stdout = """\
-    github.com
-      ✓ Logged in to github.com account bogus (keyring)
-      - Active account: true
-      - Git operations protocol: ssh
-      - Token: gho_************************************
-      - Token scopes: 'admin:public_key', 'gist', 'read:org', 'repo'
-    """
-    stdout = textwrap.dedent(stdout)
-
-    def subprocess_runner(*args, **kwargs):
-        run_args = kwargs.get("args", None) or args[0]
-        return subprocess.CompletedProcess(run_args, returncode=0, stdout=stdout)
-
-    monkeypatch.setattr("upadup.providers.github.cli.shutil.which", lambda *_: "gh")
-    monkeypatch.setattr("upadup.providers.github.cli.subprocess.run", subprocess_runner)
+    commands = gh_auth_token(0, stdout="gho_bogus\n")
 
     assert upadup.providers.github.cli.has_cli() is True
     assert upadup.providers.github.cli.HAS_CLI is True, "result not cached"
+    # the token was loaded by the auth check, and is not loaded again
+    assert upadup.providers.github.cli.get_token() == "gho_bogus"
+    assert commands == [["gh", "auth", "token"]]
 
 
-def test_gh_cli_is_not_logged_in(monkeypatch):
+def test_gh_cli_is_not_logged_in(gh_on_path, gh_auth_token):
     """If the GitHub CLI is available but not logged in, has_cli() must return False."""
 
     stderr = "You are not logged into any GitHub hosts. To log in, run: gh auth login"
-
-    def subprocess_runner(*args, **kwargs):
-        run_args = kwargs.get("args", None) or args[0]
-        return subprocess.CompletedProcess(run_args, returncode=1, stderr=stderr)
-
-    monkeypatch.setattr("upadup.providers.github.cli.shutil.which", lambda *_: "gh")
-    monkeypatch.setattr("upadup.providers.github.cli.subprocess.run", subprocess_runner)
+    gh_auth_token(1, stderr=stderr)
 
     assert upadup.providers.github.cli.has_cli() is False
     assert upadup.providers.github.cli.HAS_CLI is False, "result not cached"
 
 
-def test_gh_cli_get_tags(monkeypatch):
-    """Verify that GitHub CLI invocations to get tags are loaded as JSON."""
+@pytest.mark.parametrize("logged_in", (True, False))
+def test_gh_cli_runs_gh_once_per_run(monkeypatch, gh_on_path, gh_auth_token, logged_in):
+    """A whole lookup runs gh once, and nothing is remembered for later runs."""
+
+    commands = gh_auth_token(0 if logged_in else 1, stdout="gho_bogus\n")
+    responses.get("https://api.github.com/repos/org/repo/tags/", json=[])
+
+    for _ in range(2):
+        assert upadup.providers.github.cli.has_cli() is logged_in
+        if logged_in:
+            assert upadup.providers.github.cli.get_tags_json("org", "repo") == []
+        assert commands == [["gh", "auth", "token"]]
+
+        # a new run starts with no in-memory state, and checks gh again
+        monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", None)
+        monkeypatch.setattr("upadup.providers.github.cli.TOKEN", None)
+        commands.clear()
+
 
-    def subprocess_runner(*args, **kwargs):
-        run_args = kwargs.get("args", None) or args[0]
-        return subprocess.CompletedProcess(run_args, returncode=0, stdout="[]")
+def test_gh_cli_get_tags_uses_http_with_gh_token(gh_auth_token):
+    """Tags are fetched in-process, authenticated with the token from gh."""
 
-    monkeypatch.setattr("upadup.providers.github.cli.subprocess.run", subprocess_runner)
+    commands = gh_auth_token(0, stdout="gho_bogus\n")
+    responses.get(
+        "https://api.github.com/repos/org/repo/tags/",
+        json=[],
+        match=[
+            responses.matchers.header_matcher({"Authorization": "Bearer gho_bogus"})
+        ],
+    )
 
-    assert isinstance(upadup.providers.github.cli.get_tags_json("org", "repo"), list)
+    for _ in range(3):
+        assert upadup.providers.github.cli.get_tags_json("org", "repo") == []
+    assert commands == [["gh", "auth", "token"]]
+    assert json.loads(responses.calls[0].response.text) == []
@@ -0,0 +1,169 @@
+import json
+import re
+
+import pytest
+import responses
+
+from upadup.cache import VersionCache
+from upadup.providers.github import TagMap, graphql
+from upadup.providers.pypi import VersionMap
+from upadup.resolver import AsyncResolver, ThreadedResolver
+
+# the tags of repos known to the stand-in GraphQL endpoint
+# each tag is (name, commit sha, annotated)
+KNOWN_REPOS = {
+    ("wasilibs", "go-shellcheck"): [
+        ("v0.10.0", "a" * 40, False),
+        ("v0.11.1", "b" * 40, True),
+        ("v0.12.0rc1", "c" * 40, False),
+    ],
+    ("mvdan", "gofumpt"): [("v0.7.0", "d" * 40, False)],
+}
+
+
+@pytest.fixture
+def graphql_endpoint(monkeypatch):
+    """A stand-in for the GitHub GraphQL API, which understands upadup queries."""
+    monkeypatch.setenv("GITHUB_TOKEN", "bogus-token")
+    queries = []
+
+    def callback(request):
+        assert request.headers["Authorization"] == "bearer bogus-token"
+        body = json.loads(request.body)
+        queries.append(body)
+
+        data = {}
+        errors = []
+        for alias in re.findall(r"(r\d+): repository", body["query"]):
+            index = alias[1:]
+            repo = (
+                body["variables"][f"owner{index}"],
+                body["variables"][f"name{index}"],
+            )
+            if repo not in KNOWN_REPOS:
+                data[alias] = None
+                errors.append({"type": "NOT_FOUND", "path": [alias]})
+                continue
+            nodes = []
+            for name, sha, annotated in KNOWN_REPOS[repo]:
+                if annotated:
+                    target = {"oid": "f" * 40, "target": {"oid": sha}}
+                else:
+                    target = {"oid": sha}
+                nodes.append({"name": name, "target": target})
+            data[alias] = {"refs": {"nodes": nodes}}
+        return (200, {}, json.dumps({"data": data, "errors": errors}))
+
+    responses.add_callback(responses.POST, graphql.GRAPHQL_URL, callback=callback)
+    return queries
+
+
+def test_get_token_prefers_gh_token(monkeypatch):
+    assert graphql.get_token() is None
+
+    monkeypatch.setenv("GITHUB_TOKEN", "b")
+    assert graphql.get_token() == "b"
+
+    monkeypatch.setenv("GH_TOKEN", "a")
+    assert graphql.get_token() == "a"
+
+
+def test_build_query_aliases_each_repo():
+    query = graphql.build_query(3)
+    assert re.findall(r"r\d+: repository", query) == [
+        "r0: repository",
+        "r1: repository",
+        "r2: repository",
+    ]
+    assert "$owner2: String!" in query
+
+
+def test_get_tags_json_batch(graphql_endpoint):
+    result = graphql.get_tags_json_batch(
+        [("wasilibs", "go-shellcheck"), ("mvdan", "gofumpt"), ("no", "such-repo")],
+        token="bogus-token",
+    )
+
+    assert len(graphql_endpoint) == 1
+    assert result[("mvdan", "gofumpt")] == [
+        {"name": "v0.7.0", "commit": {"sha": "d" * 40}}
+    ]
+    # annotated tags are resolved to their commit
+    assert {"name": "v0.11.1", "commit": {"sha": "b" * 40}} in result[
+        ("wasilibs", "go-shellcheck")
+    ]
+    # repos which do not exist are told apart from those without tags
+    assert result[("no", "such-repo")] is None
+
+
+def test_get_tags_json_batch_splits_large_batches(graphql_endpoint, monkeypatch):
+    monkeypatch.setattr(graphql, "BATCH_SIZE", 1)
+
+    result = graphql.get_tags_json_batch(
+        [("wasilibs", "go-shellcheck"), ("mvdan", "gofumpt")], token="bogus-token"
+    )
+    assert len(graphql_endpoint) == 2
+    assert len(result) == 2
+
+
+def test_fetch_batch_without_token_is_unavailable():
+    assert TagMap().fetch_batch(["a/b"]) is None
+
+
+@pytest.mark.parametrize("resolver_class", (ThreadedResolver, AsyncResolver))
+def test_resolvers_use_one_query_for_all_github_repos(graphql_endpoint, resolver_class):
+    tag_map = TagMap()
+    resolver_class().resolve(
+        VersionMap(),
+        tag_map,
+        [],
+        ["wasilibs/go-shellcheck", "mvdan/gofumpt", "no/such-repo"],
+    )
+
+    assert len(graphql_endpoint) == 1
+    assert tag_map["wasilibs/go-shellcheck"].latest == ("v0.11.1", "b" * 40)
+    assert tag_map["mvdan/gofumpt"].latest == ("v0.7.0", "d" * 40)
+    # repos which cannot be found are recorded as failures
+    assert "no/such-repo" not in tag_map
+    assert (
+        str(tag_map.failure("no/such-repo")) == "no/such-repo was not found on GitHub"
+    )
+
+
+@pytest.mark.parametrize("freeze, expected", ((False, "v0.11.1"), (True, "b" * 40)))
+def test_normal_and_frozen_dependencies_resolve_from_the_same_query(
+    graphql_endpoint, freeze, expected
+):
+    tag_map = TagMap()
+    tag_map.prefill(tag_map.fetch_batch(["wasilibs/go-shellcheck"]))
+
+    base = "github.com/wasilibs/go-shellcheck/cmd/shellcheck"
+    assert tag_map.update_dependency(f"{base}@v0.0.0", freeze=freeze) == (
+        f"{base}@{expected}"
+    )
+    assert len(graphql_endpoint) == 1
+
+
+def test_fetch_batch_does_not_remember_repos_when_the_query_fails(
+    monkeypatch, tmp_path
+):
+    monkeypatch.setenv("GITHUB_TOKEN", "bogus-token")
+    responses.post(
+        graphql.GRAPHQL_URL,
+        json={"data": None, "errors": [{"type": "RATE_LIMITED"}]},
+    )
+    store = VersionCache(tmp_path / "cache.sqlite3")
+    tag_map = TagMap(store=store)
+
+    assert tag_map.fetch_batch(["wasilibs/go-shellcheck", "mvdan/gofumpt"]) == {}
+    assert "RATE_LIMITED" in str(tag_map.failure("mvdan/gofumpt"))
+    assert store.get("github-missing", "mvdan/gofumpt") is None
+    store.close()
+
+
+def test_fetch_batch_remembers_repos_which_were_not_found(graphql_endpoint, tmp_path):
+    store = VersionCache(tmp_path / "cache.sqlite3")
+    TagMap(store=store).fetch_batch(["no/such-repo"])
+
+    assert store.get("github-missing", "no/such-repo") is not None
+    store.close()
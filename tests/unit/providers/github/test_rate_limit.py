@@ -0,0 +1,111 @@
+import time
+
+import pytest
+import requests
+
+from upadup.providers.github import rate_limit
+from upadup.providers.github.rate_limit import (
+    RateLimit,
+    RateLimitExceededError,
+    is_rate_limited,
+)
+from upadup.scheduler import DeadlineExceededError
+
+
+def _response(status=200, **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update({name.replace("_", "-"): v for name, v in headers.items()})
+    return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(rate_limit.time, "sleep", slept.append)
+    return slept
+
+
+def test_requests_take_from_the_remaining_quota(sleeps):
+    limit = RateLimit()
+    reset_at = str(int(time.time()) + 3600)
+    limit.update(
+        _response(**{"X-RateLimit-Remaining": "2", "X-RateLimit-Reset": reset_at})
+    )
+
+    limit.acquire()
+    limit.acquire()
+    assert limit.remaining == 0
+    with pytest.raises(RateLimitExceededError, match="rate limit exceeded, until"):
+        limit.acquire()
+    assert sleeps == []
+
+
+def test_reported_quota_only_goes_down_within_a_window():
+    limit = RateLimit()
+    reset_at = str(int(time.time()) + 3600)
+    limit.update(
+        _response(**{"X-RateLimit-Remaining": "5", "X-RateLimit-Reset": reset_at})
+    )
+    limit.update(
+        _response(**{"X-RateLimit-Remaining": "7", "X-RateLimit-Reset": reset_at})
+    )
+    assert limit.remaining == 5
+
+    # a new window starts over
+    later = str(int(reset_at) + 3600)
+    limit.update(
+        _response(**{"X-RateLimit-Remaining": "60", "X-RateLimit-Reset": later})
+    )
+    assert limit.remaining == 60
+
+
+def test_waits_for_a_quota_which_resets_soon(monkeypatch):
+    limit = RateLimit(max_wait=10)
+    limit.remaining, limit.reset_at = 0, time.time() + 5
+    slept = []
+
+    def fake_sleep(seconds):
+        slept.append(seconds)
+        # the quota resets while waiting
+        limit.reset_at = time.time() - 1
+
+    monkeypatch.setattr(rate_limit.time, "sleep", fake_sleep)
+    limit.acquire()
+    assert len(slept) == 1 and 0 < slept[0] <= 5
+    # the quota is unknown until the next response
+    assert limit.remaining is None
+
+
+def test_does_not_wait_past_the_deadline(sleeps):
+    limit = RateLimit(max_wait=10)
+    limit.remaining, limit.reset_at = 0, time.time() + 5
+
+    with pytest.raises(DeadlineExceededError, match="rate limit"):
+        limit.acquire(deadline=time.monotonic() + 2)
+    assert sleeps == []
+
+
+def test_retry_after_pauses_requests(sleeps):
+    limit = RateLimit(max_wait=10)
+    limit.update(_response(403, Retry_After="60"))
+    with pytest.raises(RateLimitExceededError):
+        limit.acquire()
+
+    limit = RateLimit(max_wait=10)
+    limit.update(_response(403, Retry_After="0"))
+    limit.acquire()
+
+
+@pytest.mark.parametrize(
+    "response, expected",
+    (
+        (_response(200, **{"X-RateLimit-Remaining": "0"}), False),
+        (_response(403, **{"X-RateLimit-Remaining": "0"}), True),
+        (_response(429, Retry_After="1"), True),
+        (_response(403), False),
+        (_response(404, **{"X-RateLimit-Remaining": "0"}), False),
+    ),
+)
+def test_is_rate_limited(response, expected):
+    assert is_rate_limited(response) is expected
@@ -0,0 +1,164 @@
+import time
+
+import pytest
+import requests
+import responses
+
+import upadup.providers.github.api
+import upadup.providers.github.cli
+from upadup.cache import VersionCache
+from upadup.providers.github import (
+    RateLimitExceededError,
+    TagIndex,
+    TagInfo,
+    TagMap,
+)
+
+BASE = "github.com/wasilibs/go-shellcheck/cmd/shellcheck"
+SHA = "4e7020840c303923eb1ab846fc446d77be892570"
+
+
+@pytest.fixture
+def version_cache(tmp_path):
+    version_cache = VersionCache(tmp_path / "cache.sqlite3")
+    yield version_cache
+    version_cache.close()
+
+
+@pytest.fixture
+def count_tag_fetches(monkeypatch, mock_github_tags):
+    fetched = []
+    mocked_fetch_tags = upadup.providers.github.cli.fetch_tags
+
+    def counting_fetch_tags(owner, repo, **kwargs):
+        fetched.append((owner, repo))
+        return mocked_fetch_tags(owner, repo, **kwargs)
+
+    monkeypatch.setattr("upadup.providers.github.cli.fetch_tags", counting_fetch_tags)
+    return fetched
+
+
+def test_tag_index_ignores_unstable_and_malformed_tags():
+    index = TagIndex.from_tags_json(
+        [
+            {"name": "v1.0.0", "commit": {"sha": "a" * 40}},
+            {"name": "v2.0.0rc1", "commit": {"sha": "b" * 40}},
+            {"name": "nightly", "commit": {"sha": "c" * 40}},
+        ]
+    )
+    assert index.latest == TagInfo("v1.0.0", "a" * 40)
+
+
+def test_tag_index_json_roundtrip():
+    index = TagIndex.from_tags_json(
+        [
+            {"name": "v1.0.0", "commit": {"sha": "a" * 40}},
+            {"name": "v1.1.0", "commit": {"sha": "b" * 40}},
+        ]
+    )
+    assert TagIndex.from_json(index.to_json()).latest == TagInfo("v1.1.0", "b" * 40)
+
+
+def test_tag_map_lazy_lookup_normalizes(count_tag_fetches):
+    tag_map = TagMap()
+
+    assert len(tag_map) == 0
+    assert "wasilibs/go-shellcheck" not in tag_map
+
+    assert tag_map["WasiLibs/go-shellcheck"].latest.name == "v0.11.1"
+    assert tag_map["wasilibs/go-shellcheck"].latest.name == "v0.11.1"
+    assert "WASILIBS/GO-SHELLCHECK" in tag_map
+    assert list(tag_map) == ["wasilibs/go-shellcheck"]
+    assert count_tag_fetches == [("wasilibs", "go-shellcheck")]
+
+
+def test_tag_map_answers_normal_and_frozen_queries_from_one_fetch(count_tag_fetches):
+    tag_map = TagMap()
+
+    assert tag_map.update_dependency(f"{BASE}@v0.0.0") == f"{BASE}@v0.11.1"
+    assert tag_map.update_dependency(f"{BASE}@v0.0.0", freeze=True) == f"{BASE}@{SHA}"
+    assert (
+        tag_map.update_dependency("github.com/wasilibs/go-shellcheck/cmd/other@v0.1.0")
+        == "github.com/wasilibs/go-shellcheck/cmd/other@v0.11.1"
+    )
+    assert len(count_tag_fetches) == 1
+
+
+def test_tag_map_persists_to_store(count_tag_fetches, version_cache):
+    assert TagMap(store=version_cache)["wasilibs/go-shellcheck"].latest.sha == SHA
+
+    # a new map, as in a later run, reads the persisted index
+    assert TagMap(store=version_cache)["wasilibs/go-shellcheck"].latest.sha == SHA
+    assert len(count_tag_fetches) == 1
+
+    # unless the cache is bypassed
+    TagMap(store=version_cache, refresh=True)["wasilibs/go-shellcheck"]
+    assert len(count_tag_fetches) == 2
+
+
+def test_tag_map_refetches_expired_entries(count_tag_fetches, version_cache):
+    version_cache.set("github", "wasilibs/go-shellcheck", "[]", ttl=-1)
+
+    assert TagMap(store=version_cache)["wasilibs/go-shellcheck"].latest.sha == SHA
+    assert len(count_tag_fetches) == 1
+
+
+def test_tag_map_batch_uses_fresh_store_entries_without_token(version_cache):
+    version_cache.set("github", "a/b", '[["v1.0.0", "' + "a" * 40 + '"]]')
+
+    indexes = TagMap(store=version_cache).fetch_batch(["A/B"])
+    assert indexes["a/b"].latest == TagInfo("v1.0.0", "a" * 40)
+
+
+def test_tag_map_revalidates_expired_entries_with_etag(monkeypatch, version_cache):
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", False)
+    url = "https://api.github.com/repos/a/b/tags/"
+    version_cache.set(
+        "github", "a/b", '[["v1.0.0", "' + "a" * 40 + '"]]', etag='"abc"', ttl=-1
+    )
+    responses.get(
+        url,
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"abc"'})],
+    )
+
+    assert TagMap(store=version_cache)["a/b"].latest == TagInfo("v1.0.0", "a" * 40)
+    assert version_cache.get("github", "a/b").is_fresh
+
+
+def test_tag_map_repos_without_version_tags_are_not_failures(
+    count_tag_fetches, mock_github_tags, version_cache
+):
+    mock_github_tags([{"name": "nightly", "commit": {"sha": SHA}}])
+
+    tag_map = TagMap(store=version_cache)
+    assert tag_map.fetch("wasilibs/go-shellcheck").latest is None
+    assert tag_map.failure("wasilibs/go-shellcheck") is None
+
+    # a later run does not look the repo up again
+    assert TagMap(store=version_cache).fetch("wasilibs/go-shellcheck").latest is None
+    assert len(count_tag_fetches) == 1
+
+
+def test_tag_map_records_missing_repos(monkeypatch, version_cache):
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", False)
+    responses.get("https://api.github.com/repos/a/b/tags/", status=404)
+
+    tag_map = TagMap(store=version_cache)
+    with pytest.raises(requests.HTTPError):
+        tag_map.fetch("a/b")
+    assert tag_map.failure("a/b") is not None
+    assert version_cache.get("github-missing", "a/b") is not None
+
+
+def test_tag_map_defers_lookups_beyond_the_rate_limit(monkeypatch):
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", False)
+    rate_limit = upadup.providers.github.api.RATE_LIMIT
+    rate_limit.remaining, rate_limit.reset_at = 0, time.time() + 3600
+
+    tag_map = TagMap()
+    with pytest.raises(RateLimitExceededError):
+        tag_map.update_dependency(f"{BASE}@v0.0.0")
+    assert isinstance(tag_map.failure("WasiLibs/go-shellcheck"), RateLimitExceededError)
+    assert tag_map.failure("a/b") is None
+    assert len(responses.calls) == 0
@@ -1,9 +1,12 @@
+import dataclasses
+
 import pytest
 
 from upadup.providers.pypi.dep_parser import (
     SpecifierParseError,
     UnsupportedSpecifierError,
     parse_specifier,
+    parse_specifiers,
 )
 
 
@@ -17,6 +20,14 @@ from upadup.providers.pypi.dep_parser import (
         "foo == 1.0",
         "foo==2.2 ",
         "  foo==1.1b0",
+        "x==1",
+        "foo[bar]==1.0",
+        "foo [bar, baz] == 1.0",
+        'foo==1.0; python_version > "3.9"',
+        "foo==1.0 ;os_name=='nt' ",
+        "foo==1.0,!=1.0.1",
+        "foo >=0.9 , ==1.0 , <2",
+        "foo[bar]>=0.9,~=1.0;extra=='test'",
     ),
 )
 def test_parse_and_format_roundtrips(specifier):
@@ -32,6 +43,8 @@ def test_parse_and_format_roundtrips(specifier):
         "xyz<=1.0",
         "xyz>=1.0,<=1.0",
         "xyz!=1.0",
+        "xyz[extra]",
+        'xyz>=1.0; python_version == "3.9"',
     ),
 )
 def test_parse_requires_double_equal(specifier):
@@ -44,6 +57,10 @@ def test_parse_requires_double_equal(specifier):
     (
         "xyz abc == 1.0",
         "xyz==1.0 2.1",
+        "xyz[extra==1.0",
+        "xyz==1.0;",
+        "xyz==1.0,==1.1",
+        "xyz==1.0,,!=1.1",
     ),
 )
 def test_parse_rejects_specifier_with_invalid_whitespace(specifier):
@@ -59,3 +76,39 @@ def test_parse_and_update_version(comparator):
     assert spec.format() == f"foo{comparator}1.0.0"
     # changed!
     assert spec2.format() == f"foo{comparator}1.1.1"
+
+
+def test_update_keeps_extras_markers_and_other_clauses():
+    spec = parse_specifier(' foo [bar] >=0.9, == 1.0 ,!=1.0.1; os_name == "nt" ')
+    assert (spec.package_name, spec.comparator, spec.version) == ("foo", "==", "1.0")
+    assert spec.update_version("1.2").format() == (
+        ' foo [bar] >=0.9, == 1.2 ,!=1.0.1; os_name == "nt" '
+    )
+
+
+def test_parse_specifiers_parses_each_specifier_once():
+    parsed = parse_specifiers(["foo==1.0", "bar>=1.0", "foo==1.0", "foo[x]==2"])
+    assert list(parsed) == ["foo==1.0", "foo[x]==2"]
+    assert parsed["foo[x]==2"].version == "2"
+
+    # results are reused by later calls
+    assert parse_specifiers(["foo==1.0"])["foo==1.0"] is parsed["foo==1.0"]
+    # so they cannot be modified
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        parsed["foo==1.0"].version = "2.0"
+    assert parsed["foo==1.0"].update_version("2.0").format() == "foo==2.0"
+
+
+@pytest.mark.parametrize(
+    "specifier, version, expected",
+    (
+        ("foo==1.0", "2.0", True),
+        ("foo==1.0,!=1.0.1", "1.0.1", False),
+        ("foo==1.0,!=1.0.1", "1.0.2", True),
+        ("foo==1.0,<2", "2.1", False),
+        ("foo>=0.9,==1.0", "1.5", True),
+        ("foo==1.0,<2", "not-a-version", False),
+    ),
+)
+def test_other_clauses_limit_the_allowed_versions(specifier, version, expected):
+    assert parse_specifier(specifier).allows(version) is expected
@@ -0,0 +1,200 @@
+import itertools
+import json
+import re
+
+import pytest
+import requests
+import responses
+
+from upadup.providers.pypi import PackageIndex, VersionMap, select_indexes
+from upadup.providers.pypi.indexes import DEFAULT_INDEXES, read_simple_version
+from upadup.providers.pypi.package_utils import fetch_pkg_latest
+
+MIRROR_URL = "https://mirror.example/root/pypi/+simple"
+
+# the files known to the stand-in Simple API index
+# each file is (filename, yanked)
+KNOWN_FILES = {
+    "click": [
+        ("click-8.1.0.tar.gz", False),
+        ("click-8.1.0-py3-none-any.whl", False),
+        ("click-8.2.0-py3-none-any.whl", True),
+        ("click-9.0.0rc1.tar.gz", False),
+    ],
+}
+
+
+@pytest.fixture
+def simple_index():
+    """A stand-in for a Simple API index, which serves both JSON and HTML."""
+    requests_seen = []
+
+    def callback(request):
+        requests_seen.append(request)
+        name = request.url.rstrip("/").rpartition("/")[2]
+        if name not in KNOWN_FILES:
+            return (404, {}, "")
+
+        files = KNOWN_FILES[name]
+        if "application/vnd.pypi.simple.v1+json" in request.headers["Accept"]:
+            body = {
+                "meta": {"api-version": "1.1"},
+                "name": name,
+                "files": [
+                    {"filename": filename, "url": filename, "yanked": yanked}
+                    for filename, yanked in files
+                ],
+            }
+            content_type = "application/vnd.pypi.simple.v1+json"
+            return (200, {"Content-Type": content_type}, json.dumps(body))
+        return (200, {"Content-Type": "text/html"}, _render_html(files))
+
+    responses.add_callback(
+        responses.GET, re.compile(re.escape(MIRROR_URL) + "/.*"), callback=callback
+    )
+    return requests_seen
+
+
+def _render_html(files):
+    anchors = "".join(
+        f'<a href="{filename}"{" data-yanked" if yanked else ""}>{filename}</a><br>'
+        for filename, yanked in files
+    )
+    return f"<!DOCTYPE html><html><body>{anchors}</body></html>"
+
+
+@pytest.mark.parametrize(
+    "url, expect_index",
+    (
+        ("https://pypi.org/pypi", PackageIndex("https://pypi.org/pypi")),
+        ("https://pypi.org/simple/", PackageIndex("https://pypi.org/simple", "simple")),
+        (MIRROR_URL, PackageIndex(MIRROR_URL, "simple")),
+    ),
+)
+def test_index_from_url(url, expect_index):
+    assert PackageIndex.from_url(url) == expect_index
+
+
+def test_select_indexes_precedence(monkeypatch):
+    configured = [PackageIndex("https://configured.example/pypi", timeout=2.0)]
+
+    assert select_indexes() == DEFAULT_INDEXES
+    assert select_indexes(configured=configured) == tuple(configured)
+
+    monkeypatch.setenv("UPADUP_INDEX_URL", f"{MIRROR_URL} https://pypi.org/pypi")
+    monkeypatch.setenv("UPADUP_INDEX_TIMEOUT", "0.5")
+    assert select_indexes(configured=configured) == (
+        PackageIndex(MIRROR_URL, "simple", 0.5),
+        PackageIndex("https://pypi.org/pypi", timeout=0.5),
+    )
+
+    # an index's own timeout is kept
+    monkeypatch.delenv("UPADUP_INDEX_URL")
+    assert select_indexes(configured=configured) == tuple(configured)
+
+    assert select_indexes(
+        urls=["https://cli.example/pypi"], timeout=1.0, configured=configured
+    ) == (
+        PackageIndex("https://cli.example/pypi", timeout=1.0),
+    )
+
+
+def test_select_indexes_rejects_bad_timeout(monkeypatch):
+    monkeypatch.setenv("UPADUP_INDEX_TIMEOUT", "soon")
+    with pytest.raises(ValueError, match="UPADUP_INDEX_TIMEOUT"):
+        select_indexes()
+
+
+def test_read_simple_version_skips_yanked_and_prereleases():
+    body = {
+        "files": [
+            {"filename": "foo-1.0.tar.gz"},
+            {"filename": "foo-1.1-py3-none-any.whl", "yanked": "broken"},
+            {"filename": "foo-2.0b1.tar.gz"},
+            {"filename": "foo-1.0.win32.exe"},
+        ]
+    }
+    content = json.dumps(body).encode()
+    assert read_simple_version("application/vnd.pypi.simple.v1+json", content) == "1.0"
+
+
+def test_read_simple_version_uses_prerelease_if_nothing_else():
+    content = b'<a href="x">foo-2.0b1.tar.gz</a>'
+    assert read_simple_version("text/html", content) == "2.0b1"
+
+
+def test_read_simple_version_without_versions_is_an_error():
+    with pytest.raises(ValueError, match="no versions"):
+        read_simple_version("text/html", b"<html></html>")
+
+
+def test_version_map_uses_simple_index(simple_index):
+    vmap = VersionMap(indexes=[PackageIndex.from_url(MIRROR_URL)])
+    assert vmap["click"] == "8.1.0"
+    assert "application/vnd.pypi.simple.v1+json" in simple_index[0].headers["Accept"]
+
+
+def test_version_map_uses_html_simple_index():
+    # an older index, which does not understand PEP 691
+    responses.get(
+        "https://legacy.example/simple/click/",
+        content_type="text/html",
+        body=_render_html(KNOWN_FILES["click"]),
+    )
+
+    vmap = VersionMap(indexes=[PackageIndex.from_url("https://legacy.example/simple")])
+    assert vmap["click"] == "8.1.0"
+
+
+def test_fetch_falls_back_to_next_index(simple_index, mock_package_latest_version):
+    mock_package_latest_version("black", "25.1.0")
+    mock_package_latest_version("click", "8.3.0")
+    indexes = select_indexes(urls=[MIRROR_URL, "https://pypi.org/pypi"])
+
+    # the mirror does not have black, but has click
+    assert fetch_pkg_latest("black", indexes=indexes).version == "25.1.0"
+    assert fetch_pkg_latest("click", indexes=indexes).version == "8.1.0"
+    assert len(simple_index) == 2
+
+
+def test_fetch_raises_error_from_last_index(simple_index):
+    indexes = select_indexes(urls=[MIRROR_URL])
+    with pytest.raises(requests.HTTPError):
+        fetch_pkg_latest("black", indexes=indexes)
+
+
+def test_fetch_falls_back_on_connection_errors(mock_package_latest_version):
+    mock_package_latest_version("click", "8.3.0")
+    responses.get(f"{MIRROR_URL}/click/", body=requests.ConnectTimeout())
+    indexes = select_indexes(urls=[MIRROR_URL, "https://pypi.org/pypi"])
+
+    assert fetch_pkg_latest("click", indexes=indexes).version == "8.3.0"
+
+
+def test_fetch_falls_back_when_latency_budget_is_exceeded(
+    monkeypatch, simple_index, mock_package_latest_version
+):
+    mock_package_latest_version("click", "8.3.0")
+    # every reading of the clock is ten seconds after the last
+    clock = itertools.count(step=10)
+    monkeypatch.setattr(
+        "upadup.providers.pypi.package_utils.time.monotonic", lambda: next(clock)
+    )
+    indexes = [
+        PackageIndex(MIRROR_URL, "simple", timeout=1),
+        PackageIndex("https://pypi.org/pypi"),
+    ]
+
+    assert fetch_pkg_latest("click", indexes=indexes).version == "8.3.0"
+    assert len(simple_index) == 1
+
+
+def test_fetch_sends_credentials_from_netrc(monkeypatch, tmp_path, simple_index):
+    netrc_path = tmp_path / "netrc"
+    netrc_path.write_text("machine mirror.example login alice password s3cret\n")
+    netrc_path.chmod(0o600)
+    monkeypatch.setenv("NETRC", str(netrc_path))
+
+    indexes = select_indexes(urls=[MIRROR_URL])
+    assert fetch_pkg_latest("click", indexes=indexes).version == "8.1.0"
+    assert simple_index[0].headers["Authorization"].startswith("Basic ")
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from upadup.providers.pypi.json_stream import find_top_level_key
+
+
+def _chunked(data: bytes, size: int):
+    chunks = []
+    while data:
+        chunks.append(data[:size])
+        data = data[size:]
+    return chunks
+
+
+PYPI_LIKE_DOCUMENT = {
+    "info": {"name": "foo", "version": "1.2.3", "summary": 'a "quoted" ü'},
+    "last_serial": 123456,
+    "releases": {"1.0": [{"filename": "foo-1.0.tar.gz"}], "1.2.3": []},
+    "urls": [],
+}
+
+
+@pytest.mark.parametrize("chunk_size", (1, 2, 3, 7, 64, 100_000))
+@pytest.mark.parametrize(
+    "document",
+    (
+        PYPI_LIKE_DOCUMENT,
+        # the key of interest comes after values which must be skipped
+        {
+            "last_serial": 123456,
+            "releases": {"1.0": [{"a": "}]\\"}], "2.0": [[], {}]},
+            "tricky": '{["\\',
+            "flag": True,
+            "nothing": None,
+            "info": {"version": "1.2.3"},
+        },
+    ),
+)
+@pytest.mark.parametrize("indent", (None, 2))
+def test_find_top_level_key(document, chunk_size, indent):
+    data = json.dumps(document, indent=indent, ensure_ascii=False).encode()
+    info = find_top_level_key(_chunked(data, chunk_size), "info")
+    assert info == document["info"]
+
+
+@pytest.mark.parametrize("chunk_size", (1, 4, 1000))
+def test_find_top_level_scalar_split_across_chunks(chunk_size):
+    data = b'{"a": [1, 2], "serial": 1234567890, "b": 1}'
+    assert find_top_level_key(_chunked(data, chunk_size), "serial") == 1234567890
+
+
+def test_find_top_level_key_stops_reading_once_found():
+    consumed = []
+
+    def chunks():
+        for chunk in (b'{"info": {"version": "1.0"}', b', "releases": {', b"}}"):
+            consumed.append(chunk)
+            yield chunk
+
+    assert find_top_level_key(chunks(), "info") == {"version": "1.0"}
+    assert len(consumed) == 1
+
+
+def test_find_top_level_key_ignores_nested_keys():
+    data = b'{"releases": {"info": 1}, "info": 2}'
+    assert find_top_level_key(_chunked(data, 3), "info") == 2
+
+
+def test_find_top_level_key_missing():
+    with pytest.raises(KeyError):
+        find_top_level_key([b'{"releases": {}, "urls": []}'], "info")
+
+
+@pytest.mark.parametrize(
+    "data", (b"[1, 2]", b'{"releases": {', b'{"info": {"version": "1.0"')
+)
+def test_find_top_level_key_malformed(data):
+    with pytest.raises(ValueError):
+        find_top_level_key([data], "info")
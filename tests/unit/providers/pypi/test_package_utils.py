@@ -1,7 +1,16 @@
 import pytest
+import requests
+import responses
 
+from upadup.cache import VersionCache
+from upadup.providers.failures import NEGATIVE_TTL, LookupFailedError
+from upadup.providers.pypi import PackageIndex
 from upadup.providers.pypi.package_utils import VersionMap, _normalize_package_name
 
+# stored entries are keyed by the URLs of the indexes, and the package name
+PYPI_KEY = "https://pypi.org/pypi"
+MIRROR_URL = "https://mirror.example/pypi"
+
 
 @pytest.mark.parametrize(
     "package_name, normed_name",
@@ -67,3 +76,165 @@ def test_version_map_normalizes(
     assert len(vmap) == 1
     assert normed_name in vmap
     assert list(vmap) == [normed_name]
+
+
+def test_version_map_missing_and_prefill():
+    vmap = VersionMap()
+    assert vmap.missing(["Click", "foo_bar"]) == {"click", "foo-bar"}
+
+    vmap.prefill({"Foo_Bar": "1.0"})
+    assert vmap.missing(["Click", "foo_bar"]) == {"click"}
+    assert vmap["foo.bar"] == "1.0"
+
+
+@pytest.fixture
+def version_cache(tmp_path):
+    version_cache = VersionCache(tmp_path / "cache.sqlite3")
+    yield version_cache
+    version_cache.close()
+
+
+def test_version_map_stores_fetched_versions(version_cache):
+    responses.get(
+        "https://pypi.org/pypi/click/json",
+        json={"info": {"version": "8.1.0"}},
+        headers={"ETag": '"v1"'},
+    )
+
+    assert VersionMap(store=version_cache)["click"] == "8.1.0"
+
+    entry = version_cache.get("pypi", f"{PYPI_KEY} click")
+    assert entry.value == "8.1.0"
+    assert entry.etag == '"v1"'
+
+
+def test_version_map_fresh_store_hit_skips_network(version_cache):
+    version_cache.set("pypi", f"{PYPI_KEY} click", "8.1.0")
+
+    assert VersionMap(store=version_cache)["Click"] == "8.1.0"
+    assert len(responses.calls) == 0
+
+
+@pytest.mark.parametrize("stale", (True, False))
+def test_version_map_revalidates_stale_or_refreshed_entries(version_cache, stale):
+    version_cache.set(
+        "pypi", f"{PYPI_KEY} click", "8.1.0", etag='"v1"', ttl=-1 if stale else None
+    )
+    responses.get(
+        "https://pypi.org/pypi/click/json",
+        status=304,
+        match=[responses.matchers.header_matcher({"If-None-Match": '"v1"'})],
+    )
+
+    vmap = VersionMap(store=version_cache, refresh=not stale)
+    assert vmap["click"] == "8.1.0"
+    assert len(responses.calls) == 1
+    assert version_cache.get("pypi", f"{PYPI_KEY} click").is_fresh
+
+
+def test_version_map_replaces_changed_entries(version_cache):
+    version_cache.set("pypi", f"{PYPI_KEY} click", "8.1.0", etag='"v1"', ttl=-1)
+    responses.get(
+        "https://pypi.org/pypi/click/json",
+        json={"info": {"version": "8.2.0"}},
+        headers={"ETag": '"v2"'},
+    )
+
+    assert VersionMap(store=version_cache)["click"] == "8.2.0"
+    entry = version_cache.get("pypi", f"{PYPI_KEY} click")
+    assert (entry.value, entry.etag) == ("8.2.0", '"v2"')
+
+
+def test_version_map_remembers_missing_packages(version_cache):
+    responses.get("https://pypi.org/pypi/no-such-package/json", status=404)
+
+    vmap = VersionMap(store=version_cache)
+    with pytest.raises(requests.HTTPError):
+        vmap.fetch("No_Such_Package")
+    assert "404" in str(vmap.failure("no-such-package"))
+    entry = version_cache.get("pypi-missing", f"{PYPI_KEY} no-such-package")
+    assert entry.expires_at - entry.fetched_at == NEGATIVE_TTL
+
+    # a later run fails the lookup without a request, unless refreshing
+    vmap = VersionMap(store=version_cache)
+    with pytest.raises(LookupFailedError, match="404"):
+        vmap.fetch("no-such-package")
+    assert isinstance(vmap.failure("no-such-package"), LookupFailedError)
+    assert len(responses.calls) == 1
+    with pytest.raises(requests.HTTPError):
+        VersionMap(store=version_cache, refresh=True).fetch("no-such-package")
+    assert len(responses.calls) == 2
+
+
+def test_version_map_records_responses_without_a_version(version_cache):
+    responses.get("https://pypi.org/pypi/click/json", json={"info": {}})
+
+    vmap = VersionMap(store=version_cache)
+    with pytest.raises(LookupFailedError, match="no 'info.version'"):
+        vmap.fetch("click")
+    assert vmap.failure("click") is not None
+    assert version_cache.get("pypi-missing", f"{PYPI_KEY} click") is not None
+
+
+def test_version_map_does_not_hide_other_errors(monkeypatch, version_cache):
+    def broken_fetch(*args, **kwargs):
+        raise ValueError("not a lookup failure")
+
+    monkeypatch.setattr(
+        "upadup.providers.pypi.package_utils.fetch_pkg_latest", broken_fetch
+    )
+    vmap = VersionMap(store=version_cache)
+    with pytest.raises(ValueError, match="not a lookup failure"):
+        vmap.fetch("click")
+    assert vmap.failure("click") is None
+    assert version_cache.get("pypi-missing", f"{PYPI_KEY} click") is None
+
+
+def test_version_map_does_not_remember_server_errors(version_cache):
+    responses.get("https://pypi.org/pypi/click/json", status=503)
+
+    vmap = VersionMap(store=version_cache)
+    with pytest.raises(requests.HTTPError):
+        vmap.fetch("click")
+    assert vmap.failure("click") is not None
+    assert version_cache.get("pypi-missing", f"{PYPI_KEY} click") is None
+
+
+def test_version_map_keeps_entries_of_other_indexes_apart(version_cache):
+    version_cache.set("pypi", f"{PYPI_KEY} click", "8.1.0")
+    version_cache.set("pypi-missing", f"{PYPI_KEY} black", "404 Client Error")
+    responses.get(f"{MIRROR_URL}/click/json", json={"info": {"version": "8.0.0"}})
+    responses.get(f"{MIRROR_URL}/black/json", json={"info": {"version": "25.1.0"}})
+
+    vmap = VersionMap(store=version_cache, indexes=[PackageIndex(MIRROR_URL)])
+    assert vmap["click"] == "8.0.0"
+    assert vmap["black"] == "25.1.0"
+    assert len(responses.calls) == 2
+    assert version_cache.get("pypi", f"{MIRROR_URL} click").value == "8.0.0"
+    assert version_cache.get("pypi", f"{PYPI_KEY} click").value == "8.1.0"
+
+
+def test_version_map_only_keeps_validators_of_the_first_index(version_cache):
+    responses.get(f"{MIRROR_URL}/click/json", status=503)
+    responses.get(
+        "https://pypi.org/pypi/click/json",
+        json={"info": {"version": "8.1.0"}},
+        headers={"ETag": '"v1"'},
+    )
+    indexes = [PackageIndex(MIRROR_URL), PackageIndex("https://pypi.org/pypi")]
+
+    assert VersionMap(store=version_cache, indexes=indexes)["click"] == "8.1.0"
+    entry = version_cache.get("pypi", f"{MIRROR_URL} {PYPI_KEY} click")
+    # the mirror would be sent validators which PyPI issued
+    assert entry.value == "8.1.0"
+    assert entry.etag is None
+
+
+def test_version_map_reads_only_leading_info_from_large_documents():
+    releases = {f"1.{i}": [{"filename": f"pkg-1.{i}.tar.gz"}] for i in range(50_000)}
+    responses.get(
+        "https://pypi.org/pypi/big/json",
+        json={"info": {"version": "1.49999"}, "releases": releases},
+    )
+
+    assert VersionMap()["big"] == "1.49999"
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from upadup.cache import VersionCache, default_cache_dir
+
+
+@pytest.fixture
+def version_cache(tmp_path):
+    version_cache = VersionCache(tmp_path / "cache.sqlite3")
+    yield version_cache
+    version_cache.close()
+
+
+def test_default_cache_dir_respects_env_var(isolated_cache_dir):
+    assert default_cache_dir() == isolated_cache_dir
+
+
+def test_cache_roundtrip(version_cache):
+    assert version_cache.get("pypi", "click") is None
+
+    version_cache.set("pypi", "click", "8.1.0", etag='"abc"')
+    entry = version_cache.get("pypi", "click")
+    assert entry.value == "8.1.0"
+    assert entry.etag == '"abc"'
+    assert entry.last_modified is None
+    assert entry.is_fresh
+
+    # namespaces are distinct
+    assert version_cache.get("github", "click") is None
+
+
+def test_cache_entry_expires_and_touch_refreshes(version_cache):
+    version_cache.set("pypi", "click", "8.1.0", ttl=-1)
+    assert not version_cache.get("pypi", "click").is_fresh
+
+    version_cache.touch("pypi", "click")
+    assert version_cache.get("pypi", "click").is_fresh
+
+
+def test_cache_is_shared_between_connections(version_cache):
+    other = VersionCache(version_cache.path)
+    try:
+        other.set("pypi", "click", "8.1.0")
+        assert version_cache.get("pypi", "click").value == "8.1.0"
+    finally:
+        other.close()
+
+
+def test_cache_info_and_clear(version_cache):
+    version_cache.set("pypi", "click", "8.1.0")
+    version_cache.set("pypi", "flake8", "7.0.0", ttl=-1)
+
+    info = version_cache.info()
+    assert info["path"] == str(version_cache.path)
+    assert info["namespaces"] == {"pypi": {"entries": 2, "fresh": 1}}
+
+    assert version_cache.clear() == 2
+    assert version_cache.info()["namespaces"] == {}
+
+
+def test_open_default_uses_cache_dir(isolated_cache_dir):
+    version_cache = VersionCache.open_default()
+    assert version_cache.path == isolated_cache_dir / "cache.sqlite3"
+    version_cache.close()
+
+
+def test_cache_timestamps(version_cache):
+    before = time.time()
+    version_cache.set("pypi", "click", "8.1.0", ttl=10)
+    entry = version_cache.get("pypi", "click")
+    assert before <= entry.fetched_at <= time.time()
+    assert entry.expires_at == pytest.approx(entry.fetched_at + 10)
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+import requests
+import responses
+
+from upadup import cassette, http
+from upadup.cassette import Cassette, CassetteError, CassetteMissError
+from upadup.main import main
+from upadup.providers.github import api as github_api
+from upadup.providers.pypi import package_utils
+
+PYPI_URL = "https://pypi.org/pypi/flake8-bugbear/json"
+TAGS_URL = "https://api.github.com/repos/wasilibs/go-shellcheck/tags/"
+
+
+@pytest.fixture(autouse=True)
+def no_cassette():
+    yield
+    http.use_cassette(None)
+
+
+def _use(directory, mode, **kwargs):
+    used = Cassette(directory, mode=mode, **kwargs)
+    http.use_cassette(used)
+    return used
+
+
+def test_replays_recorded_pypi_responses(tmp_path, mock_package_latest_version):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    recording = _use(tmp_path, "record")
+    assert package_utils.get_pkg_latest("flake8-bugbear") == "24.12.12"
+    recording.close()
+
+    responses.reset()
+    _use(tmp_path, "replay", latency=False)
+    assert package_utils.get_pkg_latest("flake8-bugbear") == "24.12.12"
+    assert len(responses.calls) == 0
+
+
+def test_replays_paginated_github_tags(tmp_path):
+    responses.get(
+        TAGS_URL,
+        json=[{"name": "latest", "commit": {"sha": "a" * 40}}],
+        headers={"Link": f'<{TAGS_URL}?per_page=1&page=2>; rel="next"'},
+    )
+    responses.get(
+        f"{TAGS_URL}?per_page=1&page=2",
+        json=[{"name": "v0.10.0", "commit": {"sha": "b" * 40}}],
+    )
+    recording = _use(tmp_path, "record")
+    recorded = github_api.get_tags_json("wasilibs", "go-shellcheck", per_page=1)
+    recording.close()
+
+    responses.reset()
+    _use(tmp_path, "replay", latency=False)
+    replayed = github_api.get_tags_json("wasilibs", "go-shellcheck", per_page=1)
+    assert replayed == recorded
+    assert len(responses.calls) == 0
+
+
+def test_repeated_requests_are_answered_in_order(tmp_path):
+    responses.get(PYPI_URL, json={"info": {"version": "1.0"}})
+    responses.get(PYPI_URL, json={"info": {"version": "2.0"}})
+    recording = _use(tmp_path, "record")
+    for _ in range(2):
+        http.get(PYPI_URL)
+    recording.close()
+
+    responses.reset()
+    _use(tmp_path, "replay", latency=False)
+    versions = [http.get(PYPI_URL).json()["info"]["version"] for _ in range(3)]
+    assert versions == ["1.0", "2.0", "2.0"]
+
+
+@pytest.mark.parametrize("latency", (True, False))
+def test_replay_latency(tmp_path, monkeypatch, latency):
+    path = tmp_path / cassette.CASSETTE_FILENAME
+    interaction = {
+        "method": "GET",
+        "url": PYPI_URL,
+        "body_sha256": None,
+        "status": 200,
+        "reason": "OK",
+        "headers": {"Content-Type": "application/json"},
+        "body": "e30=",
+        "elapsed": 0.25,
+    }
+    path.write_text(
+        json.dumps({"format_version": cassette.FORMAT_VERSION})
+        + "\n"
+        + json.dumps(interaction)
+        + "\n"
+    )
+    sleeps = []
+    monkeypatch.setattr(cassette.time, "sleep", sleeps.append)
+
+    _use(tmp_path, "replay", latency=latency)
+    assert http.get(PYPI_URL).json() == {}
+    assert sleeps == ([0.25] if latency else [])
+
+
+def test_unrecorded_request_is_an_error(tmp_path):
+    _use(tmp_path, "record").close()
+
+    _use(tmp_path, "replay")
+    with pytest.raises(CassetteMissError, match="no recorded response"):
+        http.get(PYPI_URL)
+    # it is a request error, so it is handled as one by the providers, but it is
+    # not retried
+    assert issubclass(CassetteMissError, requests.RequestException)
+
+
+def test_missing_cassette(tmp_path):
+    with pytest.raises(CassetteError, match="cannot read cassette"):
+        Cassette(tmp_path, mode="replay")
+
+
+def test_record_and_replay_a_run(tmp_path, monkeypatch, mock_package_latest_version):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    config = (
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+    )
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(config)
+    cassette_dir = tmp_path / "cassette"
+    monkeypatch.chdir(tmp_path)
+
+    main(["--record", str(cassette_dir)])
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+
+    config_path.write_text(config)
+    responses.reset()
+    main(["--replay", str(cassette_dir), "--replay-latency", "zero"])
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+    assert len(responses.calls) == 0
@@ -6,6 +6,7 @@ from textwrap import dedent as d
 import pytest
 
 from upadup.config import BadConfigError, Config
+from upadup.providers.pypi import PackageIndex
 
 
 @pytest.fixture
@@ -48,6 +49,27 @@ def test_empty_config_is_valid_and_defines_no_skip_repos(
             "tool.upadup.skip_repos = ['a', 1]\n",
             "'tool.upadup.skip_repos[1]' was not a string",
         ),
+        ("tool.upadup.index_urls = 'a'\n", "'tool.upadup.index_urls' should be a list"),
+        (
+            "tool.upadup.index_urls = [1]\n",
+            "'tool.upadup.index_urls[0]' was not a string or a table",
+        ),
+        (
+            "tool.upadup.index_urls = [{api = 'json'}]\n",
+            "'tool.upadup.index_urls[0].url' should be a string",
+        ),
+        (
+            "tool.upadup.index_urls = [{url = 'a', timeout = 'b'}]\n",
+            "'tool.upadup.index_urls[0].timeout' should be a number",
+        ),
+        (
+            "tool.upadup.index_urls = [{url = 'a', api = 'xml'}]\n",
+            "'tool.upadup.index_urls[0]': unknown package index API",
+        ),
+        (
+            "tool.upadup.index_urls = [{url = 'a', mirror = true}]\n",
+            "'tool.upadup.index_urls[0]' contained unexpected keys",
+        ),
     ],
 )
 def test_malformed_config_is_rejected(
@@ -89,3 +111,22 @@ def test_config_with_skip_repos_config(
 
     c = Config.load()
     assert c.skip_repos == expect_skip_repos
+
+
+def test_config_with_index_urls(in_tmp_dir):
+    config_file = in_tmp_dir / ".upadup.toml"
+    config_file.write_text(d("""\
+        [tool.upadup]
+        index_urls = [
+            {url = "https://devpi.example/root/pypi/+simple/", timeout = 0.5},
+            {url = "https://mirror.example/pypi", api = "simple"},
+            "https://pypi.org/pypi",
+        ]
+        """))
+
+    c = Config.load()
+    assert c.indexes == (
+        PackageIndex("https://devpi.example/root/pypi/+simple", "simple", 0.5),
+        PackageIndex("https://mirror.example/pypi", "simple"),
+        PackageIndex("https://pypi.org/pypi"),
+    )
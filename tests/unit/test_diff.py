@@ -0,0 +1,69 @@
+import difflib
+import io
+import random
+
+import pytest
+
+from upadup.diff import unified_diff
+from upadup.updater import _create_new_content
+from upadup.yaml import extract_hook_dependencies
+
+
+def _build_config(num_repos, newlines, rng):
+    lines = ["repos:"]
+    for repo in range(num_repos):
+        lines.append(f"  - repo: https://github.com/example/repo{repo}")
+        lines.append("    rev: v1.0.0")
+        lines.append("    hooks:")
+        lines.append(f"      - id: hook{repo}")
+        if rng.random() < 0.3:
+            deps = ", ".join(f"'flow{repo}-{i}==1.0'" for i in range(3))
+            lines.append(f"        additional_dependencies: [{deps}]")
+        else:
+            lines.append("        additional_dependencies:")
+            for i in range(rng.randint(1, 3)):
+                lines.append(f'          - "block{repo}-{i}==1.0"')
+    return "".join(f"{line}{rng.choice(newlines)}" for line in lines)
+
+
+def _difflib_diff(old, new, name):
+    return "".join(
+        difflib.unified_diff(
+            io.StringIO(old, newline="").readlines(),
+            io.StringIO(new, newline="").readlines(),
+            name,
+            name,
+        )
+    )
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize(
+    "newlines",
+    [
+        pytest.param(["\n"], id="n"),
+        pytest.param(["\r\n"], id="rn"),
+        pytest.param(["\n", "\r\n", "\r"], id="mixed"),
+    ],
+)
+def test_matches_difflib(seed, newlines):
+    rng = random.Random(seed)
+    text = _build_config(rng.randint(1, 12), newlines, rng)
+    if rng.random() < 0.5:
+        # the last line may have no newline
+        text = text.rstrip("\r\n")
+    records = [record for hook in extract_hook_dependencies(text) for record in hook]
+    chosen = rng.sample(records, rng.randint(1, len(records)))
+    updates = [
+        (record, record.dependency.replace("1.0", f"{rng.randint(2, 99)}.0"))
+        for record in chosen
+    ]
+
+    new_text = _create_new_content(text, updates)
+    assert unified_diff(text, updates, "a.yaml", "a.yaml") == _difflib_diff(
+        text, new_text, "a.yaml"
+    )
+
+
+def test_without_updates_is_empty():
+    assert unified_diff("repos: []\n", [], "a.yaml", "a.yaml") == ""
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+import responses
+
+from upadup import http
+from upadup.scheduler import DeadlineExceededError
+
+
+@pytest.fixture(autouse=True)
+def reset_http_settings():
+    yield
+    http.configure(
+        timeout=http.DEFAULT_TIMEOUT,
+        pool_size=http.DEFAULT_POOL_SIZE,
+        retries=http.DEFAULT_RETRIES,
+        backoff_factor=http.DEFAULT_BACKOFF_FACTOR,
+    )
+
+
+def test_session_is_shared():
+    assert http.get_session() is http.get_session()
+
+
+def test_configure_replaces_session():
+    session = http.get_session()
+    http.configure(pool_size=32)
+
+    new_session = http.get_session()
+    assert new_session is not session
+    assert new_session.get_adapter("https://pypi.org")._pool_maxsize == 32
+
+
+def test_get_applies_default_timeout():
+    responses.get("https://example.org/", body="ok")
+
+    http.get("https://example.org/")
+    assert responses.calls[0].request.req_kwargs["timeout"] == http.DEFAULT_TIMEOUT
+
+
+def test_get_retries_transient_errors():
+    http.configure(backoff_factor=0)
+    responses.get("https://example.org/", status=503)
+    responses.get("https://example.org/", body="ok")
+
+    response = http.get("https://example.org/")
+    assert response.status_code == 200
+    assert len(responses.calls) == 2
+
+
+def test_get_gives_up_after_configured_retries():
+    http.configure(retries=1, backoff_factor=0)
+    responses.get("https://example.org/", status=503)
+
+    response = http.get("https://example.org/")
+    assert response.status_code == 503
+    assert len(responses.calls) == 2
+
+
+def test_configure_replaces_scheduler():
+    scheduler = http.get_scheduler()
+    assert http.get_scheduler() is scheduler
+
+    http.configure(pool_size=32, retries=5)
+    new_scheduler = http.get_scheduler()
+    assert new_scheduler is not scheduler
+    assert new_scheduler.max_concurrency == 32
+    assert new_scheduler.retries == 5
+    # retries are left to the scheduler
+    assert http.get_session().get_adapter("https://pypi.org").max_retries.total == 0
+
+
+def test_timeouts_are_cut_short_by_the_deadline():
+    responses.get("https://example.org/", body="ok")
+    http.set_deadline(time.monotonic() + 2)
+
+    http.get("https://example.org/", timeout=(5, 1))
+    connect, read = responses.calls[0].request.req_kwargs["timeout"]
+    assert 0 < connect <= 2
+    assert read == 1
+
+
+def test_no_requests_are_made_after_the_deadline():
+    responses.get("https://example.org/", body="ok")
+    http.set_deadline(time.monotonic() - 1)
+
+    with pytest.raises(DeadlineExceededError):
+        http.get("https://example.org/")
+    with pytest.raises(DeadlineExceededError):
+        http.check_deadline()
+    assert len(responses.calls) == 0
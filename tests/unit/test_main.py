@@ -0,0 +1,292 @@
+import json
+import time
+
+import pytest
+import responses
+
+import upadup.providers.github.api
+from upadup import http
+from upadup.cache import VersionCache
+from upadup.main import EXIT_TIMED_OUT, main
+from upadup.scheduler import DeadlineExceededError
+
+
+def test_cache_info_subcommand(capsys, isolated_cache_dir):
+    version_cache = VersionCache.open_default()
+    version_cache.set("pypi", "click", "8.1.0")
+    version_cache.close()
+
+    main(["cache", "info"])
+
+    info = json.loads(capsys.readouterr().out)
+    assert info["path"] == str(isolated_cache_dir / "cache.sqlite3")
+    assert info["namespaces"] == {"pypi": {"entries": 1, "fresh": 1}}
+
+
+def test_cache_clear_subcommand(capsys, isolated_cache_dir):
+    version_cache = VersionCache.open_default()
+    version_cache.set("pypi", "click", "8.1.0")
+    version_cache.close()
+
+    main(["cache", "clear"])
+
+    assert "removed 1 entries" in capsys.readouterr().out
+    version_cache = VersionCache.open_default()
+    assert version_cache.get("pypi", "click") is None
+    version_cache.close()
+
+
+def test_index_build_and_offline_run(
+    capsys, tmp_path, monkeypatch, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+    )
+    snapshot_path = tmp_path / "index.sqlite3"
+
+    main(["index", "build", str(snapshot_path), "--recursive", str(tmp_path)])
+    assert "wrote 1 entries" in capsys.readouterr().out
+
+    responses.reset()
+    monkeypatch.chdir(tmp_path)
+    main(["--index-snapshot", str(snapshot_path)])
+
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+    assert len(responses.calls) == 0
+
+
+def test_check_exit_first(capsys, tmp_path, monkeypatch, mock_package_latest_version):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config = (
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+    )
+    config_path.write_text(config)
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--check", "--exit-first"])
+
+    assert excinfo.value.code == 1
+    assert capsys.readouterr().out == (
+        ".pre-commit-config.yaml: update found, "
+        "flake8-bugbear==23.0.0 => flake8-bugbear==24.12.12\n"
+    )
+    assert config_path.read_text() == config
+
+
+def test_exit_first_requires_check(capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--exit-first"])
+
+    assert excinfo.value.code == 2
+    assert "--exit-first can only be used with --check" in capsys.readouterr().err
+
+
+def test_timings_and_trace(capsys, tmp_path, monkeypatch, mock_package_latest_version):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    (tmp_path / ".pre-commit-config.yaml").write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+    )
+    trace_path = tmp_path / "trace.json"
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit):
+        main(["--check", "--no-cache", "--timings", "--trace", str(trace_path)])
+
+    err = capsys.readouterr().err
+    assert "pypi       lookup" in err
+    assert "miss=1" in err
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert {(event["cat"], event["name"]) for event in events} >= {
+        ("config", "read"),
+        ("config", "parse"),
+        ("config", "load"),
+        ("lookup", "resolve"),
+        ("pypi", "lookup"),
+        ("pypi", "request"),
+        ("http", "GET"),
+        ("rewrite", "diff"),
+    }
+
+
+def test_reports_dependencies_deferred_by_rate_limit(
+    capsys, tmp_path, monkeypatch, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", False)
+    rate_limit = upadup.providers.github.api.RATE_LIMIT
+    rate_limit.remaining, rate_limit.reset_at = 0, time.time() + 3600
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+        "  - repo: https://github.com/example/hooks\n"
+        "    rev: v1.0.0\n"
+        "    hooks:\n"
+        "      - id: shellcheck\n"
+        "        additional_dependencies:\n"
+        "          - github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--no-cache"])
+
+    # the other updates are still applied
+    assert excinfo.value.code == 1
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+    err = capsys.readouterr().err
+    assert "upadup: 1 dependencies were not checked\n" in err
+    assert (
+        "  .pre-commit-config.yaml: "
+        "github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0 "
+        "(GitHub API rate limit exceeded, until "
+    ) in err
+
+
+def test_timeout_reports_lookups_given_up_on(
+    capsys, tmp_path, monkeypatch, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+
+    def slow_fetch_tags(owner, repo, *, etag=None):
+        raise DeadlineExceededError(f"ran out of time before requesting {repo}")
+
+    monkeypatch.setattr("upadup.providers.github.tag_map.fetch_tags", slow_fetch_tags)
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+        "  - repo: https://github.com/example/hooks\n"
+        "    rev: v1.0.0\n"
+        "    hooks:\n"
+        "      - id: shellcheck\n"
+        "        additional_dependencies:\n"
+        "          - github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--no-cache", "--timeout", "30"])
+
+    # the updates found in time are still applied
+    assert excinfo.value.code == EXIT_TIMED_OUT
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+    assert (
+        "  .pre-commit-config.yaml: "
+        "github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0 "
+        "(ran out of time before requesting go-shellcheck)\n"
+    ) in capsys.readouterr().err
+    assert http.time_remaining() is None
+
+
+def test_reports_packages_which_could_not_be_found(
+    capsys, tmp_path, monkeypatch, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    responses.get("https://pypi.org/pypi/flake8-bugbaer/json", status=404)
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies:\n"
+        "          - 'flake8-bugbear==23.0.0'\n"
+        "          - 'flake8-bugbaer==23.0.0'\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(SystemExit) as excinfo:
+        main(["--no-cache"])
+
+    # the other packages are still updated
+    assert excinfo.value.code == 1
+    content = config_path.read_text()
+    assert "flake8-bugbear==24.12.12" in content
+    assert "flake8-bugbaer==23.0.0" in content
+    err = capsys.readouterr().err
+    assert "upadup: 1 dependencies were not checked\n" in err
+    assert "  .pre-commit-config.yaml: flake8-bugbaer==23.0.0 (404 " in err
+
+
+def test_switching_index_url_does_not_reuse_cached_lookups(
+    capsys, tmp_path, monkeypatch, isolated_cache_dir
+):
+    responses.get("https://pypi.org/pypi/flake8-bugbear/json", status=404)
+    mirror_url = "https://mirror.example/pypi"
+    responses.get(
+        f"{mirror_url}/flake8-bugbear/json", json={"info": {"version": "24.12.12"}}
+    )
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/PyCQA/flake8\n"
+        "    rev: 7.1.1\n"
+        "    hooks:\n"
+        "      - id: flake8\n"
+        "        additional_dependencies: ['flake8-bugbear==23.0.0']\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    # the 404 from PyPI is remembered
+    with pytest.raises(SystemExit):
+        main([])
+    assert "flake8-bugbear==23.0.0" in config_path.read_text()
+
+    # but not for the mirror
+    main(["--index-url", mirror_url])
+    assert "flake8-bugbear==24.12.12" in config_path.read_text()
+    assert [call.request.url for call in responses.calls][-1] == (
+        f"{mirror_url}/flake8-bugbear/json"
+    )
+
+
+def test_repos_without_version_tags_are_only_warned_about(
+    capsys, tmp_path, monkeypatch, mock_github_tags
+):
+    mock_github_tags([{"name": "nightly", "commit": {"sha": "a" * 40}}])
+    config_path = tmp_path / ".pre-commit-config.yaml"
+    config_path.write_text(
+        "repos:\n"
+        "  - repo: https://github.com/example/hooks\n"
+        "    rev: v1.0.0\n"
+        "    hooks:\n"
+        "      - id: shellcheck\n"
+        "        additional_dependencies:\n"
+        "          - github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    main(["--no-cache", "--check"])
+
+    err = capsys.readouterr().err
+    assert "no version tags were found for wasilibs/go-shellcheck" in err
+    assert "not checked" not in err
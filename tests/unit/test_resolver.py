@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import responses
+
+from upadup import http
+from upadup.providers.github import TagMap
+from upadup.providers.github.api import TagsResponse
+from upadup.providers.pypi import VersionMap
+from upadup.resolver import AsyncResolver, ThreadedResolver, first_result
+from upadup.scheduler import DeadlineExceededError
+
+resolver_classes = pytest.mark.parametrize(
+    "resolver_class", (ThreadedResolver, AsyncResolver)
+)
+
+
+@resolver_classes
+def test_resolver_rejects_non_positive_jobs(resolver_class):
+    with pytest.raises(ValueError, match="positive"):
+        resolver_class(jobs=0)
+
+
+@resolver_classes
+@pytest.mark.parametrize("jobs", (1, 4))
+def test_resolver_fills_version_map(mock_package_latest_version, resolver_class, jobs):
+    mock_package_latest_version("click", "8.1.0")
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+
+    vmap = VersionMap()
+    tag_map = TagMap()
+    resolver_class(jobs=jobs).resolve(
+        vmap, tag_map, ["click", "Flake8_Bugbear", "flake8-bugbear"], []
+    )
+
+    assert len(tag_map) == 0
+    assert sorted(vmap) == ["click", "flake8-bugbear"]
+    assert vmap["click"] == "8.1.0"
+    # each package was fetched exactly once
+    assert len(responses.calls) == 2
+
+
+@resolver_classes
+def test_resolver_skips_known_packages(mock_package_latest_version, resolver_class):
+    vmap = VersionMap()
+    vmap.prefill({"click": "8.1.0"})
+
+    resolver_class().resolve(vmap, TagMap(), ["click"], [])
+    assert len(responses.calls) == 0
+
+
+@resolver_classes
+def test_resolver_fills_tag_map(mock_github_tags, resolver_class):
+    tag_map = TagMap()
+    resolver_class().resolve(
+        VersionMap(), tag_map, [], ["wasilibs/go-shellcheck", "WasiLibs/Go-ShellCheck"]
+    )
+
+    assert list(tag_map) == ["wasilibs/go-shellcheck"]
+    latest = tag_map["wasilibs/go-shellcheck"].latest
+    assert latest.name == "v0.11.1"
+    assert latest.sha == "4e7020840c303923eb1ab846fc446d77be892570"
+
+
+@resolver_classes
+def test_resolver_records_lookups_past_the_deadline(
+    mock_package_latest_version, mock_github_tags, resolver_class
+):
+    mock_package_latest_version("click", "8.1.0")
+    http.set_deadline(time.monotonic() - 1)
+    vmap = VersionMap()
+
+    resolver_class().resolve(vmap, TagMap(), ["click"], [])
+    assert list(vmap) == []
+    assert isinstance(vmap.failure("click"), DeadlineExceededError)
+    assert len(responses.calls) == 0
+
+
+def test_async_resolver_merges_in_flight_repo_fetches(monkeypatch):
+    fetched = []
+
+    def fake_fetch_tags(owner, repo, etag=None):
+        fetched.append((owner, repo))
+        time.sleep(0.01)
+        return TagsResponse([{"name": "v1.0.0", "commit": {"sha": "a" * 40}}], None)
+
+    monkeypatch.setattr("upadup.providers.github.tag_map.fetch_tags", fake_fetch_tags)
+
+    resolver = AsyncResolver()
+    tag_maps = [TagMap(), TagMap()]
+
+    async def resolve_concurrently():
+        await asyncio.gather(
+            *(
+                resolver.resolve_async(VersionMap(), tag_map, [], ["org/repo"])
+                for tag_map in tag_maps
+            )
+        )
+
+    asyncio.run(resolve_concurrently())
+
+    assert fetched == [("org", "repo")]
+    for tag_map in tag_maps:
+        assert tag_map["org/repo"].latest.name == "v1.0.0"
+
+
+def test_async_resolver_bounds_concurrency(monkeypatch):
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def fake_fetch(self, name):
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return "1.0"
+
+    monkeypatch.setattr(VersionMap, "fetch", fake_fetch)
+
+    vmap = VersionMap()
+    AsyncResolver(jobs=2).resolve(vmap, TagMap(), [f"pkg{i}" for i in range(6)], [])
+
+    assert len(vmap) == 6
+    assert max_in_flight == 2
+
+
+def test_async_resolver_runs_as_many_fetches_as_jobs(monkeypatch):
+    """More fetches run at once than the default executor of the loop allows."""
+    jobs = 40
+    barrier = threading.Barrier(jobs, timeout=5)
+
+    def fake_fetch(self, name):
+        barrier.wait()
+        return "1.0"
+
+    monkeypatch.setattr(VersionMap, "fetch", fake_fetch)
+
+    vmap = VersionMap()
+    names = [f"pkg{i}" for i in range(jobs)]
+    AsyncResolver(jobs=jobs).resolve(vmap, TagMap(), names, [])
+
+    assert len(vmap) == jobs
+
+
+def test_first_result_returns_the_first_result_found():
+    started = []
+
+    def check(value):
+        started.append(value)
+        return value
+
+    # with one job, checks run in order, and none runs after a result is found
+    assert (
+        first_result([lambda: check(None), lambda: check(1), lambda: check(2)], jobs=1)
+        == 1
+    )
+    assert started == [None, 1]
+
+
+def test_first_result_without_any_result():
+    assert first_result([lambda: None, lambda: None]) is None
+    assert first_result([]) is None
+
+
+def test_first_result_raises_the_first_error_if_nothing_is_found():
+    def fail():
+        raise ValueError("lookup failed")
+
+    with pytest.raises(ValueError, match="lookup failed"):
+        first_result([lambda: None, fail], jobs=1)
+    # a result is still returned, even if another check failed
+    assert first_result([fail, lambda: "found"], jobs=1) == "found"
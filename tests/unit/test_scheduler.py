@@ -0,0 +1,198 @@
+import io
+import threading
+import time
+
+import pytest
+import requests
+
+from upadup import scheduler
+from upadup.scheduler import CircuitOpenError, DeadlineExceededError, Scheduler
+
+URL = "https://example.org/"
+
+
+def _response(status=200, **headers):
+    response = requests.Response()
+    response.status_code = status
+    response.raw = io.BytesIO(b"")
+    response.headers.update({name.replace("_", "-"): v for name, v in headers.items()})
+    return response
+
+
+class FakeHost:
+    """Answer requests from a list of outcomes, repeating the last one."""
+
+    def __init__(self, *outcomes) -> None:
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return _response(outcome)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(scheduler.time, "sleep", slept.append)
+    return slept
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("max_concurrency", 8)
+    kwargs.setdefault("retries", 3)
+    kwargs.setdefault("backoff_factor", 0.5)
+    return Scheduler(**kwargs)
+
+
+def test_retries_with_jittered_backoff(sleeps):
+    host = FakeHost(requests.ConnectionError(), 503, 503, 200)
+
+    response = _scheduler().request("GET", URL, host)
+    assert response.status_code == 200
+    assert host.calls == 4
+    assert len(sleeps) == 3
+    for attempt, delay in enumerate(sleeps):
+        assert 0 <= delay <= 0.5 * 2**attempt
+
+
+def test_gives_up_after_retries(sleeps):
+    host = FakeHost(500)
+    assert _scheduler(retries=2).request("GET", URL, host).status_code == 500
+    assert host.calls == 3
+
+    host = FakeHost(requests.ReadTimeout())
+    with pytest.raises(requests.ReadTimeout):
+        _scheduler(retries=2).request("GET", URL, host)
+    assert host.calls == 3
+
+
+def test_does_not_retry_post(sleeps):
+    host = FakeHost(503, 200)
+    assert _scheduler().request("POST", URL, host).status_code == 503
+    assert host.calls == 1
+
+
+def test_does_not_wait_for_long_retry_after(sleeps):
+    responses = [_response(429, Retry_After="3600")]
+    response = _scheduler().request("GET", URL, lambda: responses[0])
+    assert response.status_code == 429
+    assert sleeps == []
+
+
+def test_waits_for_short_retry_after(sleeps):
+    responses = [_response(429, Retry_After="2"), _response(200)]
+    response = _scheduler().request("GET", URL, lambda: responses.pop(0))
+    assert response.status_code == 200
+    assert sleeps[0] >= 2
+
+
+@pytest.mark.parametrize("status", (403, 429))
+def test_does_not_retry_when_the_quota_is_used_up(sleeps, status):
+    responses = [_response(status, X_RateLimit_Remaining="0", Retry_After="2")]
+    calls = []
+
+    def send():
+        calls.append(None)
+        return responses[0]
+
+    assert _scheduler().request("GET", URL, send).status_code == status
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_failures_halve_the_limit_and_successes_grow_it(sleeps):
+    pacer = _scheduler(max_concurrency=8, retries=0)
+    pacer.request("GET", URL, FakeHost(503))
+    assert pacer.host_limit(URL) == 4
+
+    for _ in range(40):
+        pacer.request("GET", URL, FakeHost(200))
+    assert pacer.host_limit(URL) == 8
+    # hosts are limited separately
+    assert pacer.host_limit("https://other.example.org/") == 8
+
+
+def test_slow_responses_halve_the_limit(monkeypatch):
+    # the start, end, and release of each request
+    clock = iter([0.0, 0.1, 0.1, 1.0, 1.1, 1.1, 2.0, 7.0, 7.0])
+    monkeypatch.setattr(scheduler.time, "monotonic", lambda: next(clock))
+    pacer = _scheduler(max_concurrency=8)
+
+    # two fast responses, then one much slower
+    for _ in range(3):
+        pacer.request("GET", URL, FakeHost(200))
+    assert pacer.host_limit(URL) == 4
+
+
+def test_limits_concurrent_requests():
+    pacer = _scheduler(max_concurrency=2)
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def send():
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01)
+        with lock:
+            in_flight -= 1
+        return _response(200)
+
+    threads = [
+        threading.Thread(target=pacer.request, args=("GET", URL, send))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max_in_flight == 2
+
+
+def test_circuit_opens_after_consecutive_failures(sleeps):
+    pacer = _scheduler(retries=0, failure_threshold=3)
+    host = FakeHost(requests.ConnectionError())
+    for _ in range(3):
+        with pytest.raises(requests.ConnectionError):
+            pacer.request("GET", URL, host)
+
+    with pytest.raises(CircuitOpenError, match="too many requests to example.org"):
+        pacer.request("GET", URL, host)
+    assert host.calls == 3
+    # other hosts are unaffected
+    assert pacer.request("GET", "https://other.example.org/", FakeHost(200))
+
+
+def test_circuit_is_probed_after_cooldown(sleeps):
+    pacer = _scheduler(retries=0, failure_threshold=1, cooldown=0)
+    with pytest.raises(requests.ConnectionError):
+        pacer.request("GET", URL, FakeHost(requests.ConnectionError()))
+
+    # the probe fails, so the circuit opens again
+    with pytest.raises(requests.ConnectionError):
+        pacer.request("GET", URL, FakeHost(requests.ConnectionError()))
+    # the probe succeeds, so the circuit closes
+    assert pacer.request("GET", URL, FakeHost(200)).status_code == 200
+    assert pacer.request("GET", URL, FakeHost(200)).status_code == 200
+
+
+def test_requests_are_not_sent_after_the_deadline(sleeps):
+    host = FakeHost(200)
+    with pytest.raises(DeadlineExceededError, match="ran out of time"):
+        _scheduler().request("GET", URL, host, deadline=time.monotonic() - 1)
+    assert host.calls == 0
+
+
+def test_requests_are_not_retried_past_the_deadline(sleeps):
+    responses = [_response(503, Retry_After="5"), _response(200)]
+    response = _scheduler().request(
+        "GET", URL, lambda: responses.pop(0), deadline=time.monotonic() + 1
+    )
+    assert response.status_code == 503
+    assert sleeps == []
@@ -0,0 +1,91 @@
+import copy
+import pickle
+import sqlite3
+import time
+
+import pytest
+import responses
+
+from upadup.providers import github, pypi
+from upadup.snapshot import (
+    IndexSnapshot,
+    SnapshotError,
+    SnapshotLookupError,
+    build_snapshot,
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, mock_package_latest_version, mock_github_tags):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    path = tmp_path / "index.sqlite3"
+    count = build_snapshot(path, ["Flake8_Bugbear"], ["WasiLibs/go-shellcheck"])
+    assert count == 2
+    return path
+
+
+def test_snapshot_answers_lookups_without_network(snapshot_path):
+    snapshot = IndexSnapshot(snapshot_path)
+    responses.reset()
+
+    version_map = pypi.VersionMap(store=snapshot)
+    tag_map = github.TagMap(store=snapshot)
+    assert version_map["flake8-bugbear"] == "24.12.12"
+    assert (
+        tag_map.update_dependency("github.com/wasilibs/go-shellcheck/cmd@v0.10.0")
+        == "github.com/wasilibs/go-shellcheck/cmd@v0.11.1"
+    )
+    assert tag_map.fetch_batch(["wasilibs/go-shellcheck"]) is not None
+    assert len(responses.calls) == 0
+
+    entry = snapshot.get("pypi", "https://pypi.org/pypi flake8-bugbear")
+    assert entry.is_fresh
+    assert entry.fetched_at > 0
+    snapshot.close()
+
+
+def test_snapshot_miss_raises(snapshot_path):
+    snapshot = IndexSnapshot(snapshot_path)
+    version_map = pypi.VersionMap(store=snapshot)
+
+    with pytest.raises(SnapshotLookupError, match="pypi click'") as excinfo:
+        version_map["click"]
+    assert len(responses.calls) == 1
+    snapshot.close()
+
+    for error in (copy.copy(excinfo.value), pickle.loads(pickle.dumps(excinfo.value))):
+        assert str(error) == str(excinfo.value)
+
+
+def test_snapshot_rejects_unknown_format(snapshot_path):
+    with sqlite3.connect(snapshot_path) as conn:
+        conn.execute("UPDATE meta SET value = '999' WHERE key = 'format_version'")
+    conn.close()
+
+    with pytest.raises(SnapshotError, match="unsupported format"):
+        IndexSnapshot(snapshot_path)
+
+
+def test_snapshot_must_exist(tmp_path):
+    with pytest.raises(SnapshotError, match="not found"):
+        IndexSnapshot(tmp_path / "missing.sqlite3")
+
+
+def test_snapshot_is_not_written_with_deferred_repos(tmp_path, monkeypatch):
+    monkeypatch.setattr("upadup.providers.github.cli.HAS_CLI", False)
+    rate_limit = github.api.RATE_LIMIT
+    rate_limit.remaining, rate_limit.reset_at = 0, time.time() + 3600
+
+    path = tmp_path / "index.sqlite3"
+    with pytest.raises(SnapshotError, match="1 GitHub repos could not be looked up"):
+        build_snapshot(path, [], ["wasilibs/go-shellcheck"])
+    assert not path.exists()
+
+
+def test_snapshot_is_not_written_with_failed_packages(tmp_path):
+    responses.get("https://pypi.org/pypi/no-such-package/json", status=404)
+
+    path = tmp_path / "index.sqlite3"
+    with pytest.raises(SnapshotError, match="1 packages could not be looked up"):
+        build_snapshot(path, ["no-such-package"], [])
+    assert not path.exists()
@@ -0,0 +1,110 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+# the total time which may be spent importing modules on a no-op run, in
+# microseconds, taking the fastest of `IMPORT_TIMING_RUNS` runs
+# this is over twice the usual cost, so that slower machines do not fail, but
+# importing the providers and HTTP libraries eagerly would exceed it
+IMPORT_BUDGET_US = 120_000
+IMPORT_TIMING_RUNS = 3
+
+# modules which are only needed to look up versions
+LOOKUP_MODULES = (
+    "asyncio",
+    "packaging",
+    "requests",
+    "upadup.providers",
+    "urllib3",
+)
+
+NOOP_CONFIG = """\
+repos:
+  - repo: https://github.com/PyCQA/flake8
+    rev: 7.1.1
+    hooks:
+      - id: flake8
+"""
+
+# run upadup, then write the names of all imported modules to a file
+_LIST_MODULES = """\
+import json, sys
+from upadup.main import main
+try:
+    main({args!r})
+except SystemExit:
+    pass
+with open({output!r}, "w") as f:
+    json.dump(sorted(sys.modules), f)
+"""
+
+
+def _imported_modules(cwd, *args):
+    """Run upadup in a new interpreter, and get the modules it imported."""
+    output = cwd / "modules.json"
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _LIST_MODULES.format(args=list(args), output=str(output)),
+        ],
+        cwd=cwd,
+        capture_output=True,
+        check=True,
+    )
+    return json.loads(output.read_text())
+
+
+def _import_time(cwd, *args):
+    """Run upadup with `-X importtime`, and get the total self time of imports.
+
+    Modules imported while the interpreter starts up are excluded.
+    """
+    completed_process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"from upadup.main import main; main({list(args)!r})",
+        ],
+        cwd=cwd,
+        capture_output=True,
+        encoding="utf-8",
+    )
+    records = []
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line.removeprefix("import time:").split("|")
+        records.append((name.strip(), int(self_time)))
+    startup_end = [name for name, _ in records].index("site") + 1
+    return sum(self_time for _, self_time in records[startup_end:])
+
+
+@pytest.fixture
+def noop_project(tmp_path):
+    (tmp_path / ".pre-commit-config.yaml").write_text(NOOP_CONFIG)
+    return tmp_path
+
+
+@pytest.mark.parametrize("args", (["--help"], ["--no-cache"]))
+def test_noop_run_does_not_import_lookup_modules(noop_project, args):
+    imported = _imported_modules(noop_project, *args)
+
+    assert "upadup.main" in imported
+    assert not [
+        name
+        for name in imported
+        if any(name == m or name.startswith(f"{m}.") for m in LOOKUP_MODULES)
+    ]
+
+
+def test_noop_run_is_within_import_budget(noop_project):
+    import_time = min(
+        _import_time(noop_project, "--no-cache") for _ in range(IMPORT_TIMING_RUNS)
+    )
+
+    assert import_time < IMPORT_BUDGET_US
@@ -0,0 +1,69 @@
+import json
+import threading
+
+from upadup import timing
+
+
+def test_spans_are_not_timed_without_a_collector():
+    with timing.span("read", "config", path="x") as info:
+        info["bytes"] = 1
+    assert info == {"path": "x", "bytes": 1}
+
+
+def test_collect_receives_spans_with_details():
+    recorder = timing.SpanRecorder()
+    with timing.collect(recorder):
+        with timing.span("read", "config", path="x") as info:
+            info["bytes"] = 10
+    with timing.span("ignored", "config"):
+        pass
+
+    [span] = recorder.spans
+    assert (span.name, span.category) == ("read", "config")
+    assert span.args == {"path": "x", "bytes": 10}
+    assert span.duration >= 0
+
+
+def test_in_current_context_carries_collectors_to_other_threads():
+    recorder = timing.SpanRecorder()
+
+    def work():
+        with timing.span("lookup", "pypi"):
+            pass
+
+    with timing.collect(recorder):
+        wrapped = timing.in_current_context(work)
+    # the collector is used even after the collecting context has ended
+    threads = [threading.Thread(target=wrapped) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    unwrapped = threading.Thread(target=work)
+    unwrapped.start()
+    unwrapped.join()
+
+    assert len(recorder.spans) == 3
+    assert {span.thread_id for span in recorder.spans} == {
+        thread.ident for thread in threads
+    }
+
+
+def test_chrome_trace_and_summary(tmp_path):
+    recorder = timing.SpanRecorder()
+    with timing.collect(recorder):
+        for cache in ("hit", "miss", "miss"):
+            with timing.span("lookup", "pypi", cache=cache, bytes=100):
+                pass
+
+    trace_path = tmp_path / "trace.json"
+    recorder.write_chrome_trace(trace_path)
+    events = json.loads(trace_path.read_text())["traceEvents"]
+    assert len(events) == 3
+    assert {event["ph"] for event in events} == {"X"}
+    assert events[0]["cat"] == "pypi"
+    assert events[0]["args"]["bytes"] == 100
+
+    [header, row] = recorder.format_summary().splitlines()
+    assert row.split()[:3] == ["pypi", "lookup", "3"]
+    assert row.endswith("hit=1 miss=2 bytes=300")
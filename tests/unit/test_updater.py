@@ -0,0 +1,190 @@
+import os
+import textwrap
+
+import pytest
+import responses
+
+from upadup.cache import VersionCache
+from upadup.updater import ConfigChangedError, UpadupUpdater
+
+CONFIG = textwrap.dedent("""\
+    repos:
+      - repo: https://github.com/PyCQA/flake8
+        rev: 7.1.1
+        hooks:
+          - id: flake8
+            additional_dependencies: ['flake8-bugbear==23.0.0', "flake8-bugbear==23.0.0"]
+            # a comment which is kept as it was: flake8-bugbear==23.0.0
+    """)  # noqa: E501
+
+
+@pytest.fixture
+def conf(tmp_path, mock_package_latest_version):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    path = tmp_path / ".pre-commit-config.yaml"
+    path.write_text(CONFIG)
+    return path
+
+
+def test_splices_several_updates_on_one_line(conf):
+    updater = UpadupUpdater(path=conf)
+    updater.run()
+    updater.apply_updates()
+
+    assert conf.read_text() == CONFIG.replace(
+        "'flake8-bugbear==23.0.0', \"flake8-bugbear==23.0.0\"",
+        "'flake8-bugbear==24.12.12', \"flake8-bugbear==24.12.12\"",
+    )
+
+
+def test_updates_pins_with_extras_markers_and_other_clauses(
+    tmp_path, mock_package_latest_version
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    path = tmp_path / ".pre-commit-config.yaml"
+    path.write_text(
+        CONFIG.replace(
+            "['flake8-bugbear==23.0.0', \"flake8-bugbear==23.0.0\"]",
+            "['flake8-bugbear[x]==23.0.0', "
+            "'flake8-bugbear ==23.0.0, !=23.1.0 ; python_version > \"3.9\"']",
+        )
+    )
+
+    updater = UpadupUpdater(path=path)
+    updater.run()
+    updater.apply_updates()
+
+    assert (
+        "['flake8-bugbear[x]==24.12.12', "
+        "'flake8-bugbear ==24.12.12, !=23.1.0 ; python_version > \"3.9\"']"
+    ) in path.read_text()
+
+
+@pytest.mark.parametrize(
+    "dependency", ("flake8-bugbear==23.0.0,!=24.12.12", "flake8-bugbear==23.0.0,<24")
+)
+def test_does_not_update_pins_which_other_clauses_exclude(
+    capsys, tmp_path, mock_package_latest_version, dependency
+):
+    mock_package_latest_version("flake8-bugbear", "24.12.12")
+    path = tmp_path / ".pre-commit-config.yaml"
+    path.write_text(
+        CONFIG.replace(
+            "['flake8-bugbear==23.0.0', \"flake8-bugbear==23.0.0\"]",
+            f"['{dependency}']",
+        )
+    )
+
+    updater = UpadupUpdater(path=path)
+    updater.run()
+    assert not updater.has_updates()
+    assert (
+        f"'{dependency}' cannot be updated to 24.12.12, "
+        "which its other clauses exclude"
+    ) in capsys.readouterr().err
+
+
+def test_write_preserves_permissions_and_leaves_no_temporary_files(conf):
+    conf.chmod(0o640)
+
+    updater = UpadupUpdater(path=conf)
+    updater.run()
+    updater.apply_updates()
+
+    assert conf.stat().st_mode & 0o777 == 0o640
+    assert os.listdir(conf.parent) == [conf.name]
+
+
+def test_write_through_symlink_replaces_the_target(conf):
+    link = conf.parent / "link.yaml"
+    link.symlink_to(conf.name)
+
+    updater = UpadupUpdater(path=link)
+    updater.run()
+    updater.apply_updates()
+
+    assert link.is_symlink()
+    assert "flake8-bugbear==24.12.12" in conf.read_text()
+
+
+def test_refuses_to_overwrite_a_modified_config(conf):
+    updater = UpadupUpdater(path=conf)
+    updater.run()
+
+    modified = CONFIG + "# edited while upadup was running\n"
+    conf.write_text(modified)
+
+    with pytest.raises(ConfigChangedError):
+        updater.apply_updates()
+    assert conf.read_text() == modified
+    assert os.listdir(conf.parent) == [conf.name]
+
+
+def test_diff_is_rendered_from_the_text_which_was_read(conf):
+    updater = UpadupUpdater(path=conf)
+    updater.run()
+    conf.unlink()
+
+    diff = updater.render_diff()
+    changed = [line for line in diff.splitlines() if line[:1] in "+-"]
+    assert changed[2:] == [
+        (
+            "-        additional_dependencies: ['flake8-bugbear==23.0.0', "
+            '"flake8-bugbear==23.0.0"]'
+        ),
+        (
+            "+        additional_dependencies: ['flake8-bugbear==24.12.12', "
+            '"flake8-bugbear==24.12.12"]'
+        ),
+    ]
+
+
+def test_find_first_update_prefers_stored_versions(tmp_path, mock_github_tags):
+    conf = tmp_path / ".pre-commit-config.yaml"
+    conf.write_text(textwrap.dedent("""\
+        repos:
+          - repo: https://github.com/PyCQA/flake8
+            rev: 7.1.1
+            hooks:
+              - id: flake8
+                additional_dependencies:
+                  - flake8-bugbear==23.0.0
+                  - flake8-typing-as-t==0.0.3
+                  - github.com/wasilibs/go-shellcheck/cmd/shellcheck@v0.10.0
+        """))
+    store = VersionCache(tmp_path / "cache.sqlite3")
+    store.set("pypi", "https://pypi.org/pypi flake8-typing-as-t", "1.0.0")
+
+    # no request is mocked, so only the stored version can be used
+    found = UpadupUpdater(path=conf, version_cache=store).find_first_update()
+    assert found is not None
+    assert found.record.dependency == "flake8-typing-as-t==0.0.3"
+    assert found.new_dependency == "flake8-typing-as-t==1.0.0"
+    assert len(responses.calls) == 0
+
+
+def test_find_first_update_when_up_to_date(conf):
+    responses.replace(
+        responses.GET,
+        "https://pypi.org/pypi/flake8-bugbear/json",
+        json={"info": {"version": "23.0.0"}},
+    )
+
+    assert UpadupUpdater(path=conf).find_first_update() is None
+
+
+def test_on_span_receives_timings(conf):
+    spans = []
+    updater = UpadupUpdater(path=conf, on_span=spans.append)
+    updater.run()
+    updater.apply_updates()
+
+    by_name = {(span.category, span.name): span for span in spans}
+    assert by_name["config", "read"].args["bytes"] == len(CONFIG)
+    assert by_name["config", "parse"].args["dependencies"] == 2
+    assert by_name["pypi", "lookup"].args == {
+        "package": "flake8-bugbear",
+        "cache": "miss",
+    }
+    assert by_name["pypi", "request"].args["bytes"] > 0
+    assert ("rewrite", "write") in by_name
@@ -0,0 +1,71 @@
+import shutil
+import subprocess
+
+import pytest
+import responses
+
+from upadup import http
+from upadup.workspace import Workspace, find_config_files
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("repos: []\n")
+    return path
+
+
+def test_find_config_files_walks_directories(tmp_path):
+    top = _touch(tmp_path / ".pre-commit-config.yaml")
+    nested = _touch(tmp_path / "a" / "b" / ".pre-commit-config.yaml")
+    _touch(tmp_path / ".hidden" / ".pre-commit-config.yaml")
+    _touch(tmp_path / "a" / "other.yaml")
+
+    assert find_config_files([tmp_path]) == [top, nested]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_find_config_files_respects_gitignore(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / ".gitignore").write_text("vendor/\n")
+    top = _touch(tmp_path / ".pre-commit-config.yaml")
+    nested = _touch(tmp_path / "pkg" / ".pre-commit-config.yaml")
+    _touch(tmp_path / "vendor" / "dep" / ".pre-commit-config.yaml")
+
+    assert find_config_files([tmp_path]) == [top, nested]
+
+
+def test_find_config_files_dedupes_explicit_files(tmp_path):
+    config = _touch(tmp_path / ".pre-commit-config.yaml")
+
+    assert find_config_files([config, tmp_path]) == [config]
+
+
+def test_find_config_files_rejects_missing_paths(tmp_path):
+    with pytest.raises(FileNotFoundError, match="no-such-dir"):
+        find_config_files([tmp_path / "no-such-dir"])
+
+
+@pytest.mark.parametrize("status", (404, 503))
+def test_failed_lookups_are_made_once_for_all_configs(tmp_path, status):
+    responses.get("https://pypi.org/pypi/no-such-package/json", status=status)
+    paths = []
+    for name in "abcde":
+        path = tmp_path / name / ".pre-commit-config.yaml"
+        path.parent.mkdir()
+        path.write_text(
+            "repos:\n"
+            "  - repo: https://github.com/PyCQA/flake8\n"
+            "    rev: 7.1.1\n"
+            "    hooks:\n"
+            "      - id: flake8\n"
+            "        additional_dependencies: ['no-such-package==1.0']\n"
+        )
+        paths.append(path)
+
+    workspace = Workspace(paths)
+    workspace.run()
+
+    # a 404 is not retried, and a 503 is retried by the first lookup only
+    attempts = 1 if status == 404 else http.DEFAULT_RETRIES + 1
+    assert len(responses.calls) == attempts
+    assert len(workspace.unchecked_dependencies()) == 5
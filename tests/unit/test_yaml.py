@@ -0,0 +1,145 @@
+import textwrap
+
+import pytest
+
+from upadup import yaml
+from upadup.yaml import DependencyRecord, extract_hook_dependencies
+
+
+@pytest.fixture(params=("c", "pure"), autouse=True)
+def parser(request, monkeypatch):
+    if request.param == "c":
+        if yaml.CParser is None:
+            pytest.skip("the ruamel.yaml C extension is not installed")
+    else:
+        monkeypatch.setattr(yaml, "CParser", None)
+
+
+def _extract(text):
+    text = textwrap.dedent(text)
+    hooks = extract_hook_dependencies(text)
+    # every record points at its dependency in the source
+    lines = text.splitlines()
+    for hook in hooks:
+        for record in hook:
+            start = record.col
+            assert lines[record.line][start:].startswith(record.dependency)
+            start = record.offset
+            assert text[start:].startswith(record.dependency)
+    return hooks
+
+
+def test_extracts_locations_of_dependencies():
+    hooks = _extract("""\
+        repos:
+          - repo: https://github.com/PyCQA/flake8
+            rev: 7.1.1
+            hooks:
+              - id: flake8
+                additional_dependencies:
+                  - flake8-bugbear==23.0.0
+                  - 'flake8-typing-as-t==0.0.3'
+                  - "flake8-comprehensions==3.0.0"
+        """)
+    repo = "https://github.com/PyCQA/flake8"
+    assert hooks == [
+        [
+            DependencyRecord(repo, "flake8", "flake8-bugbear==23.0.0", 6, 12, 139),
+            DependencyRecord(repo, "flake8", "flake8-typing-as-t==0.0.3", 7, 13, 175),
+            DependencyRecord(
+                repo, "flake8", "flake8-comprehensions==3.0.0", 8, 13, 215
+            ),
+        ]
+    ]
+
+
+def test_groups_dependencies_by_hook_in_file_order():
+    hooks = _extract("""\
+        repos:
+          - hooks:
+              - id: mypy
+                additional_dependencies: [types-requests==1.0]
+              - id: no-deps
+              - id: empty-deps
+                additional_dependencies: []
+              - id: mypy
+                additional_dependencies: [types-toml==1.0]
+            repo: https://github.com/pre-commit/mirrors-mypy
+          - repo: local
+            hooks: [{id: local-hook, additional_dependencies: ['a==1']}]
+        """)
+    assert [[(r.repo, r.hook_id, r.dependency) for r in hook] for hook in hooks] == [
+        [("https://github.com/pre-commit/mirrors-mypy", "mypy", "types-requests==1.0")],
+        [("https://github.com/pre-commit/mirrors-mypy", "mypy", "types-toml==1.0")],
+        [("local", "local-hook", "a==1")],
+    ]
+    assert (hooks[2][0].line, hooks[2][0].col) == (11, 56)
+
+
+def test_ignores_unexpected_structure():
+    hooks = _extract("""\
+        top: {repos: [{repo: x, hooks: [{id: y, additional_dependencies: [z]}]}]}
+        ? [complex, key]
+        : value
+        repos:
+          - repo: a
+            hooks:
+              - id: b
+                additional_dependencies:
+                  - {not: a string}
+                  - [nor, this]
+                  - c==1
+                  - &anchor d==1
+                  - *anchor
+        """)
+    # anchored dependencies are skipped, as their location is that of the anchor
+    assert [[r.dependency for r in hook] for hook in hooks] == [["c==1"]]
+
+
+def test_reads_only_the_first_document():
+    hooks = _extract("""\
+        repos: []
+        ---
+        repos:
+          - repo: a
+            hooks: [{id: b, additional_dependencies: [c==1]}]
+        """)
+    assert hooks == []
+
+
+def test_skips_dependencies_written_differently_than_their_value():
+    hooks = _extract("""\
+        repos:
+          - repo: a
+            hooks:
+              - id: b
+                additional_dependencies:
+                  - "c\\x3d=1"
+                  - 'd''s==1'
+                  - e
+                    ==1
+                  - f==1
+        """)
+    assert [[r.dependency for r in hook] for hook in hooks] == [["f==1"]]
+
+
+@pytest.mark.parametrize("bom", ("", "\ufeff"), ids=("no-bom", "bom"))
+@pytest.mark.parametrize("newline", ("\n", "\r\n", "\r"), ids=("n", "rn", "r"))
+def test_extracts_dependencies_with_bom_and_any_newlines(bom, newline):
+    lines = [
+        "repos:",
+        "  - repo: a",
+        "    hooks:",
+        "      - id: b",
+        "        additional_dependencies:",
+        "          - c==1",
+        "          - 'd==1'",
+    ]
+    text = bom + newline.join(lines) + newline
+    hooks = _extract(text)
+    assert hooks == [
+        [
+            DependencyRecord("a", "b", "c==1", 5, 12, text.index("c==1")),
+            DependencyRecord("a", "b", "d==1", 6, 13, text.index("d==1")),
+        ]
+    ]